@@ -0,0 +1,93 @@
+# animation.py
+import time
+import tkinter as tk
+
+# Интервал кадра общего таймера анимаций (мс)
+ANIMATION_FRAME_MS = 40
+
+
+class AnimationClock:
+    """
+    Один таймер after() на окно для всех анимаций вместо собственного цикла
+    у каждого виджета.
+
+    Анимация — функция step(elapsed), которую таймер вызывает раз в кадр
+    со временем в секундах от её запуска; False из step завершает анимацию.
+    Фаза считается по времени, а не по числу кадров, поэтому пропущенные
+    кадры не замедляют анимацию.
+
+    Таймер не тикает, пока нет анимаций или есть хотя бы одна причина
+    приостановки: окно свёрнуто ('unmapped') или идёт тяжёлое обновление
+    (например, 'tree' при заполнении Treeview).
+    """
+
+    def __init__(self, root, interval=ANIMATION_FRAME_MS):
+        self.root = root
+        self.interval = interval
+        self._animations = {}
+        self._suspended = set()
+        self._after_id = None
+        root.bind('<Unmap>', self._on_unmap, add='+')
+        root.bind('<Map>', self._on_map, add='+')
+
+    @classmethod
+    def for_widget(cls, widget):
+        """Общий таймер окна, которому принадлежит widget (создаётся при первом обращении)"""
+        root = widget.winfo_toplevel()
+        clock = getattr(root, '_animation_clock', None)
+        if clock is None:
+            clock = cls(root)
+            root._animation_clock = clock
+        return clock
+
+    def start(self, key, step):
+        """Запускает (или перезапускает) анимацию с ключом key"""
+        self._animations[key] = (time.monotonic(), step)
+        self._schedule()
+
+    def stop(self, key):
+        self._animations.pop(key, None)
+        if not self._animations:
+            self._cancel()
+
+    def is_running(self, key):
+        return key in self._animations
+
+    def suspend(self, reason):
+        self._suspended.add(reason)
+        self._cancel()
+
+    def resume(self, reason):
+        self._suspended.discard(reason)
+        self._schedule()
+
+    def _on_unmap(self, event):
+        # Привязка к окну получает события и всех его потомков
+        if event.widget is self.root:
+            self.suspend('unmapped')
+
+    def _on_map(self, event):
+        if event.widget is self.root:
+            self.resume('unmapped')
+
+    def _schedule(self):
+        if self._after_id is None and self._animations and not self._suspended:
+            self._after_id = self.root.after(self.interval, self._tick)
+
+    def _cancel(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _tick(self):
+        self._after_id = None
+        now = time.monotonic()
+        for key, (started, step) in list(self._animations.items()):
+            try:
+                running = step(now - started)
+            except tk.TclError:
+                # Виджет анимации уже уничтожен
+                running = False
+            if not running and self._animations.get(key, (None, None))[1] is step:
+                del self._animations[key]
+        self._schedule()
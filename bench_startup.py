@@ -0,0 +1,87 @@
+# bench_startup.py
+"""
+Замер холодного старта по python -X importtime.
+
+    python bench_startup.py                 # intro, gui_app, main
+    python bench_startup.py gui_app --runs 9 --top 15
+
+Каждый модуль импортируется в отдельном процессе runs раз; берётся медиана
+суммарного времени импорта. Если она больше цели (STARTUP_TARGETS_MS или
+--target-ms), скрипт завершается с кодом 1 — так старт можно проверять в CI.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+# Цели холодного импорта точек входа (мс)
+STARTUP_TARGETS_MS = {
+    'intro': 80,
+    'gui_app': 150,
+    'main': 150,
+}
+
+
+def measure_import(module):
+    """Возвращает [(имя модуля, собственное мкс, суммарное мкс)] одного холодного импорта"""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Не удалось импортировать {module}:\n{completed.stderr}")
+
+    imports = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # строка заголовка
+        imports.append((fields[2].strip(), int(fields[0]), int(fields[1])))
+    return imports
+
+
+def total_ms(imports, module):
+    for name, _, cumulative in reversed(imports):
+        if name == module:
+            return cumulative / 1000
+    return 0.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Время холодного импорта точек входа DiskTider")
+    parser.add_argument('modules', nargs='*', default=list(STARTUP_TARGETS_MS), help="модули для замера")
+    parser.add_argument('--runs', type=int, default=5, help="сколько раз импортировать каждый модуль")
+    parser.add_argument('--top', type=int, default=10, help="сколько самых тяжёлых импортов показать")
+    parser.add_argument('--target-ms', type=float, help="одна цель для всех модулей вместо STARTUP_TARGETS_MS")
+    args = parser.parse_args(argv)
+
+    failed = []
+    for module in args.modules:
+        runs = [measure_import(module) for _ in range(max(1, args.runs))]
+        totals = [total_ms(imports, module) for imports in runs]
+        median = statistics.median(totals)
+        target = args.target_ms or STARTUP_TARGETS_MS.get(module)
+
+        verdict = ''
+        if target:
+            verdict = f" (цель {target:.0f} мс: {'OK' if median <= target else 'ПРЕВЫШЕНА'})"
+            if median > target:
+                failed.append(module)
+        print(f"{module}: медиана {median:.1f} мс, min {min(totals):.1f}, max {max(totals):.1f}{verdict}")
+
+        # Самые тяжёлые импорты — из запуска, ближайшего к медиане
+        typical = runs[min(range(len(totals)), key=lambda i: abs(totals[i] - median))]
+        for name, self_us, cumulative_us in sorted(typical, key=lambda item: item[2], reverse=True)[1:args.top + 1]:
+            print(f"    {cumulative_us / 1000:8.1f} мс  (своё {self_us / 1000:6.1f})  {name}")
+
+    if failed:
+        print(f"❌ Медленный старт: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,4 +1,6 @@
 # color_utils.py
+from functools import lru_cache
+
 
 def lighten_color(hex_color, factor):
     """
@@ -36,4 +38,23 @@ def get_contrast_color(hex_color):
 
     # Расчет яркости (Luminance) по формуле W3C
     luminance = (0.299 * r + 0.587 * g + 0.114 * b) / 255
-    return '#000000' if luminance > 0.5 else '#FFFFFF'
\ No newline at end of file
+    return '#000000' if luminance > 0.5 else '#FFFFFF'
+
+
+def interpolate_color(hex1, hex2, factor):
+    """Цвет между hex1 (factor=0) и hex2 (factor=1); для не-HEX цветов возвращает hex1"""
+    try:
+        r1, g1, b1 = int(hex1[1:3], 16), int(hex1[3:5], 16), int(hex1[5:7], 16)
+        r2, g2, b2 = int(hex2[1:3], 16), int(hex2[3:5], 16), int(hex2[5:7], 16)
+    except (ValueError, TypeError):
+        return hex1
+    r = int(r1 + (r2 - r1) * factor)
+    g = int(g1 + (g2 - g1) * factor)
+    b = int(b1 + (b2 - b1) * factor)
+    return f'#{r:02x}{g:02x}{b:02x}'
+
+
+@lru_cache(maxsize=64)
+def color_ramp(start_color, end_color, steps):
+    """Кортеж из steps + 1 цветов от start_color до end_color (кэшируется)"""
+    return tuple(interpolate_color(start_color, end_color, i / steps) for i in range(steps + 1))
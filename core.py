@@ -1,7 +1,11 @@
 import os
 import hashlib
+import stat
+import time
 from collections import defaultdict
 from logger import get_logger
+from metrics import ScanMetrics
+from ranking import KeepRanker
 
 # >>> ИЗМЕНЕНИЕ: Полный список директорий, которые следует пропускать
 SKIP_DIRECTORIES = {
@@ -50,8 +54,8 @@ SKIP_DIRECTORIES = {
 # <<< КОНЕЦ ИЗМЕНЕНИЯ
 
 
-def calculate_file_hash(filepath, chunk_size=65536, gui=None, cancel_flag=None):
-    """Вычисляет MD5 хеш файла"""
+def calculate_file_hash(filepath, chunk_size=65536, gui=None, cancel_flag=None, on_error=None, progress=None):
+    """Вычисляет MD5 хеш файла; progress (ScanProgress) получает прочитанные байты"""
     logger = get_logger()
     md5_hash = hashlib.md5()
     try:
@@ -62,35 +66,137 @@ def calculate_file_hash(filepath, chunk_size=65536, gui=None, cancel_flag=None):
                     return None
                 # <<<
                 md5_hash.update(chunk)
+                if progress:
+                    progress.bytes_read += len(chunk)
         return md5_hash.hexdigest()
     except PermissionError as e:
         if gui:
             gui.permission_errors += 1
-        logger.warning(f"Отказано в доступе при хешировании файла {filepath}: {e}")
+        logger.warning_rate_limited('PermissionError', filepath,
+                                    f"Отказано в доступе при хешировании файла {filepath}: {e}")
+        if on_error:
+            on_error(filepath, 'hash', str(e))
+        return None
+    except OSError as e:
+        # Битые ссылки, файлы, пропавшие во время обхода, и т. п. — сводкой, как и отказ в доступе
+        logger.warning_rate_limited(type(e).__name__, filepath, f"Ошибка хеширования файла {filepath}: {e}")
+        if on_error:
+            on_error(filepath, 'hash', str(e))
         return None
     except Exception as e:
         logger.error(f"Ошибка хеширования файла {filepath}: {e}")
+        if on_error:
+            on_error(filepath, 'hash', str(e))
         return None
 
 
-def find_duplicates(directory, extensions=None, recursive=True, gui=None, cancel_flag=None):
+PARTIAL_HASH_SAMPLE = 4096
+
+
+def calculate_partial_hash(filepath, file_size=None, sample_size=PARTIAL_HASH_SAMPLE, gui=None, on_error=None):
     """
-    Находит дубликаты файлов в указанной директории.
-    Поддерживает рекурсивное и нерекурсивное сканирование.
-    >>> ИЗМЕНЕНИЕ: Добавлен аргумент cancel_flag
+    Вычисляет быстрый MD5 по трём фрагментам файла (начало, середина, конец).
+    Для маленьких файлов читается весь файл. Совпадение частичного хеша
+    не гарантирует совпадения содержимого, а различие гарантирует различие.
     """
     logger = get_logger()
-    logger.log_scan_start(directory, extensions)
+    md5_hash = hashlib.md5()
+    try:
+        if file_size is None:
+            file_size = os.path.getsize(filepath)
+        with open(filepath, "rb") as f:
+            if file_size <= sample_size * 3:
+                md5_hash.update(f.read())
+            else:
+                for offset in (0, (file_size - sample_size) // 2, file_size - sample_size):
+                    f.seek(offset)
+                    md5_hash.update(f.read(sample_size))
+        return md5_hash.hexdigest()
+    except PermissionError as e:
+        if gui:
+            gui.permission_errors += 1
+        logger.warning_rate_limited('PermissionError', filepath,
+                                    f"Отказано в доступе при частичном хешировании файла {filepath}: {e}")
+        if on_error:
+            on_error(filepath, 'partial_hash', str(e))
+        return None
+    except OSError as e:
+        # Битые ссылки, файлы, пропавшие во время обхода, и т. п. — сводкой, как и отказ в доступе
+        logger.warning_rate_limited(type(e).__name__, filepath, f"Ошибка частичного хеширования файла {filepath}: {e}")
+        if on_error:
+            on_error(filepath, 'partial_hash', str(e))
+        return None
+    except Exception as e:
+        logger.error(f"Ошибка частичного хеширования файла {filepath}: {e}")
+        if on_error:
+            on_error(filepath, 'partial_hash', str(e))
+        return None
 
+
+def _matches_extensions(filename, extensions):
+    return not extensions or any(filename.lower().endswith(ext.lower()) for ext in extensions)
+
+
+def _stat_file_info(filepath, filename, gui, logger, on_error=None):
+    """
+    Возвращает словарь с данными файла или None, если файл пустой/недоступен
+    или это символическая ссылка: ссылка и её цель — один файл, а не дубликаты,
+    и удаление «копии» уничтожило бы единственный экземпляр.
+    """
+    try:
+        st = os.lstat(filepath)
+    except PermissionError as e:
+        if gui:
+            gui.permission_errors += 1
+        logger.warning_rate_limited('PermissionError', filepath, f"Отказано в доступе к файлу {filepath}: {e}")
+        if on_error:
+            on_error(filepath, 'stat', str(e))
+        return None
+    except OSError as e:
+        # Битые ссылки, файлы, пропавшие во время обхода, и т. п. — сводкой, как и отказ в доступе
+        logger.warning_rate_limited(type(e).__name__, filepath, f"Ошибка получения размера файла {filepath}: {e}")
+        if on_error:
+            on_error(filepath, 'stat', str(e))
+        return None
+    except Exception as e:
+        logger.error(f"Ошибка получения размера файла {filepath}: {e}")
+        if on_error:
+            on_error(filepath, 'stat', str(e))
+        return None
+    if stat.S_ISLNK(st.st_mode) or st.st_size <= 0:
+        return None
+    return {
+        'path': filepath,
+        'name': filename,
+        'size': st.st_size,
+        'mtime': st.st_mtime,
+        'dev': st.st_dev,
+        'inode': st.st_ino,
+    }
+
+
+def collect_files_by_size(directory, extensions=None, recursive=True, gui=None, cancel_flag=None, on_error=None,
+                          span=None, progress=None):
+    """
+    Этап 1: обходит директорию и группирует непустые файлы по размеру.
+    span (metrics.Span) получает число проверенных файлов и системных вызовов,
+    progress (progress.ScanProgress) — число папок и файлов.
+
+    Returns:
+        dict {размер: [file_info, ...]} или None, если операция отменена
+    """
+    logger = get_logger()
     files_by_size = defaultdict(list)
     total_files = 0
 
     if recursive:
         for root, dirs, files in os.walk(directory):
-            # >>> ДОБАВЛЕНО: Проверка отмены в цикле обхода папок
             if cancel_flag and cancel_flag():
-                return {}  # Возвращаем пустой результат при отмене
-            # <<<
+                return None
+            if span:
+                span.syscalls_est += 1  # scandir папки
+            if progress:
+                progress.dirs_visited += 1
 
             # Пропускаем директории из SKIP_DIRECTORIES (с проверкой нижнего регистра)
             dirs[:] = [d for d in dirs if not any(
@@ -98,89 +204,203 @@ def find_duplicates(directory, extensions=None, recursive=True, gui=None, cancel
                 for skip_dir in SKIP_DIRECTORIES)]
 
             for filename in files:
-                filepath = os.path.join(root, filename)
-                if extensions and not any(filename.lower().endswith(ext.lower()) for ext in extensions):
-                    continue
-                try:
-                    file_size = os.path.getsize(filepath)
-                    if file_size > 0:
-                        files_by_size[file_size].append({
-                            'path': filepath,
-                            'name': filename,
-                            'size': file_size
-                        })
-                        total_files += 1
-                except PermissionError as e:
-                    if gui:
-                        gui.permission_errors += 1
-                    logger.warning(f"Отказано в доступе к файлу {filepath}: {e}")
-                    continue
-                except Exception as e:
-                    logger.error(f"Ошибка получения размера файла {filepath}: {e}")
+                if not _matches_extensions(filename, extensions):
                     continue
+                if span:
+                    span.syscalls_est += 1
+                    span.files += 1
+                if progress:
+                    progress.files_seen += 1
+                file_info = _stat_file_info(os.path.join(root, filename), filename, gui, logger, on_error)
+                if file_info:
+                    files_by_size[file_info['size']].append(file_info)
+                    total_files += 1
     else:
-        for filename in os.listdir(directory):
-            # >>> ДОБАВЛЕНО: Проверка отмены в нерекурсивном цикле
+        entries = os.listdir(directory)
+        if span:
+            span.syscalls_est += 1 + len(entries)  # listdir и isdir каждого элемента
+        if progress:
+            progress.dirs_visited += 1
+        for filename in entries:
             if cancel_flag and cancel_flag():
-                return {}
-            # <<<
+                return None
 
             filepath = os.path.join(directory, filename)
             if os.path.isdir(filepath):
                 continue
-            if extensions and not any(filename.lower().endswith(ext.lower()) for ext in extensions):
-                continue
-            try:
-                file_size = os.path.getsize(filepath)
-                if file_size > 0:
-                    files_by_size[file_size].append({
-                        'path': filepath,
-                        'name': filename,
-                        'size': file_size
-                    })
-                    total_files += 1
-            except PermissionError as e:
-                if gui:
-                    gui.permission_errors += 1
-                logger.warning(f"Отказано в доступе к файлу {filepath}: {e}")
-                continue
-            except Exception as e:
-                logger.error(f"Ошибка получения размера файла {filepath}: {e}")
+            if not _matches_extensions(filename, extensions):
                 continue
+            if span:
+                span.syscalls_est += 1
+                span.files += 1
+            if progress:
+                progress.files_seen += 1
+            file_info = _stat_file_info(filepath, filename, gui, logger, on_error)
+            if file_info:
+                files_by_size[file_info['size']].append(file_info)
+                total_files += 1
 
     logger.info(f"Этап 1 завершён. Проверено файлов: {total_files}")
+    return files_by_size
+
 
-    # >>> ДОБАВЛЕНО: Финальная проверка отмены после Этапа 1
-    if cancel_flag and cancel_flag():
-        return {}
-    # <<<
+def group_by_partial_hash(files, gui=None, cancel_flag=None, on_error=None, span=None):
+    """
+    Разбивает файлы одного размера на подгруппы по частичному хешу.
+    Возвращает только подгруппы из 2+ файлов; частичный хеш сохраняется в file_info['partial'].
+    None означает отмену.
+    """
+    by_partial = defaultdict(list)
+    for file_info in files:
+        if cancel_flag and cancel_flag():
+            return None
+        partial = calculate_partial_hash(file_info['path'], file_info['size'], gui=gui, on_error=on_error)
+        if span:
+            span.files += 1
+            small = file_info['size'] <= PARTIAL_HASH_SAMPLE * 3
+            # open + read + close для маленьких файлов, иначе три пары seek + read
+            span.syscalls_est += 3 if small else 8
+            if partial:
+                span.bytes_read += file_info['size'] if small else PARTIAL_HASH_SAMPLE * 3
+        if partial:
+            file_info['partial'] = partial
+            by_partial[partial].append(file_info)
+    return [group for group in by_partial.values() if len(group) > 1]
 
-    potential_duplicates = {size: files for size, files in files_by_size.items() if len(files) > 1}
 
-    if not potential_duplicates:
-        logger.info("Потенциальных дубликатов не найдено")
-        return {}
+def find_duplicates(directory, extensions=None, recursive=True, gui=None, cancel_flag=None, ranker=None,
+                    on_group=None, keep_results=True, on_error=None, metrics=None, progress=None):
+    """
+    Находит дубликаты файлов в указанной директории.
+    Поддерживает рекурсивное и нерекурсивное сканирование.
+    Этапы: размер -> частичный хеш -> полный хеш.
 
-    files_to_hash_count = sum(len(files) for files in potential_duplicates.values())
-    logger.info(f"Найдено потенциальных дубликатов: {files_to_hash_count} файлов в {len(potential_duplicates)} группах")
+    Файлы каждой группы упорядочиваются один раз через ranker (KeepRanker):
+    первый файл группы — тот, что следует сохранить.
 
-    # === Этап 2: Хеширование для точного сравнения ===
-    hashes = defaultdict(list)
-    for files in potential_duplicates.values():
-        for file_info in files:
-            # >>> ДОБАВЛЕНО: Проверка отмены перед хешированием
-            if cancel_flag and cancel_flag():
+    Группа окончательна, как только обработана её размерная группа, поэтому
+    on_group(hash, files) вызывается сразу для каждой подтверждённой группы.
+    При keep_results=False группы не накапливаются (возвращается пустой словарь),
+    и память не растёт с числом найденных дубликатов.
+    on_error(path, stage, message) получает ошибки доступа к отдельным файлам.
+
+    metrics (metrics.ScanMetrics) получает замеры этапов traversal, bucketing,
+    partial_hash и full_hash; без него создаётся свой экземпляр, и замеры
+    только пишутся в файл метрик рядом с логом.
+
+    progress (progress.ScanProgress) — общие счётчики для индикатора хода:
+    поток сканирования только увеличивает их, читатель опрашивает snapshot().
+    """
+    logger = get_logger()
+    logger.log_scan_start(directory, extensions)
+    ranker = ranker or KeepRanker()
+    metrics = metrics or ScanMetrics(run={'directory': directory})
+
+    partial_span = metrics.start('partial_hash')
+    full_span = metrics.start('full_hash')
+    traversal_span = metrics.start('traversal')
+    error_spans = {'stat': traversal_span, 'partial_hash': partial_span, 'hash': full_span}
+
+    def count_error(path, stage, message):
+        error_spans[stage].errors += 1
+        if on_error:
+            on_error(path, stage, message)
+
+    try:
+        started = time.perf_counter()
+        try:
+            files_by_size = collect_files_by_size(directory, extensions, recursive, gui=gui, cancel_flag=cancel_flag,
+                                                  on_error=count_error, span=traversal_span, progress=progress)
+        finally:
+            traversal_span.wall = time.perf_counter() - started
+            metrics.finish(traversal_span)
+        if files_by_size is None or (cancel_flag and cancel_flag()):
+            return {}  # Возвращаем пустой результат при отмене
+
+        with metrics.span('bucketing') as span:
+            potential_duplicates = {size: files for size, files in files_by_size.items() if len(files) > 1}
+            span.files = sum(len(files) for files in files_by_size.values())
+            span.extra['buckets'] = len(potential_duplicates)
+
+        if not potential_duplicates:
+            logger.info("Потенциальных дубликатов не найдено")
+            return {}
+
+        files_to_hash_count = sum(len(files) for files in potential_duplicates.values())
+        if progress:
+            progress.candidate_files = files_to_hash_count
+            progress.candidate_bytes = sum(size * len(files) for size, files in potential_duplicates.items())
+            progress.set_stage('hashing')
+        logger.info(f"Найдено потенциальных дубликатов: {files_to_hash_count} файлов "
+                    f"в {len(potential_duplicates)} группах")
+
+        # === Этап 2: Хеширование для точного сравнения ===
+        duplicates = {}
+        groups_found = 0
+        for size, files in potential_duplicates.items():
+            started = time.perf_counter()
+            candidates = group_by_partial_hash(files, gui=gui, cancel_flag=cancel_flag, on_error=count_error,
+                                               span=partial_span)
+            partial_span.wall += time.perf_counter() - started
+            if candidates is None:
                 return {}
-            # <<<
+            if progress:
+                # Отсеянные частичным хешем файлы уже разрешены
+                remaining = sum(len(group) for group in candidates)
+                progress.bytes_read += len(files) * min(size, PARTIAL_HASH_SAMPLE * 3)
+                progress.files_done += len(files) - remaining
+                progress.bytes_done += size * (len(files) - remaining)
+
+            hashes = defaultdict(list)
+            started = time.perf_counter()
+            for group in candidates:
+                for file_info in group:
+                    if cancel_flag and cancel_flag():
+                        return {}
 
-            file_hash = calculate_file_hash(file_info['path'], gui=gui, cancel_flag=cancel_flag)
+                    # Маленькие файлы уже прочитаны целиком при частичном хешировании
+                    if size <= PARTIAL_HASH_SAMPLE * 3:
+                        file_hash = file_info['partial']
+                    else:
+                        file_hash = calculate_file_hash(file_info['path'], gui=gui, cancel_flag=cancel_flag,
+                                                        on_error=count_error, progress=progress)
+                        full_span.files += 1
+                        # open + чтения блоками по 64 КБ (последнее — пустое) + close
+                        full_span.syscalls_est += 3 + size // 65536
+                        if file_hash:
+                            full_span.bytes_read += size
 
-            # Если хеш вернулся None (из-за ошибки или отмены), пропускаем
-            if file_hash:
-                hashes[file_hash].append(file_info)
+                    if progress:
+                        progress.files_done += 1
+                        progress.bytes_done += size
 
-    duplicates = {h: files for h, files in hashes.items() if len(files) > 1}
+                    # Если хеш вернулся None (из-за ошибки или отмены), пропускаем
+                    if file_hash:
+                        hashes[file_hash].append(file_info)
+            full_span.wall += time.perf_counter() - started
+
+            for file_hash, group_files in hashes.items():
+                if len(group_files) < 2:
+                    continue
+                ranked = ranker.rank(group_files)
+                groups_found += 1
+                if progress:
+                    progress.groups_found += 1
+                if on_group:
+                    on_group(file_hash, ranked)
+                if keep_results:
+                    duplicates[file_hash] = ranked
 
-    logger.info(f"Этап 2 завершён. Найдено {len(duplicates)} групп дубликатов")
+        full_span.extra['groups'] = groups_found
+        if progress:
+            # Время этапа не сбрасываем: скорости в последнем снимке — за хеширование
+            progress.stage = 'done'
+        logger.info(f"Этап 2 завершён. Найдено {groups_found} групп дубликатов")
 
-    return duplicates
\ No newline at end of file
+        return duplicates
+    finally:
+        metrics.finish(partial_span)
+        metrics.finish(full_span)
+        metrics.log_summary()
+        # Сводка подавленных предупреждений и запись очереди лога — в конце сканирования
+        logger.flush()
@@ -0,0 +1,446 @@
+# deletion.py
+import errno
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from journal import TrashLocator
+from logger import get_logger
+from utils import TRASH_AVAILABLE
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Сколько путей передавать в один вызов send2trash
+TRASH_BATCH_SIZE = 200
+
+# Потоки для os.remove: удаление упирается в задержки ФС (особенно сетевой), а не в CPU
+DEFAULT_REMOVE_WORKERS = 8
+
+# Как часто (в секундах) вызывать колбэк прогресса
+PROGRESS_INTERVAL = 0.25
+
+# Сколько файлов на поток отдавать пулу между проверками отмены/паузы
+POOL_CHUNK_PER_WORKER = 4
+
+# Режимы удаления и формулировка для журнала
+DELETION_MODES = {
+    'trash': "Перемещён в корзину",
+    'delete': "Удалён навсегда",
+    'hardlink': "Заменён жёсткой ссылкой",
+    'reflink': "Заменён reflink-клоном",
+}
+
+# ioctl FICLONE из linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+# Ошибки, которыми ядро/ФС сообщают, что клонирование не поддерживается
+REFLINK_UNSUPPORTED_ERRNOS = {
+    errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.EXDEV, errno.ENOSYS,
+    getattr(errno, 'ENOTSUP', errno.EOPNOTSUPP),
+}
+
+# Что делать с файлом, если ФС не поддерживает reflink
+REFLINK_FALLBACKS = ('hardlink', 'skip')
+
+
+def normalize_path_long(filepath):
+    """
+    Нормализует путь, добавляя префикс \\\\?\\ для поддержки длинных путей (MAX_PATH)
+    в os.remove, но не для send2trash.
+    """
+    if os.name == 'nt':
+        filepath = os.path.normpath(filepath)  # Сначала нормализуем разделители
+        if not filepath.startswith('\\\\?\\'):
+            if filepath.startswith('\\\\'):
+                # UNC путь (\\server\share)
+                return '\\\\?\\UNC\\' + filepath[2:]
+            return '\\\\?\\' + filepath
+    return filepath
+
+
+def describe_deletion_error(filepath, error):
+    """Текст ошибки удаления в формате, который показывается пользователю"""
+    if isinstance(error, FileNotFoundError):
+        return f"Файл не найден: {filepath}"
+    if isinstance(error, PermissionError):
+        return f"Отказано в доступе: {str(error)}"
+    return f"Ошибка удаления: {type(error).__name__}: {str(error)}"
+
+
+def _remove_file(file_info):
+    """Необратимо удаляет файл; возвращает (исключение или None, освобождено байт)"""
+    try:
+        os.remove(normalize_path_long(file_info['path']))
+        return None, file_info['size']
+    except Exception as e:
+        return e, 0
+
+
+def _temp_sibling(path):
+    """Имя временного файла в той же папке (os.replace атомарен только в пределах ФС)"""
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.disktider-{uuid.uuid4().hex[:8]}.tmp")
+
+
+def replace_with_hardlink(path, keep_path):
+    """
+    Атомарно заменяет path жёсткой ссылкой на keep_path.
+
+    Ссылка создаётся под временным именем рядом с path и переносится на место
+    через os.replace; при любой ошибке временный файл удаляется, а path
+    остаётся нетронутым. Файлы должны находиться на одном устройстве.
+
+    Returns:
+        int | None: сколько байт освобождено (0, если у path есть другие жёсткие
+        ссылки); None, если path уже ссылка на keep_path и менять нечего
+    """
+    keep_stat = os.stat(keep_path)
+    path_stat = os.stat(path)
+    if keep_stat.st_dev != path_stat.st_dev:
+        raise OSError(errno.EXDEV, "Файл и оригинал находятся на разных устройствах", path)
+    if keep_stat.st_ino == path_stat.st_ino:
+        return None
+
+    temp_path = _temp_sibling(path)
+    os.link(keep_path, temp_path)
+    try:
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    return path_stat.st_size if path_stat.st_nlink == 1 else 0
+
+
+class ReflinkUnsupportedError(OSError):
+    """Файловая система (или ОС) не поддерживает copy-on-write клонирование"""
+
+
+def _clone_into(keep_path, target_path):
+    """Создаёт target_path как CoW-клон keep_path через FICLONE"""
+    if fcntl is None:
+        raise ReflinkUnsupportedError(errno.ENOSYS, "reflink доступен только в Linux", keep_path)
+    with open(keep_path, 'rb') as src, open(target_path, 'xb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError as e:
+            if e.errno in REFLINK_UNSUPPORTED_ERRNOS:
+                raise ReflinkUnsupportedError(e.errno, f"ФС не поддерживает reflink: {e.strerror}", keep_path)
+            raise
+
+
+def reflink_supported(directory):
+    """
+    Проверяет, поддерживает ли ФС в directory reflink (например, btrfs или xfs
+    с reflink=1; на tmpfs и ext4 — нет). Создаёт и удаляет два временных файла.
+    """
+    source = None
+    clone = None
+    try:
+        fd, source = tempfile.mkstemp(prefix='.disktider-probe-', dir=directory)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(b'DiskTider reflink probe')
+        clone = _temp_sibling(source)
+        _clone_into(source, clone)
+        return True
+    except ReflinkUnsupportedError:
+        return False
+    finally:
+        for path in (clone, source):
+            if path:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+
+def replace_with_reflink(path, keep_path):
+    """
+    Атомарно заменяет path copy-on-write клоном keep_path (Linux FICLONE).
+
+    Содержимое хранится один раз, но файлы остаются независимыми: у клона
+    собственные inode, права и время модификации (копируются с path).
+    Клон создаётся рядом под временным именем и переносится через os.replace;
+    при ошибке временный файл удаляется, path не меняется.
+
+    Raises:
+        ReflinkUnsupportedError: если ФС не умеет клонировать
+
+    Returns:
+        int: сколько байт освобождено
+    """
+    keep_stat = os.stat(keep_path)
+    path_stat = os.stat(path)
+    if keep_stat.st_dev != path_stat.st_dev:
+        raise ReflinkUnsupportedError(errno.EXDEV, "Файл и оригинал находятся на разных устройствах", path)
+
+    temp_path = _temp_sibling(path)
+    try:
+        _clone_into(keep_path, temp_path)
+        shutil.copystat(path, temp_path)
+        try:
+            os.chown(temp_path, path_stat.st_uid, path_stat.st_gid)
+        except (AttributeError, PermissionError):
+            pass
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    return path_stat.st_size if path_stat.st_nlink == 1 else 0
+
+
+def _hardlink_file(file_info):
+    """Заменяет дубликат жёсткой ссылкой на сохраняемый файл группы"""
+    try:
+        return None, replace_with_hardlink(file_info['path'], file_info['keep_path'])
+    except Exception as e:
+        return e, 0
+
+
+class DeletionEngine:
+    """
+    Удаление списка файлов пакетами.
+
+    mode='trash' — пути передаются в send2trash списками по batch_size;
+    если пакет целиком не удался, его файлы повторяются по одному,
+    чтобы ошибка была привязана к конкретному файлу.
+    mode='delete' — os.remove выполняется в пуле из max_workers потоков.
+    mode='hardlink' — каждый дубликат атомарно заменяется жёсткой ссылкой
+    на file_info['keep_path'] (тот же пул потоков); путь остаётся на месте.
+    Дубликат, который уже является жёсткой ссылкой на оригинал, не меняется:
+    он не считается удалённым и не попадает в журнал.
+    mode='reflink' — то же, но CoW-клоном; если ФС не поддерживает reflink,
+    по reflink_fallback файл заменяется жёсткой ссылкой ('hardlink') или
+    пропускается ('skip'). Неподдерживающее устройство запоминается, и
+    остальные его файлы сразу идут по запасному пути.
+
+    journal (journal.DeletionJournal) получает запись о каждом успешно
+    обработанном файле с фактически выполненным действием — для отмены.
+
+    control (progress.OperationControl) проверяется между пакетами корзины и
+    порциями пула: пауза приостанавливает удаление, отмена завершает его,
+    оставляя необработанные файлы на месте (engine.cancelled = True).
+
+    progress(dict) вызывается не чаще раза в PROGRESS_INTERVAL секунд с ключами
+    'done', 'total', 'deleted', 'freed_bytes', 'files_per_sec', 'bytes_per_sec',
+    'elapsed', 'eta' (секунд до конца или None) и 'paused'. Время паузы
+    в elapsed и скорость не входит.
+    """
+
+    def __init__(self, mode='trash', max_workers=DEFAULT_REMOVE_WORKERS, batch_size=TRASH_BATCH_SIZE,
+                 progress=None, reflink_fallback='hardlink', journal=None, control=None):
+        if mode not in DELETION_MODES:
+            raise ValueError(f"Неизвестный режим удаления: {mode}")
+        if reflink_fallback not in REFLINK_FALLBACKS:
+            raise ValueError(f"Неизвестный запасной режим reflink: {reflink_fallback}")
+        # Без send2trash корзина недоступна: как и раньше, удаляем навсегда
+        if mode == 'trash' and not TRASH_AVAILABLE:
+            get_logger().warning("⚠️ send2trash не установлен (pip install send2trash): файлы будут удалены навсегда")
+            mode = 'delete'
+        self.mode = mode
+        self.max_workers = max(1, max_workers)
+        self.batch_size = max(1, batch_size)
+        self.progress = progress
+        self.reflink_fallback = reflink_fallback
+        self.journal = journal
+        self.control = control
+        self.logger = get_logger()
+        self._reflink_unsupported_devices = set()
+        # Файлы режима reflink, заменённые жёсткой ссылкой (для журнала)
+        self._hardlinked_paths = set()
+
+        self.total = 0
+        self.done = 0
+        self.deleted_count = 0
+        self.freed_bytes = 0
+        self.errors = []
+        self.cancelled = False
+        self._started = 0.0
+        self._paused_time = 0.0
+        self._last_report = 0.0
+
+    def run(self, files_to_delete):
+        """
+        Удаляет файлы.
+
+        Returns:
+            tuple: (deleted_count, freed_bytes, errors_list)
+        """
+        files_to_delete = list(files_to_delete)
+        self.total = len(files_to_delete)
+        self._started = time.monotonic()
+
+        if self.mode == 'trash':
+            self._run_trash(files_to_delete)
+        elif self.mode == 'hardlink':
+            self._run_pool(_hardlink_file, files_to_delete)
+        elif self.mode == 'reflink':
+            self._run_pool(self._reflink_file, files_to_delete)
+        else:
+            self._run_pool(_remove_file, files_to_delete)
+
+        if self.journal is not None:
+            self.journal.commit()
+        if self.cancelled:
+            self.logger.info(f"Удаление отменено: обработано {self.done} из {self.total} файлов")
+        self._report(force=True)
+        return self.deleted_count, self.freed_bytes, self.errors
+
+    def _succeeded(self, file_info, freed_bytes=None, destination=None):
+        """destination — место файла в корзине (режим 'trash'), если его удалось определить"""
+        self.done += 1
+        self.deleted_count += 1
+        self.freed_bytes += file_info['size'] if freed_bytes is None else freed_bytes
+        action = 'hardlink' if file_info['path'] in self._hardlinked_paths else self.mode
+        self.logger.debug(f"{DELETION_MODES[action]}: {file_info['path']}")
+        if self.journal is not None:
+            if action in ('hardlink', 'reflink'):
+                destination = file_info.get('keep_path')
+            self.journal.record(file_info['path'], file_info['size'], action,
+                                digest=file_info.get('digest'), destination=destination)
+
+    def _unchanged(self, file_info):
+        """Файл уже был жёсткой ссылкой на оригинал: не считается и не журналируется"""
+        self.done += 1
+        self.logger.debug(f"Уже жёсткая ссылка на оригинал, пропущен: {file_info['path']}")
+
+    def _failed(self, file_info, error):
+        self.done += 1
+        error_msg = describe_deletion_error(file_info['path'], error)
+        self.logger.log_deletion_error(file_info['path'], error_msg)
+        self.errors.append(error_msg)
+
+    def _checkpoint(self):
+        """Ждёт снятия паузы; возвращает True, если удаление отменено"""
+        if self.control is None:
+            return False
+        if self.control.paused:
+            self._report(force=True)
+            paused_at = time.monotonic()
+            self.cancelled = self.control.checkpoint()
+            self._paused_time += time.monotonic() - paused_at
+            self._report(force=True)
+        else:
+            self.cancelled = self.control.checkpoint()
+        return self.cancelled
+
+    def _run_trash(self, files_to_delete):
+        from send2trash import send2trash
+
+        # Место в корзине нужно только журналу для отмены
+        locator = TrashLocator() if self.journal is not None else None
+        for start in range(0, len(files_to_delete), self.batch_size):
+            if self._checkpoint():
+                return
+            batch = files_to_delete[start:start + self.batch_size]
+            # send2trash работает с путём, нормализованным только по разделителям
+            paths = [os.path.normpath(f['path']) for f in batch]
+            # После ошибки пакета отсутствие файла означает «ушёл в корзину»,
+            # только если до пакета он существовал
+            existed = [os.path.lexists(path) for path in paths]
+            if locator is not None:
+                locator.prepare(paths)
+            try:
+                send2trash(paths)
+            except Exception as batch_error:
+                self.logger.debug(f"Пакет корзины не удался ({batch_error}), повтор по одному файлу")
+                destinations = locator.locations(paths) if locator else {}
+                for file_info, path, path_existed in zip(batch, paths, existed):
+                    self._trash_one(file_info, path, send2trash, path_existed, destinations.get(path), locator)
+            else:
+                destinations = locator.locations(paths) if locator else {}
+                for file_info, path in zip(batch, paths):
+                    self._succeeded(file_info, destination=destinations.get(path))
+            self._report()
+
+    def _trash_one(self, file_info, path, send2trash, existed, destination=None, locator=None):
+        if not existed:
+            self._failed(file_info, FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), path))
+            return
+        # Часть пакета могла уйти в корзину до ошибки
+        if not os.path.lexists(path):
+            self._succeeded(file_info, destination=destination)
+            return
+        try:
+            send2trash(path)
+            self._succeeded(file_info, destination=locator.locations([path]).get(path) if locator else None)
+        except Exception as e:
+            self._failed(file_info, e)
+
+    def _reflink_file(self, file_info):
+        """Заменяет дубликат reflink-клоном, при неподдержке — по reflink_fallback"""
+        path, keep_path = file_info['path'], file_info['keep_path']
+        try:
+            device = os.stat(path).st_dev
+            if device not in self._reflink_unsupported_devices:
+                try:
+                    return None, replace_with_reflink(path, keep_path)
+                except ReflinkUnsupportedError as e:
+                    if e.errno != errno.EXDEV:
+                        self._reflink_unsupported_devices.add(device)
+                        self.logger.warning(f"reflink не поддерживается для {path}: {e.strerror}")
+
+            if self.reflink_fallback == 'hardlink':
+                freed_bytes = replace_with_hardlink(path, keep_path)
+                if freed_bytes is not None:
+                    self._hardlinked_paths.add(path)
+                return None, freed_bytes
+            raise ReflinkUnsupportedError(errno.EOPNOTSUPP, "reflink не поддерживается, файл пропущен", path)
+        except Exception as e:
+            return e, 0
+
+    def _run_pool(self, worker, files_to_delete):
+        # Файлы отдаются пулу порциями, чтобы пауза и отмена срабатывали быстро
+        chunk_size = self.max_workers * POOL_CHUNK_PER_WORKER
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for start in range(0, len(files_to_delete), chunk_size):
+                if self._checkpoint():
+                    return
+                chunk = files_to_delete[start:start + chunk_size]
+                for file_info, (error, freed_bytes) in zip(chunk, pool.map(worker, chunk)):
+                    if error is not None:
+                        self._failed(file_info, error)
+                    elif freed_bytes is None:
+                        self._unchanged(file_info)
+                    else:
+                        self._succeeded(file_info, freed_bytes)
+                    self._report()
+
+    def _report(self, force=False):
+        if not self.progress:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_report < PROGRESS_INTERVAL:
+            return
+        self._last_report = now
+        elapsed = max(now - self._started - self._paused_time, 1e-9)
+        files_per_sec = self.done / elapsed
+        remaining = self.total - self.done
+        if not remaining:
+            eta = 0.0
+        elif files_per_sec > 0:
+            eta = remaining / files_per_sec
+        else:
+            eta = None
+        self.progress({
+            'done': self.done,
+            'total': self.total,
+            'deleted': self.deleted_count,
+            'freed_bytes': self.freed_bytes,
+            'files_per_sec': files_per_sec,
+            'bytes_per_sec': self.freed_bytes / elapsed,
+            'elapsed': elapsed,
+            'eta': eta,
+            'paused': bool(self.control and self.control.paused),
+        })
@@ -0,0 +1,121 @@
+# estimator.py
+import math
+import random
+from collections import defaultdict
+
+from core import collect_files_by_size, calculate_partial_hash
+from logger import get_logger
+
+# z-квантили нормального распределения для поддерживаемых уровней доверия
+Z_SCORES = {
+    0.80: 1.2816,
+    0.90: 1.6449,
+    0.95: 1.9600,
+    0.99: 2.5758,
+}
+
+
+def _bucket_reclaimable(size, files, gui=None, cancel_flag=None):
+    """
+    Хеширует файлы одной размерной группы частичным хешем и возвращает,
+    сколько байт можно освободить (размер * (файлов - уникальных хешей)).
+    None означает отмену.
+    """
+    counts = defaultdict(int)
+    for file_info in files:
+        if cancel_flag and cancel_flag():
+            return None
+        partial = calculate_partial_hash(file_info['path'], size, gui=gui)
+        if partial:
+            counts[partial] += 1
+    return size * sum(count - 1 for count in counts.values())
+
+
+def estimate_reclaimable(directory, extensions=None, recursive=True, sample_buckets=200,
+                         confidence=0.95, seed=None, gui=None, cancel_flag=None):
+    """
+    Быстрая статистическая оценка места, занятого дубликатами.
+
+    Выполняет только Этап 1 (обход и группировка по размеру), затем хеширует
+    частичным хешем случайную выборку размерных групп и экстраполирует результат
+    на все кандидаты (отношение освобождаемых байт к байтам кандидатов).
+
+    Args:
+        sample_buckets: сколько размерных групп хешировать
+        confidence: уровень доверия интервала (0.80, 0.90, 0.95 или 0.99)
+        seed: зерно генератора для воспроизводимой выборки
+
+    Returns:
+        dict с ключами 'files_total', 'candidate_files', 'candidate_bytes',
+        'buckets_total', 'buckets_sampled', 'estimate', 'low', 'high', 'confidence', 'full_sample'
+        или None, если операция отменена. full_sample — хешированы все размерные
+        группы: интервала выборки нет, но оценка всё равно по частичным хешам
+        и может быть выше результата сканирования
+    """
+    logger = get_logger()
+    logger.info(f"Оценка дубликатов: {directory} (выборка {sample_buckets} групп)")
+    try:
+        files_by_size = collect_files_by_size(directory, extensions, recursive, gui=gui, cancel_flag=cancel_flag)
+        if files_by_size is None:
+            return None
+
+        files_total = sum(len(files) for files in files_by_size.values())
+        buckets = [(size, files) for size, files in files_by_size.items() if len(files) > 1]
+        candidate_files = sum(len(files) for _, files in buckets)
+        candidate_bytes = sum(size * len(files) for size, files in buckets)
+
+        result = {
+            'files_total': files_total,
+            'candidate_files': candidate_files,
+            'candidate_bytes': candidate_bytes,
+            'buckets_total': len(buckets),
+            'buckets_sampled': 0,
+            'estimate': 0,
+            'low': 0,
+            'high': 0,
+            'confidence': confidence,
+            'full_sample': True,
+        }
+        if not buckets:
+            return result
+
+        rng = random.Random(seed)
+        sample = buckets if len(buckets) <= sample_buckets else rng.sample(buckets, sample_buckets)
+
+        # y — освобождаемые байты группы, x — байты кандидатов в группе
+        ys, xs = [], []
+        for size, files in sample:
+            reclaimable = _bucket_reclaimable(size, files, gui=gui, cancel_flag=cancel_flag)
+            if reclaimable is None:
+                return None
+            ys.append(reclaimable)
+            xs.append(size * len(files))
+
+        n, population = len(sample), len(buckets)
+        ratio = sum(ys) / sum(xs) if sum(xs) else 0.0
+        estimate = ratio * candidate_bytes
+
+        result['buckets_sampled'] = n
+        result['estimate'] = int(estimate)
+        if n == population:
+            result['low'] = result['high'] = int(estimate)
+            logger.info(f"Оценка завершена: ~{result['estimate']} байт по частичным хешам всех {population} групп")
+            return result
+
+        # Дисперсия отношения с поправкой на конечную совокупность
+        mean_x = sum(xs) / n
+        residual_var = sum((y - ratio * x) ** 2 for y, x in zip(ys, xs)) / (n - 1) if n > 1 else 0.0
+        var_ratio = (1 - n / population) * residual_var / (n * mean_x ** 2) if mean_x else 0.0
+        margin = Z_SCORES.get(confidence, Z_SCORES[0.95]) * math.sqrt(var_ratio) * candidate_bytes
+
+        result['full_sample'] = False
+        result['low'] = int(max(0.0, estimate - margin))
+        result['high'] = int(min(float(candidate_bytes), estimate + margin))
+
+        logger.info(
+            f"Оценка завершена: ~{result['estimate']} байт "
+            f"[{result['low']}; {result['high']}] по {n} из {population} групп"
+        )
+        return result
+    finally:
+        logger.flush()
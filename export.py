@@ -0,0 +1,164 @@
+# export.py
+import csv
+import json
+import os
+
+from logger import get_logger
+from models import DuplicateGroup, ScanResult
+
+CSV_FIELDS = ['digest', 'size', 'keep', 'path', 'mtime']
+
+# Допуск сравнения mtime: разные ФС и хосты хранят время с разной точностью (FAT — 2 с)
+MTIME_TOLERANCE = 2.0
+
+
+def _detect_format(path, fmt=None):
+    fmt = fmt or os.path.splitext(path)[1].lower().lstrip('.')
+    if fmt not in ('jsonl', 'csv'):
+        raise ValueError(f"Неподдерживаемый формат экспорта: {fmt} (ожидается .jsonl или .csv)")
+    return fmt
+
+
+class ResultExporter:
+    """
+    Потоковая запись групп дубликатов в JSON Lines или CSV.
+
+    Экземпляр можно передать в find_duplicates(on_group=...): каждая группа
+    записывается и сбрасывается на диск сразу после подтверждения.
+
+    JSON Lines — одна группа на строку:
+        {"digest": ..., "size": ..., "files": [{"path", "name", "mtime"}, ...]}
+    CSV — один файл на строку (digest, size, keep, path, mtime),
+    файлы группы идут подряд, первым — сохраняемый.
+
+    Файл пишется в UTF-8 с surrogateescape: имена с байтами не в UTF-8
+    (в Linux os.walk отдаёт их суррогатами) записываются исходными байтами,
+    а не обрывают сканирование ошибкой в on_group.
+    """
+
+    def __init__(self, path, fmt=None):
+        self.path = path
+        self.format = _detect_format(path, fmt)
+        self.groups_written = 0
+        self._file = open(path, 'w', encoding='utf-8', errors='surrogateescape', newline='')
+        self._csv = None
+        if self.format == 'csv':
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(CSV_FIELDS)
+
+    def write_group(self, digest, files):
+        if self.format == 'jsonl':
+            record = {
+                'digest': digest,
+                'size': files[0]['size'],
+                'files': [
+                    {'path': f['path'], 'name': f['name'], 'mtime': f.get('mtime')}
+                    for f in files
+                ],
+            }
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        else:
+            for position, f in enumerate(files):
+                mtime = f.get('mtime')
+                self._csv.writerow([digest, f['size'], int(position == 0), f['path'],
+                                    repr(mtime) if mtime is not None else ''])
+        self._file.flush()
+        self.groups_written += 1
+
+    __call__ = write_group
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def export_result(result, path, fmt=None):
+    """Записывает готовый ScanResult в файл; возвращает число групп"""
+    with ResultExporter(path, fmt) as exporter:
+        for group in result.groups:
+            exporter.write_group(group.digest, group.files)
+    return exporter.groups_written
+
+
+def _iter_jsonl(f):
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        files = [
+            {'path': item['path'], 'name': item.get('name') or os.path.basename(item['path']),
+             'size': record['size'], 'mtime': item.get('mtime')}
+            for item in record['files']
+        ]
+        yield record['digest'], files
+
+
+def _iter_csv(f):
+    digest, files = None, []
+    for row in csv.DictReader(f):
+        if row['digest'] != digest and files:
+            yield digest, files
+            files = []
+        digest = row['digest']
+        files.append({
+            'path': row['path'],
+            'name': os.path.basename(row['path']),
+            'size': int(row['size']),
+            'mtime': float(row['mtime']) if row.get('mtime') else None,
+        })
+    if files:
+        yield digest, files
+
+
+def _is_unchanged(file_info):
+    """Быстрая проверка по stat: размер и mtime совпадают с записью"""
+    try:
+        st = os.stat(file_info['path'])
+    except OSError:
+        return False
+    if st.st_size != file_info['size']:
+        return False
+    mtime = file_info.get('mtime')
+    return mtime is None or abs(st.st_mtime - mtime) <= MTIME_TOLERANCE
+
+
+def load_results(path, fmt=None, verify=True):
+    """
+    Загружает экспортированные группы обратно в ScanResult.
+
+    При verify=True каждый файл перепроверяется через stat (размер и mtime);
+    изменившиеся и пропавшие файлы отбрасываются, а группы, в которых осталось
+    меньше двух файлов, не попадают в результат.
+
+    Returns:
+        tuple: (ScanResult, stale_paths)
+    """
+    logger = get_logger()
+    fmt = _detect_format(path, fmt)
+    groups = []
+    stale = []
+
+    # Тем же обработчиком, что и при записи: исходные байты имён возвращаются суррогатами
+    with open(path, 'r', encoding='utf-8', errors='surrogateescape', newline='') as f:
+        records = _iter_jsonl(f) if fmt == 'jsonl' else _iter_csv(f)
+        for digest, files in records:
+            if verify:
+                fresh = []
+                for file_info in files:
+                    if _is_unchanged(file_info):
+                        fresh.append(file_info)
+                    else:
+                        stale.append(file_info['path'])
+                files = fresh
+            if len(files) > 1:
+                groups.append(DuplicateGroup(digest, files))
+
+    logger.info(f"Загружено групп из {path}: {len(groups)}; устаревших файлов: {len(stale)}")
+    return ScanResult(groups), stale
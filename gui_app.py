@@ -1,109 +1,60 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import threading
+import time
 import os
-import json
+import queue
+from bisect import bisect_right
 from collections import defaultdict
 
-
-# Предполагаемые импорты из внешних модулей
-# from core import find_duplicates
-# from utils import format_size, get_file_priority, delete_files_by_list, TRASH_AVAILABLE
-# from color_utils import lighten_color, get_contrast_color
-# from logger import get_logger
-
-# Заглушки для работы кода без внешних модулей
-def find_duplicates(*args, **kwargs): return {}
-
-
-def format_size(size): return f"{size} B"
-
-
-def get_file_priority(name): return 0
-
-
-def delete_files_by_list(*args, **kwargs): return 0, '0 B', []
-
-
-def lighten_color(hex_color, factor): return hex_color
-
-
-def get_contrast_color(hex_color): return '#000000' if hex_color.upper() in ['#FFFFFF', '#FAFAFA'] else '#FFFFFF'
-
-
-def get_logger(): return type('Logger', (object,),
-                              {'info': lambda *a: None, 'error': lambda *a: None, 'debug': lambda *a: None})()
-
-
-TRASH_AVAILABLE = True
+from ranking import KeepRanker, KEEP_POLICIES, DEFAULT_KEEP_POLICY
+from utils import format_size, format_duration, TRASH_AVAILABLE
+from progress import OperationControl, ProgressChannel, ScanProgress
+from themes import THEMES
+from settings import read_settings, update_settings
+from color_utils import lighten_color, get_contrast_color, color_ramp
+from animation import AnimationClock
+from logger import get_logger
+from models import DeleteSelection, DuplicateGroup, ResultDiff, ScanResult
+from risk import RiskClassifier, RISKY_PATH_KEYWORDS, REGEX_RULE_PREFIX
+from result_cache import DEFAULT_RESULT_CACHE, load_result_cache, save_result_cache, remove_result_cache
 
 # Конфигурация
-MUSIC_EXTENSIONS = ['.mp3', '.flac', '.wav', '.m4a', '.aac', '.ogg', '.wma']
-
-# Список ключевых слов для маркировки рискованных файлов в GUI
-RISKY_PATH_KEYWORDS = [
-    'SteamLibrary',
-    'Program Files',
-    'Program Files (x86)',
-    'Windows',
-    os.path.join('AppData', 'Local'),
-    os.path.join('Users', 'Default'),
-    'Library/Application Support',
-    'System Volume Information'
-]
-
-# gui_app.py
-
-THEMES = {
-    'light': {
-        'bg': '#FAFAFA',
-        'fg': '#111827',
-        'surface': '#FFFFFF',
-        'surface_alt': '#F0F0F0',
-        'primary': '#2563EB',
-        'danger': '#DC2626',  # Оригинальный красный
-        'success': '#059669',  # Глубокий Teal
-        'warning': '#FBBF24',  # Солнечный желтый
-        'border': '#E0E0E0',
-        'text_secondary': '#64748B',
-        'treeview_bg': '#FFFFFF',
-        'treeview_fg': '#111827',
-        'treeview_selected': '#E8F0FF',
-        'hover': '#EEEEEE',
-        'risk_fg': '#92400E',
-        'risk_bg_color': '#FEF3C7',
-
-        # >>> НОВЫЕ ЦВЕТА КНОПОК УДАЛЕНИЯ/ПРЕДПРОСМОТРА
-        'btn_preview': '#8B5CF6',  # Фиолетовый
-        'btn_trash': '#3B82F6',  # Синий
-        'btn_delete': '#EF4444',  # Красный
-        # <<<
-    },
-    'dark': {
-        'bg': '#1E1E1E',
-        'fg': '#E0E0E0',
-        'surface': '#2D2D30',
-        'surface_alt': '#000000',
-        'primary': '#007ACC',
-        'danger': '#F44747',  # Оригинальный яркий красный
-        'success': '#34D399',  # Мятный зеленый
-        'warning': '#FFCC00',  # Яркий желтый
-        'border': '#3E3E42',
-        'text_secondary': '#858585',
-        'treeview_bg': '#252526',
-        'treeview_fg': '#CCCCCC',
-        'treeview_selected': '#094771',
-        'hover': '#383838',
-        'risk_fg': '#FCD34D',
-        'risk_bg_color': '#443C22',
-
-        # >>> НОВЫЕ ЦВЕТА КНОПОК УДАЛЕНИЯ/ПРЕДПРОСМОТРА
-        'btn_preview': '#A78BFA',  # Светло-фиолетовый
-        'btn_trash': '#60A5FA',  # Светло-синий
-        'btn_delete': '#F87171',  # Светло-красный
-        # <<<
-    }
+DEFAULT_RESULTS_DB = 'disktider_results.db'
+# Как часто GUI забирает прогресс удаления из канала
+DELETE_PROGRESS_POLL_MS = 100
+
+# Сколько групп показывать на одной странице результатов
+RESULTS_PAGE_SIZE = 500
+
+# Сколько групп вставлять в Treeview за один тик главного цикла
+TREE_INSERT_CHUNK = 100
+
+# Как часто GUI забирает найденные группы из очереди сканирования и сколько за раз
+SCAN_QUEUE_POLL_MS = 200
+SCAN_QUEUE_BATCH = 500
+
+# Сколько групп читать из базы результатов одним запросом при её открытии
+RESULTS_DB_LOAD_PAGE = 2000
+
+# Пульсация свечения: полный цикл (с) и число оттенков в кэшированной палитре
+GLOW_PERIOD = 2.0
+GLOW_STEPS = 10
+
+# Фильтры результатов: диапазоны размера (байты, включительно) и риск
+SIZE_FILTERS = {
+    'Любой размер': (None, None),
+    'до 1 МБ': (None, 1024 ** 2 - 1),
+    '1–100 МБ': (1024 ** 2, 100 * 1024 ** 2 - 1),
+    '100 МБ – 1 ГБ': (100 * 1024 ** 2, 1024 ** 3 - 1),
+    'от 1 ГБ': (1024 ** 3, None),
+}
+RISK_FILTERS = {
+    'Любой риск': None,
+    'Только риск': True,
+    'Без риска': False,
 }
+MUSIC_EXTENSIONS = ['.mp3', '.flac', '.wav', '.m4a', '.aac', '.ogg', '.wma']
 
 
 class ModernButton(tk.Button):
@@ -113,7 +64,6 @@ class ModernButton(tk.Button):
         self.original_bg = kwargs.get('bg', 'SystemButtonFace')
         self.original_font = kwargs.pop('font', ('Segoe UI', 10))
         self.is_glowing = False
-        self.glow_counter = 0
         super().__init__(
             master,
             relief=tk.FLAT,
@@ -147,35 +97,19 @@ class ModernButton(tk.Button):
     def start_glow(self, start_color, end_color):
         if not self.is_glowing:
             self.is_glowing = True
-            self.glow_start_color = start_color
-            self.glow_end_color = end_color
-            self._animate_glow()
+            self._glow_ramp = color_ramp(start_color, end_color, GLOW_STEPS)
+            AnimationClock.for_widget(self).start(self, self._glow_step)
 
     def stop_glow(self):
         self.is_glowing = False
+        AnimationClock.for_widget(self).stop(self)
         self['bg'] = self.original_bg
-        self.glow_counter = 0
 
-    def _animate_glow(self):
-        if not self.is_glowing:
-            self['bg'] = self.original_bg
-            return
-        self.glow_counter += 1
-        intensity = abs(10 - (self.glow_counter % 20)) / 10
-        color = self._interpolate_color(self.glow_start_color, self.glow_end_color, intensity)
-        self['bg'] = color
-        self.after(100, self._animate_glow)
-
-    def _interpolate_color(self, hex1, hex2, factor):
-        try:
-            r1, g1, b1 = int(hex1[1:3], 16), int(hex1[3:5], 16), int(hex1[5:7], 16)
-            r2, g2, b2 = int(hex2[1:3], 16), int(hex2[3:5], 16), int(hex2[5:7], 16)
-            r = int(r1 + (r2 - r1) * factor)
-            g = int(g1 + (g2 - g1) * factor)
-            b = int(b1 + (b2 - b1) * factor)
-            return f'#{r:02x}{g:02x}{b:02x}'
-        except:
-            return hex1
+    def _glow_step(self, elapsed):
+        color = self._glow_ramp[glow_index(elapsed)]
+        if self['bg'] != color:
+            self['bg'] = color
+        return True
 
     def config(self, **kwargs):
         if 'bg' in kwargs:
@@ -185,6 +119,12 @@ class ModernButton(tk.Button):
         super().config(**kwargs)
 
 
+def glow_index(elapsed):
+    """Индекс в палитре color_ramp(..., GLOW_STEPS) для пульсации туда-обратно"""
+    phase = (elapsed / GLOW_PERIOD) % 1.0
+    return round(abs(1 - 2 * phase) * GLOW_STEPS)
+
+
 class StatusGlow:
     """Класс для анимации свечения статус-бара"""
 
@@ -195,44 +135,33 @@ class StatusGlow:
         self.start_color = start_color
         self.end_color = end_color
         self.is_glowing = False
-        self.counter = 0
+        self._color = None
 
     def start_glow(self):
         if not self.is_glowing:
             self.is_glowing = True
-            self._animate_glow()
+            self._ramp = color_ramp(self.start_color, self.end_color, GLOW_STEPS)
+            AnimationClock.for_widget(self.frame).start(self, self._glow_step)
 
     def stop_glow(self):
         self.is_glowing = False
+        AnimationClock.for_widget(self.frame).stop(self)
+        self._set_color(THEMES[self.app_gui.current_theme]['surface'])
 
-    def _animate_glow(self):
-        if not self.is_glowing:
-            current_theme = THEMES[self.app_gui.current_theme]
-            self.frame.config(bg=current_theme['surface'])
-            for child in self.frame.winfo_children():
-                child.config(bg=current_theme['surface'])
-            return
+    def _glow_step(self, elapsed):
+        self._set_color(self._ramp[glow_index(elapsed)])
+        return True
 
-        self.counter += 1
-        intensity = abs(10 - (self.counter % 20)) / 10
-        color = self._interpolate_color(self.start_color, self.end_color, intensity)
+    def _set_color(self, color):
+        # Оттенок меняется не каждый кадр: виджеты перенастраиваются только при смене цвета
+        if color == self._color:
+            return
+        self._color = color
         self.frame.config(bg=color)
-
         for child in self.frame.winfo_children():
-            child.config(bg=color)
-
-        self.frame.after(100, self._animate_glow)
-
-    def _interpolate_color(self, hex1, hex2, factor):
-        try:
-            r1, g1, b1 = int(hex1[1:3], 16), int(hex1[3:5], 16), int(hex1[5:7], 16)
-            r2, g2, b2 = int(hex2[1:3], 16), int(hex2[3:5], 16), int(hex2[5:7], 16)
-            r = int(r1 + (r2 - r1) * factor)
-            g = int(g1 + (g2 - g1) * factor)
-            b = int(b1 + (b2 - b1) * factor)
-            return f'#{r:02x}{g:02x}{b:02x}'
-        except:
-            return hex1
+            # У ttk-виджетов (полоса прогресса) нет опции bg
+            if not isinstance(child, ttk.Widget):
+                child.config(bg=color)
 
 
 class DiskTiderGUI(tk.Frame):
@@ -241,27 +170,72 @@ class DiskTiderGUI(tk.Frame):
         self.master = master
         self.current_theme = 'light'
         self.theme = THEMES[self.current_theme]
-        self.duplicates_data = {}
-        self.logger = get_logger()
+        self.scan_result = ScanResult()
         self.status_glow = None
         self.status_var = tk.StringVar(value="Готов к работе")
         self.music_var = tk.BooleanVar()
         self.recursive_var = tk.BooleanVar(value=True)
+        self.keep_policy_var = tk.StringVar(value=KEEP_POLICIES[DEFAULT_KEEP_POLICY])
+        self.preferred_prefixes = []
+        self.results_db_path = DEFAULT_RESULTS_DB
+        self.reflink_fallback = 'hardlink'
+        # Правила риска (подстроки пути или 're:выражение'), редактируются пользователем
+        self.risk_rules = list(RISKY_PATH_KEYWORDS)
+        self.risk_classifier = RiskClassifier(self.risk_rules)
+        self.last_journal_path = None
+        # Снимок последнего результата для быстрого старта; results_stale — показан
+        # снимок, который ещё не перепроверяли; cache_stamp — штамп показанного
+        # результата (корень, параметры и время сканирования)
+        self.result_cache_path = DEFAULT_RESULT_CACHE
+        self.results_stale = False
+        self.cache_stamp = None
+        # Отметки к удалению живут в модели, Treeview их только отображает:
+        # строки файлов создаются лишь при раскрытии группы
+        self.selection = DeleteSelection()
+        self.results_page = 0
+        # Фильтр результатов: номера подходящих файлов FilterIndex (None — без фильтра)
+        # и группы, которые с ним показываются постранично
+        self.filter_ids = None
+        self.visible_groups = []
+        self.filter_ext_var = tk.StringVar()
+        self.filter_prefix_var = tk.StringVar()
+        self.filter_size_var = tk.StringVar(value=next(iter(SIZE_FILTERS)))
+        self.filter_risk_var = tk.StringVar(value=next(iter(RISK_FILTERS)))
+        self._tree_generation = 0
+        self._tree_groups = {}
+        # id строки файла -> (группа, позиция в группе)
+        self._tree_rows = {}
+        # Очередь «поток сканирования → Tk»: ('group', DuplicateGroup) и итоговые сообщения
+        self.scan_queue = queue.SimpleQueue()
+        self.scan_progress = ScanProgress()
+        self._live_groups = []
+        self._live_keys = []
+        self._live_wasted = 0
+        # Прежний результат при повторном сканировании: новый сравнивается с ним
+        # (ResultDiff) и дерево обновляется на месте, а не строится заново
+        self._refresh_base = None
         self.permission_errors = 0
 
         self.is_scanning = False
         self.is_deleting = False
-        self.scan_cancelled = False
+        self.operation_control = OperationControl()
+        self.delete_progress = ProgressChannel()
         self.operation_lock = threading.Lock()
 
         self._apply_theme()
         self.pack(fill="both", expand=True)
         self._create_widgets()
         self.load_settings()
+        self.after(0, self._start_warm_load)
+
+    @property
+    def logger(self):
+        # Логгер и его поток записи создаются при первом сообщении, а не при открытии окна
+        return get_logger()
 
     def is_operation_cancelled(self):
-        """Проверяет, нужно ли отменить текущую операцию"""
-        return self.scan_cancelled
+        """Проверяет, нужно ли отменить текущую операцию (во время паузы — ждёт)"""
+        return self.operation_control.checkpoint()
 
     def _lighten_color(self, hex_color, factor):
         return lighten_color(hex_color, factor)
@@ -279,13 +253,15 @@ class DiskTiderGUI(tk.Frame):
             return hex_color
 
     def _check_file_risk(self, filepath):
-        """Проверяет, находится ли файл в рискованной системной/программной папке."""
-        filepath_lower = filepath.lower().replace(os.sep, '/')
-        for keyword in RISKY_PATH_KEYWORDS:
-            keyword_lower = keyword.lower().replace(os.sep, '/')
-            if keyword_lower in filepath_lower:
-                return 'RISK'
-        return 'SAFE'
+        """
+        Проверяет, находится ли файл в рискованной системной/программной папке.
+        Для файлов результата берётся готовая разметка модели; классификатор
+        вызывается только для групп, показанных до конца сканирования.
+        """
+        result = self.scan_result
+        if result.risky is not None and filepath in result.path_index:
+            return 'RISK' if filepath in result.risky else 'SAFE'
+        return 'RISK' if self.risk_classifier.is_risky(filepath) else 'SAFE'
 
     def _apply_theme(self):
         self.master.configure(bg=self.theme['bg'])
@@ -499,6 +475,15 @@ class DiskTiderGUI(tk.Frame):
         )
         browse_button.pack(side="left")
 
+        open_results_button = ModernButton(
+            dir_input_frame,
+            text="🗄 Открыть результаты",
+            bg=self.theme['primary'],
+            fg='#FFFFFF',
+            command=self._open_results_db
+        )
+        open_results_button.pack(side="left", padx=(5, 0))
+
         # Опции сканирования
         options_section = tk.Frame(self, bg=self.theme['bg'])
         options_section.pack(fill="x", padx=20, pady=10)
@@ -535,6 +520,24 @@ class DiskTiderGUI(tk.Frame):
         )
         recursive_check.pack(side="left")
 
+        keep_policy_label = tk.Label(
+            options_section,
+            text="Оставлять:",
+            font=('Segoe UI', 10),
+            bg=self.theme['bg'],
+            fg=self.theme['fg']
+        )
+        keep_policy_label.pack(side="left", padx=(20, 5))
+
+        keep_policy_box = ttk.Combobox(
+            options_section,
+            textvariable=self.keep_policy_var,
+            values=list(KEEP_POLICIES.values()),
+            state='readonly',
+            width=28
+        )
+        keep_policy_box.pack(side="left")
+
         # Кнопки Сканировать/Отменить
         button_container = tk.Frame(options_section, bg=self.theme['bg'])
         button_container.pack(side="right")
@@ -548,6 +551,15 @@ class DiskTiderGUI(tk.Frame):
         )
         self.scan_button.pack(side="left", padx=(0, 5))
 
+        self.estimate_button = ModernButton(
+            button_container,
+            text="📈 Оценка",
+            bg=self.theme['primary'],
+            fg='#FFFFFF',
+            command=self._start_estimate_thread
+        )
+        self.estimate_button.pack(side="left", padx=(0, 5))
+
         self.cancel_button = ModernButton(
             button_container,
             text="⏹ Отменить",
@@ -556,7 +568,17 @@ class DiskTiderGUI(tk.Frame):
             command=self._cancel_operation,
             state=tk.DISABLED
         )
-        self.cancel_button.pack(side="left")
+        self.cancel_button.pack(side="left", padx=(0, 5))
+
+        self.pause_button = ModernButton(
+            button_container,
+            text="⏸ Пауза",
+            bg=self.theme['primary'],
+            fg='#FFFFFF',
+            command=self._toggle_pause,
+            state=tk.DISABLED
+        )
+        self.pause_button.pack(side="left")
 
         separator2 = tk.Frame(self, height=1, bg=self.theme['border'])
         separator2.pack(fill="x", padx=20, pady=15)
@@ -571,6 +593,168 @@ class DiskTiderGUI(tk.Frame):
         )
         results_label.pack(anchor="w", padx=20, pady=(0, 5))
 
+        # Панель фильтра: расширение, папка, размер, риск и массовые отметки
+        filter_frame = tk.Frame(self, bg=self.theme['bg'])
+        filter_frame.pack(fill="x", padx=20, pady=(0, 5))
+
+        filter_ext_label = tk.Label(
+            filter_frame,
+            text="Расширение:",
+            font=('Segoe UI', 9),
+            bg=self.theme['bg'],
+            fg=self.theme['fg']
+        )
+        filter_ext_label.pack(side="left")
+
+        filter_ext_entry = tk.Entry(
+            filter_frame,
+            textvariable=self.filter_ext_var,
+            width=8,
+            font=('Segoe UI', 9),
+            bg=self.theme['surface'],
+            fg=self.theme['fg'],
+            insertbackground=self.theme['fg'],
+            relief='flat',
+            highlightthickness=1,
+            highlightbackground=self.theme['border'],
+            highlightcolor=self.theme['primary']
+        )
+        filter_ext_entry.pack(side="left", ipady=3, padx=(5, 10))
+        filter_ext_entry.bind('<Return>', self._on_filter_changed)
+
+        filter_prefix_label = tk.Label(
+            filter_frame,
+            text="Папка:",
+            font=('Segoe UI', 9),
+            bg=self.theme['bg'],
+            fg=self.theme['fg']
+        )
+        filter_prefix_label.pack(side="left")
+
+        filter_prefix_entry = tk.Entry(
+            filter_frame,
+            textvariable=self.filter_prefix_var,
+            font=('Segoe UI', 9),
+            bg=self.theme['surface'],
+            fg=self.theme['fg'],
+            insertbackground=self.theme['fg'],
+            relief='flat',
+            highlightthickness=1,
+            highlightbackground=self.theme['border'],
+            highlightcolor=self.theme['primary']
+        )
+        filter_prefix_entry.pack(side="left", fill="x", expand=True, ipady=3, padx=(5, 10))
+        filter_prefix_entry.bind('<Return>', self._on_filter_changed)
+
+        filter_size_box = ttk.Combobox(
+            filter_frame,
+            textvariable=self.filter_size_var,
+            values=list(SIZE_FILTERS),
+            state='readonly',
+            width=14
+        )
+        filter_size_box.pack(side="left", padx=(0, 5))
+        filter_size_box.bind('<<ComboboxSelected>>', self._on_filter_changed)
+
+        filter_risk_box = ttk.Combobox(
+            filter_frame,
+            textvariable=self.filter_risk_var,
+            values=list(RISK_FILTERS),
+            state='readonly',
+            width=12
+        )
+        filter_risk_box.pack(side="left", padx=(0, 10))
+        filter_risk_box.bind('<<ComboboxSelected>>', self._on_filter_changed)
+
+        filter_button = ModernButton(
+            filter_frame,
+            text="🔍 Найти",
+            bg=self.theme['primary'],
+            fg='#FFFFFF',
+            command=self._on_filter_changed
+        )
+        filter_button.pack(side="left", padx=(0, 5))
+
+        reset_filter_button = ModernButton(
+            filter_frame,
+            text="✕ Сбросить",
+            bg=self.theme['primary'],
+            fg='#FFFFFF',
+            command=self._reset_filter
+        )
+        reset_filter_button.pack(side="left", padx=(0, 5))
+
+        mark_delete_button = ModernButton(
+            filter_frame,
+            text="Отметить к удалению",
+            bg=self.theme['danger'],
+            fg='#FFFFFF',
+            command=lambda: self._mark_filtered(True)
+        )
+        mark_delete_button.pack(side="left", padx=(0, 5))
+
+        mark_keep_button = ModernButton(
+            filter_frame,
+            text="Оставить",
+            bg=self.theme['success'],
+            fg='#FFFFFF',
+            command=lambda: self._mark_filtered(False)
+        )
+        mark_keep_button.pack(side="left", padx=(0, 5))
+
+        risk_rules_button = ModernButton(
+            filter_frame,
+            text="⚠ Правила риска",
+            bg=self.theme['primary'],
+            fg='#FFFFFF',
+            command=self._edit_risk_rules
+        )
+        risk_rules_button.pack(side="left")
+
+        # Постраничная навигация: в Treeview одновременно только одна страница групп
+        page_frame = tk.Frame(self, bg=self.theme['bg'])
+        page_frame.pack(fill="x", padx=20, pady=(0, 5))
+
+        self.prev_page_button = ModernButton(
+            page_frame,
+            text="◀",
+            bg=self.theme['primary'],
+            fg='#FFFFFF',
+            command=lambda: self._render_page(self.results_page - 1),
+            state=tk.DISABLED
+        )
+        self.prev_page_button.pack(side="left")
+
+        self.page_var = tk.StringVar(value="")
+        page_label = tk.Label(
+            page_frame,
+            textvariable=self.page_var,
+            font=('Segoe UI', 9),
+            bg=self.theme['bg'],
+            fg=self.theme['fg']
+        )
+        page_label.pack(side="left", padx=10)
+
+        self.next_page_button = ModernButton(
+            page_frame,
+            text="▶",
+            bg=self.theme['primary'],
+            fg='#FFFFFF',
+            command=lambda: self._render_page(self.results_page + 1),
+            state=tk.DISABLED
+        )
+        self.next_page_button.pack(side="left")
+
+        self.revalidate_button = ModernButton(
+            page_frame,
+            text="↻ Перепроверить",
+            bg=self.theme['primary'],
+            fg='#FFFFFF',
+            command=self._start_revalidate_thread,
+            state=tk.DISABLED
+        )
+        self.revalidate_button.pack(side="right")
+
         # Treeview с результатами
         self.tree_container = tk.Frame(self, bg=self.theme['border'], borderwidth=1, relief='solid')
         self.tree_container.pack(fill="both", expand=True, padx=20, pady=(0, 10))
@@ -601,6 +785,7 @@ class DiskTiderGUI(tk.Frame):
         self.tree.column('Path', width=450, minwidth=200)
 
         self.tree.bind('<Double-1>', self._toggle_status)
+        self.tree.bind('<<TreeviewOpen>>', self._on_group_open)
         self.tree.tag_configure('keep', foreground=self.theme['success'])
         self.tree.tag_configure('delete', foreground=self.theme['danger'])
         self.tree.tag_configure('group', font=('Segoe UI', 10, 'bold'))
@@ -668,7 +853,44 @@ class DiskTiderGUI(tk.Frame):
             command=lambda: self._start_delete_thread(mode='delete'),
             state=tk.DISABLED
         )
-        self.delete_button.pack(side="left")
+        self.delete_button.pack(side="left", padx=(0, 5))
+
+        self.hardlink_button = ModernButton(
+            delete_buttons_frame,
+            text="🔗 Заменить ссылками",
+            bg=self.theme['primary'],
+            fg='#FFFFFF',
+            font=('Segoe UI', 10, 'bold'),
+            command=lambda: self._start_delete_thread(mode='hardlink'),
+            state=tk.DISABLED
+        )
+        self.hardlink_button.pack(side="left", padx=(0, 5))
+
+        self.reflink_button = ModernButton(
+            delete_buttons_frame,
+            text="🧬 Клонировать (reflink)",
+            bg=self.theme['primary'],
+            fg='#FFFFFF',
+            font=('Segoe UI', 10, 'bold'),
+            command=lambda: self._start_delete_thread(mode='reflink'),
+            state=tk.DISABLED
+        )
+        self.reflink_button.pack(side="left", padx=(0, 5))
+
+        self.undo_button = ModernButton(
+            delete_buttons_frame,
+            text="↩ Отменить удаление",
+            bg=self.theme['primary'],
+            fg='#FFFFFF',
+            font=('Segoe UI', 10, 'bold'),
+            command=self._start_undo_thread,
+            state=tk.DISABLED
+        )
+        self.undo_button.pack(side="left")
+
+        self.delete_buttons = [self.preview_button, self.delete_button, self.hardlink_button, self.reflink_button]
+        if TRASH_AVAILABLE:
+            self.delete_buttons.append(self.trash_button)
         # <<<
 
         # Статус-бар
@@ -676,6 +898,10 @@ class DiskTiderGUI(tk.Frame):
         status_frame.pack(fill="x", side="bottom")
         status_frame.pack_propagate(False)
 
+        # Ход сканирования: бегущая полоса на этапе обхода, проценты — на этапе хеширования
+        self.progress_bar = ttk.Progressbar(status_frame, length=180, mode='determinate', maximum=100)
+        self.progress_bar.pack(side="right", padx=10, pady=7)
+
         status_label = tk.Label(
             status_frame,
             textvariable=self.status_var,
@@ -693,43 +919,87 @@ class DiskTiderGUI(tk.Frame):
             self.theme['primary']
         )
 
+    def _set_delete_buttons_state(self, state):
+        """Включает/выключает все кнопки режимов удаления"""
+        for button in self.delete_buttons:
+            button.config(state=state)
+
+    def _set_operation_buttons_state(self, state):
+        """Включает/выключает кнопки отмены и паузы текущей операции"""
+        self.cancel_button.config(state=state)
+        self.pause_button.config(text="⏸ Пауза", state=state)
+
     def _cancel_operation(self):
-        """Отменяет текущую операцию сканирования"""
-        if self.is_scanning:
-            self.scan_cancelled = True
+        """Отменяет текущую операцию сканирования или удаления"""
+        if self.is_scanning or self.is_deleting:
+            self.operation_control.cancel()
             self.status_var.set("⏹ Отмена операции...")
             self.logger.info("Пользователь запросил отмену операции")
-            self.cancel_button.config(state=tk.DISABLED)
+            self._set_operation_buttons_state(tk.DISABLED)
+
+    def _toggle_pause(self):
+        """Приостанавливает или продолжает текущую операцию"""
+        if not (self.is_scanning or self.is_deleting):
+            return
+        if self.operation_control.paused:
+            self.operation_control.resume()
+            self.pause_button.config(text="⏸ Пауза")
+            self.status_var.set("▶ Операция продолжается...")
+            self.logger.info("Пользователь продолжил операцию")
+        else:
+            self.operation_control.pause()
+            self.pause_button.config(text="▶ Продолжить")
+            self.status_var.set("⏸ Операция приостановлена")
+            self.logger.info("Пользователь приостановил операцию")
 
     def save_settings(self):
         settings = {
             'music_filter': self.music_var.get(),
             'recursive_scan': self.recursive_var.get(),
-            'last_directory': self.dir_entry.get()
+            'last_directory': self.dir_entry.get(),
+            'keep_policy': self._get_keep_policy(),
+            'preferred_prefixes': self.preferred_prefixes,
+            'results_db': self.results_db_path,
+            'reflink_fallback': self.reflink_fallback,
+            'risk_rules': self.risk_rules
         }
         try:
-            with open('settings.json', 'w') as f:
-                json.dump(settings, f)
+            update_settings(settings)
         except Exception as e:
             self.logger.error(f"Не удалось сохранить настройки: {e}")
 
     def load_settings(self):
         try:
-            with open('settings.json', 'r') as f:
-                settings = json.load(f)
-                self.music_var.set(settings.get('music_filter', False))
-                self.recursive_var.set(settings.get('recursive_scan', True))
-                if settings.get('last_directory'):
-                    self.dir_entry.delete(0, tk.END)
-                    self.dir_entry.insert(0, settings.get('last_directory'))
-        except FileNotFoundError:
-            default_dir = os.path.expanduser('~')
-            self.dir_entry.insert(0, default_dir)
+            settings = read_settings()
+            self.music_var.set(settings.get('music_filter', False))
+            self.recursive_var.set(settings.get('recursive_scan', True))
+            policy = settings.get('keep_policy', DEFAULT_KEEP_POLICY)
+            self.keep_policy_var.set(KEEP_POLICIES.get(policy, KEEP_POLICIES[DEFAULT_KEEP_POLICY]))
+            self.preferred_prefixes = settings.get('preferred_prefixes', [])
+            self.results_db_path = settings.get('results_db', DEFAULT_RESULTS_DB)
+            self.reflink_fallback = settings.get('reflink_fallback', 'hardlink')
+            try:
+                self._set_risk_rules(settings.get('risk_rules', RISKY_PATH_KEYWORDS))
+            except ValueError as e:
+                self.logger.warning(f"Правила риска из настроек не применены: {e}")
+            if settings.get('last_directory'):
+                self.dir_entry.delete(0, tk.END)
+                self.dir_entry.insert(0, settings.get('last_directory'))
+            else:
+                self.dir_entry.insert(0, os.path.expanduser('~'))
         except Exception as e:
             self.logger.error(f"Не удалось загрузить настройки: {e}")
             default_dir = os.path.expanduser('~')
             self.dir_entry.insert(0, default_dir)
 
+    def _get_keep_policy(self):
+        """Возвращает ключ политики сохранения, выбранной в выпадающем списке"""
+        label = self.keep_policy_var.get()
+        for policy, policy_label in KEEP_POLICIES.items():
+            if policy_label == label:
+                return policy
+        return DEFAULT_KEEP_POLICY
+
     def _browse_directory(self):
         directory = filedialog.askdirectory(title="Выберите папку для сканирования")
         if directory:
@@ -752,7 +1022,7 @@ class DiskTiderGUI(tk.Frame):
                 return
 
             self.is_scanning = True
-            self.scan_cancelled = False
+            self.operation_control = OperationControl()
 
         self.logger.info(f"GUI: Запуск сканирования для директории: {directory}")
         self.status_var.set("🔍 Сканирование (Этап 1: по размеру)...")
@@ -762,201 +1032,879 @@ class DiskTiderGUI(tk.Frame):
 
         self.scan_button.config(text="⏳ Сканирование...", state=tk.DISABLED)
         self.scan_button.start_glow(self.theme['success'], self._lighten_color(self.theme['success'], 0.2))
+        self.estimate_button.config(state=tk.DISABLED)
 
-        self.cancel_button.config(state=tk.NORMAL)
+        self._set_operation_buttons_state(tk.NORMAL)
 
-        self.delete_button.config(state=tk.DISABLED)
-        if hasattr(self, 'preview_button'):
-            self.preview_button.config(state=tk.DISABLED)
-        if hasattr(self, 'trash_button'):
-            self.trash_button.config(state=tk.DISABLED)
+        self._set_delete_buttons_state(tk.DISABLED)
 
-        self.tree.delete(*self.tree.get_children())
+        # Повторное сканирование обновит показанный результат на месте, поэтому
+        # прежние строки и отметки остаются на экране до его окончания
+        self._refresh_base = self.scan_result if self.scan_result else None
+        if self._refresh_base is None:
+            self._clear_tree()
+            self.selection = DeleteSelection()
+        self._live_groups = []
+        self._live_keys = []
+        self._live_wasted = 0
 
         extensions = MUSIC_EXTENSIONS if self.music_var.get() else None
         recursive = self.recursive_var.get()
+        ranker = KeepRanker(self._get_keep_policy(), self.preferred_prefixes)
 
+        # Своя очередь и счётчики на каждое сканирование: прошлый запуск их не заденет
+        self.scan_queue = queue.SimpleQueue()
+        self.scan_progress = ScanProgress()
+        self.progress_bar.config(mode='indeterminate', value=0)
+        self.progress_bar.start(15)
         scan_thread = threading.Thread(
             target=self._run_scan,
-            args=(directory, extensions, recursive),
+            args=(directory, extensions, recursive, ranker, self.scan_queue, self.scan_progress),
             daemon=True
         )
         scan_thread.start()
+        self.master.after(SCAN_QUEUE_POLL_MS, self._drain_scan_queue, self.scan_queue)
+        self.save_settings()
+
+    def _open_results_db(self):
+        """Открывает сохранённую базу результатов без повторного сканирования"""
+        path = filedialog.askopenfilename(
+            title="Открыть результаты сканирования",
+            initialfile=self.results_db_path,
+            filetypes=[("База результатов DiskTider", "*.db"), ("Все файлы", "*.*")]
+        )
+        if not path:
+            return
+
+        with self.operation_lock:
+            if self.is_scanning or self.is_deleting:
+                messagebox.showwarning(
+                    "Операция выполняется",
+                    "Дождитесь завершения текущей операции"
+                )
+                return
+            # Загрузка, как и сканирование, заменяет результат
+            self.is_scanning = True
+            self.operation_control = OperationControl()
+
+        self.status_var.set("📂 Открытие базы результатов...")
+        self.scan_button.config(state=tk.DISABLED)
+        self.estimate_button.config(state=tk.DISABLED)
+        self._set_delete_buttons_state(tk.DISABLED)
+        self._set_operation_buttons_state(tk.NORMAL)
+
+        # Группы приходят через ту же очередь, что и при сканировании: первая
+        # страница видна после первого запроса к базе, а не после загрузки всей
+        self._refresh_base = None
+        self._clear_tree()
+        self.selection = DeleteSelection()
+        self.permission_errors = 0
+        self._live_groups = []
+        self._live_keys = []
+        self._live_wasted = 0
+        self.scan_queue = queue.SimpleQueue()
+        self.scan_progress = None
+        threading.Thread(target=self._run_open_results_db, args=(path, self.scan_queue), daemon=True).start()
+        self.master.after(SCAN_QUEUE_POLL_MS, self._drain_scan_queue, self.scan_queue)
+
+    def _run_open_results_db(self, path, scan_queue):
+        """Читает базу результатов страницами query_groups (по убыванию лишнего места)"""
+        from results_db import ResultsDB
+
+        try:
+            with ResultsDB(path) as db:
+                info = db.scan_info() or {}
+                if info.get('root'):
+                    self.master.after(0, self._set_directory, info['root'])
+                groups = []
+                while True:
+                    if self.operation_control.cancelled:
+                        scan_queue.put(('cancelled', None))
+                        return
+                    page = db.query_groups(limit=RESULTS_DB_LOAD_PAGE, offset=len(groups))
+                    if not page:
+                        break
+                    for group in page:
+                        scan_queue.put(('group', group))
+                    groups.extend(page)
+
+            result = ScanResult(groups)
+            result.classify_risk(self.risk_classifier)
+            result.filter_index()
+            self.logger.info(f"GUI: Открыта база результатов {path}")
+            scan_queue.put(('done', result))
+        except Exception as e:
+            self.logger.error(f"Не удалось открыть базу результатов {path}: {e}")
+            scan_queue.put(('error', f"Не удалось открыть базу результатов:\n{e}"))
+        finally:
+            with self.operation_lock:
+                self.is_scanning = False
+
+    def _set_directory(self, directory):
+        self.dir_entry.delete(0, tk.END)
+        self.dir_entry.insert(0, directory)
+
+    def _start_estimate_thread(self):
+        """Запускает быструю статистическую оценку дубликатов"""
+        directory = self.dir_entry.get().strip()
+
+        if not directory or not os.path.isdir(directory):
+            messagebox.showerror("Ошибка", "Укажите корректную папку для сканирования")
+            return
+
+        with self.operation_lock:
+            if self.is_scanning or self.is_deleting:
+                messagebox.showwarning(
+                    "Операция выполняется",
+                    "Дождитесь завершения текущей операции"
+                )
+                return
+
+            self.is_scanning = True
+            self.operation_control = OperationControl()
+
+        self.logger.info(f"GUI: Запуск оценки для директории: {directory}")
+        self.status_var.set("📈 Оценка дубликатов по выборке...")
+
+        if self.status_glow:
+            self.status_glow.start_glow()
+
+        self.scan_button.config(state=tk.DISABLED)
+        self.estimate_button.config(state=tk.DISABLED)
+        self._set_operation_buttons_state(tk.NORMAL)
+
+        extensions = MUSIC_EXTENSIONS if self.music_var.get() else None
+        recursive = self.recursive_var.get()
+
+        estimate_thread = threading.Thread(
+            target=self._run_estimate,
+            args=(directory, extensions, recursive),
+            daemon=True
+        )
+        estimate_thread.start()
         self.save_settings()
 
-    def _run_scan(self, directory, extensions, recursive):
+    def _run_estimate(self, directory, extensions, recursive):
+        from estimator import estimate_reclaimable
+
+        self.permission_errors = 0
+        try:
+            estimate = estimate_reclaimable(
+                directory,
+                extensions,
+                recursive,
+                gui=self,
+                cancel_flag=self.is_operation_cancelled
+            )
+            self.master.after(0, lambda: self._show_estimate(estimate))
+        except Exception as error:
+            self.logger.error(f"ПОТОК: Ошибка оценки: {error}")
+            self.master.after(0, lambda err=error: self._show_error("Ошибка оценки", str(err)))
+        finally:
+            with self.operation_lock:
+                self.is_scanning = False
+
+    def _show_estimate(self, estimate):
+        if self.status_glow:
+            self.status_glow.stop_glow()
+
+        self.scan_button.config(state=tk.NORMAL)
+        self.estimate_button.config(state=tk.NORMAL)
+        self._set_operation_buttons_state(tk.DISABLED)
+
+        if estimate is None:
+            self.status_var.set("⏹ Оценка отменена пользователем")
+            return
+
+        if estimate['full_sample']:
+            status_text = f"📈 Оценка: ~{format_size(estimate['estimate'])} можно освободить (по частичным хешам)"
+        else:
+            status_text = (
+                f"📈 Оценка: ~{format_size(estimate['estimate'])} можно освободить "
+                f"({int(estimate['confidence'] * 100)}%: {format_size(estimate['low'])} – {format_size(estimate['high'])})"
+            )
+        status_text += f" • {estimate['candidate_files']} кандидатов из {estimate['files_total']} файлов"
+        if self.permission_errors > 0:
+            status_text += f" | ⚠ {self.permission_errors} файлов пропущено"
+        self.status_var.set(status_text)
+
+    def _run_scan(self, directory, extensions, recursive, ranker, scan_queue, progress):
+        # Конвейер сканирования импортируется при первом запуске, а не при старте окна
+        from core import find_duplicates
+        from metrics import ScanMetrics
+        from results_db import ResultsDB
+
         self.logger.info(f"ПОТОК: Сканирование начато. Директория: {directory}, Рекурсивное: {recursive}")
         self.permission_errors = 0
+        risk_classifier = self.risk_classifier
 
+        def on_group(digest, files):
+            db.add_group(digest, files)
+            scan_queue.put(('group', DuplicateGroup(digest, files)))
+
+        db = None
         try:
+            # База пишется в потоке сканирования: соединение SQLite привязано к потоку
+            options = {
+                'extensions': extensions,
+                'recursive': recursive,
+                'keep_policy': ranker.policy,
+            }
+            db = ResultsDB.create(self.results_db_path, directory, options)
+            metrics = ScanMetrics(run={'directory': directory, 'keep_policy': ranker.policy})
             duplicates = find_duplicates(
                 directory,
                 extensions,
                 recursive,
                 gui=self,
-                cancel_flag=self.is_operation_cancelled
+                cancel_flag=self.is_operation_cancelled,
+                ranker=ranker,
+                on_group=on_group,
+                on_error=db.add_error,
+                metrics=metrics,
+                progress=progress
             )
 
-            if self.scan_cancelled:
+            if self.operation_control.cancelled:
                 self.logger.info("ПОТОК: Сканирование отменено")
-                self.master.after(0, lambda: self._show_scan_cancelled())
+                # Неполная база не должна выглядеть завершённым результатом
+                db.discard()
+                db = None
+                scan_queue.put(('cancelled', None))
             else:
+                db.finish()
                 self.logger.info(f"ПОТОК: Сканирование завершено. Найдено групп: {len(duplicates)}")
-                self.master.after(0, lambda: self._show_results(duplicates))
+                result = ScanResult.from_duplicates(duplicates, metrics=metrics.summary())
+                # Разметка риска и индекс фильтра строятся здесь, а не в потоке Tk
+                result.classify_risk(risk_classifier)
+                result.filter_index()
+                self.cache_stamp = {'root': directory, 'options': options, 'scanned': time.time()}
+                try:
+                    save_result_cache(result, directory, options, self.result_cache_path,
+                                      scanned=self.cache_stamp['scanned'])
+                except OSError as e:
+                    self.logger.warning(f"Не удалось сохранить снимок результатов: {e}")
+                scan_queue.put(('done', result))
 
         except Exception as error:
             self.logger.error(f"ПОТОК: Критическая ошибка сканирования: {error}")
-            self.master.after(0, lambda err=error: self._show_error("Ошибка сканирования (Поток)", str(err)))
+            if db:
+                db.discard()
+                db = None
+            scan_queue.put(('error', str(error)))
         finally:
+            if db:
+                db.close()
             with self.operation_lock:
                 self.is_scanning = False
 
+    def _drain_scan_queue(self, scan_queue):
+        """
+        Забирает из очереди сканирования найденные группы (не больше
+        SCAN_QUEUE_BATCH за тик) и показывает их по ходу сканирования.
+        Итоговое сообщение ('done', 'cancelled' или 'error') завершает опрос.
+        """
+        if scan_queue is not self.scan_queue:
+            return
+
+        for _ in range(SCAN_QUEUE_BATCH):
+            try:
+                kind, payload = scan_queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'group':
+                self._add_live_group(payload)
+            elif kind == 'done':
+                self._show_results(payload, reset_selection=False)
+                return
+            elif kind == 'cancelled':
+                self._show_scan_cancelled()
+                return
+            else:
+                self._show_error("Ошибка сканирования (Поток)", payload)
+                return
+
+        if self.scan_progress is None:
+            # Открытие базы результатов: счётчиков сканирования нет
+            self.status_var.set(f"📂 Загрузка базы результатов • групп {len(self._live_groups)}")
+        elif not self.operation_control.paused:
+            self._show_scan_progress(self.scan_progress.snapshot())
+        if self._refresh_base is not None:
+            self.page_var.set(f"Обновление: найдено групп {len(self._live_groups)} • на экране прежний результат")
+        elif self._live_groups:
+            shown = min(len(self._live_groups), RESULTS_PAGE_SIZE)
+            self.page_var.set(f"Найдено групп: {len(self._live_groups)} • показаны {shown} крупнейших")
+        self.master.after(SCAN_QUEUE_POLL_MS, self._drain_scan_queue, scan_queue)
+
+    def _show_scan_progress(self, progress):
+        """Показывает ход сканирования в статус-баре и на индикаторе"""
+        if progress['stage'] == 'traversal':
+            self.status_var.set(
+                f"🔍 Этап 1: обход • папок {progress['dirs_visited']} • файлов {progress['files_seen']} • "
+                f"{progress['files_per_sec']:.0f} файлов/с"
+            )
+            return
+
+        if str(self.progress_bar.cget('mode')) != 'determinate':
+            self.progress_bar.stop()
+            self.progress_bar.config(mode='determinate')
+        fraction = progress['fraction'] or 0.0
+        self.progress_bar.config(value=fraction * 100)
+
+        status_text = (
+            f"🔍 Этап 2: хеширование {fraction:.0%} • "
+            f"{progress['files_done']}/{progress['candidate_files']} файлов • "
+            f"{progress['files_per_sec']:.0f} файлов/с • {format_size(progress['bytes_per_sec'])}/с"
+        )
+        if progress['eta'] is not None:
+            status_text += f" • осталось ~{format_duration(progress['eta'])}"
+        if self._live_groups:
+            status_text += f" • найдено {len(self._live_groups)} групп ({format_size(self._live_wasted)})"
+        self.status_var.set(status_text)
+
+    def _reset_progress_bar(self):
+        self.progress_bar.stop()
+        self.progress_bar.config(mode='determinate', value=0)
+
+    def _add_live_group(self, group):
+        """Вставляет группу на своё место по лишнему месту (крупнейшие выше) в первую страницу"""
+        key = -group.wasted_bytes
+        position = bisect_right(self._live_keys, key)
+        self._live_keys.insert(position, key)
+        self._live_groups.insert(position, group)
+        self._live_wasted += group.wasted_bytes
+
+        # При обновлении на экране прежний результат: группы только считаются
+        if self._refresh_base is not None:
+            return
+        self.selection.add_group(group)
+        if position >= RESULTS_PAGE_SIZE:
+            return
+        group_id = self._insert_group_row(group, "Группа", position)
+        self._tree_groups[group_id] = group
+        if len(self._live_groups) > RESULTS_PAGE_SIZE:
+            # Последняя строка страницы вытеснена более крупной группой
+            last_id = self.tree.get_children()[-1]
+            self.tree.delete(last_id)
+            self._tree_groups.pop(last_id, None)
+
     def _show_scan_cancelled(self):
         """Обработка отменённого сканирования"""
+        self._reset_progress_bar()
         if self.status_glow:
             self.status_glow.stop_glow()
 
         self.scan_button.stop_glow()
         self.scan_button.config(text="▶ Сканировать", state=tk.NORMAL)
-        self.cancel_button.config(state=tk.DISABLED)
+        self.estimate_button.config(state=tk.NORMAL)
+        self._set_operation_buttons_state(tk.DISABLED)
 
         self.status_var.set("⏹ Сканирование отменено пользователем")
-        self.tree.delete(*self.tree.get_children())
-
-    def _show_results(self, duplicates):
-        self.logger.info(f"GUI: Получены результаты. Групп дубликатов: {len(duplicates)}")
-        self.tree.delete(*self.tree.get_children())
-        self.duplicates_data = duplicates
-
-        total_duplicates = 0
-        total_space = 0
-
-        if duplicates:
-            self.logger.debug("GUI: Заполнение Treeview дубликатами")
-
-            # Сортировка групп по размеру
-            processed_groups = []
-            for file_hash, files in duplicates.items():
-                files_sorted_by_priority = sorted(files, key=lambda x: get_file_priority(x['name']))
-                keep_size = files_sorted_by_priority[0]['size'] if files_sorted_by_priority else 0
-                processed_groups.append((file_hash, files, keep_size))
-
-            processed_groups.sort(key=lambda x: x[2], reverse=True)
-
-            for i, (file_hash, files, keep_size) in enumerate(processed_groups, 1):
-                files_sorted = sorted(files, key=lambda x: get_file_priority(x['name']))
-
-                group_size = format_size(files_sorted[0]['size'])
-                wasted_space = files_sorted[0]['size'] * (len(files_sorted) - 1)
-                total_space += wasted_space
-
-                group_id = self.tree.insert(
-                    '',
-                    tk.END,
-                    text=f"Группа {i}",
-                    values=('', '', group_size, f"{len(files_sorted)} файлов • {format_size(wasted_space)} лишнего"),
-                    tags=('group',),
-                    open=False
-                )
-
-                for j, file_info in enumerate(files_sorted):
-                    status = "Сохранить" if j == 0 else "Удалить"
-                    tag_status = 'keep' if j == 0 else 'delete'
-
-                    risk_status = self._check_file_risk(file_info['path'])
-                    risk_indicator = "🚨 РИСК" if risk_status == 'RISK' else "🟢 ОК"
-                    tag_risk = 'risk' if risk_status == 'RISK' else ''
+        if self._refresh_base is not None:
+            # Прежний результат остаётся актуальным настолько, насколько был
+            self._refresh_base = None
+            self._render_page(self.results_page)
+            self._set_delete_buttons_state(tk.NORMAL)
+        else:
+            self._clear_tree()
 
-                    final_tags = (tag_risk, tag_status, file_hash, str(file_info['size']))
+    def _show_results(self, result, reset_selection=True):
+        """
+        Показывает итоговый результат. reset_selection=False сохраняет статусы,
+        которые пользователь менял в группах, показанных во время сканирования.
 
-                    if j > 0:
-                        total_duplicates += 1
+        Если это обновление прежнего результата (self._refresh_base), новый
+        сравнивается с ним по хешам групп: отметки пользователя переносятся,
+        а на странице перестраиваются только изменившиеся группы.
+        """
+        self.logger.info(f"GUI: Получены результаты. Групп дубликатов: {len(result)}")
+        previous, self._refresh_base = self._refresh_base, None
+        diff = None
+        if previous is not None:
+            diff = ResultDiff(previous, result)
+            self.selection = DeleteSelection.carry_over(self.selection, previous, result)
+            self.logger.info(
+                f"GUI: Изменения результата: +{len(diff.added)} −{len(diff.removed)} "
+                f"~{len(diff.changed)} групп, без изменений {len(diff.unchanged)}"
+            )
+        elif reset_selection:
+            self.selection = DeleteSelection(result.groups)
+
+        self.scan_result = result
+        self.results_stale = False
+        self.revalidate_button.config(state=tk.DISABLED)
+        self._live_groups = []
+        self._live_keys = []
+        self._reset_progress_bar()
+        if diff is not None:
+            self._refresh_page(diff)
+        else:
+            self._apply_filter()
 
-                    self.tree.insert(
-                        group_id,
-                        tk.END,
-                        text='',
-                        values=(status, risk_indicator, format_size(file_info['size']), file_info['path']),
-                        tags=final_tags
-                    )
+        total_duplicates = result.duplicate_count
+        total_space = result.total_wasted
 
         if total_duplicates > 0:
-            status_text = f"✓ Найдено: {len(duplicates)} групп • {total_duplicates} дубликатов • {format_size(total_space)} можно освободить"
+            status_text = f"✓ Найдено: {len(result)} групп • {total_duplicates} дубликатов • {format_size(total_space)} можно освободить"
+            if diff is not None:
+                status_text += f" • изменения: +{len(diff.added)} −{len(diff.removed)} ~{len(diff.changed)}"
             if self.permission_errors > 0:
                 status_text += f" | ⚠ {self.permission_errors} файлов пропущено"
             self.status_var.set(status_text)
 
-            self.delete_button.config(state=tk.NORMAL)
-            if hasattr(self, 'preview_button'):
-                self.preview_button.config(state=tk.NORMAL)
-            if hasattr(self, 'trash_button'):
-                self.trash_button.config(state=tk.NORMAL)
+            self._set_delete_buttons_state(tk.NORMAL)
         else:
             status_text = "✨ Дубликаты не найдены. Все чисто."
             if self.permission_errors > 0:
                 status_text += f" | ⚠ {self.permission_errors} файлов пропущено"
             self.status_var.set(status_text)
 
-            self.delete_button.config(state=tk.DISABLED)
-            if hasattr(self, 'preview_button'):
-                self.preview_button.config(state=tk.DISABLED)
-            if hasattr(self, 'trash_button'):
-                self.trash_button.config(state=tk.DISABLED)
+            self._set_delete_buttons_state(tk.DISABLED)
 
         if self.status_glow:
             self.status_glow.stop_glow()
 
         self.scan_button.stop_glow()
         self.scan_button.config(text="▶ Сканировать", state=tk.NORMAL)
-        self.cancel_button.config(state=tk.DISABLED)
+        self.estimate_button.config(state=tk.NORMAL)
+        self._set_operation_buttons_state(tk.DISABLED)
+
+    def _start_warm_load(self):
+        """Открывает снимок прошлого сканирования в фоне, чтобы окно появилось сразу"""
+        threading.Thread(target=self._run_warm_load, daemon=True).start()
+
+    def _run_warm_load(self):
+        try:
+            stamp, result = load_result_cache(self.result_cache_path)
+            if result is None:
+                return
+            result.classify_risk(self.risk_classifier)
+            result.filter_index()
+        except Exception as e:
+            self.logger.error(f"Не удалось открыть снимок результатов: {e}")
+            return
+        self.master.after(0, self._show_cached_results, stamp, result)
+
+    def _show_cached_results(self, stamp, result):
+        # Пока снимок загружался, пользователь мог начать сканирование или открыть базу
+        if self.is_scanning or self.is_deleting or self.scan_result:
+            return
+
+        self.logger.info(f"GUI: Открыт снимок результатов {self.result_cache_path}")
+        if stamp.get('root'):
+            self.dir_entry.delete(0, tk.END)
+            self.dir_entry.insert(0, stamp['root'])
+        self.permission_errors = 0
+        self._show_results(result)
+
+        self.results_stale = True
+        self.cache_stamp = stamp
+        self.revalidate_button.config(state=tk.NORMAL)
+        scanned = time.strftime('%d.%m.%Y %H:%M', time.localtime(stamp.get('scanned', 0)))
+        self.status_var.set(
+            f"🕓 Результаты сканирования от {scanned} • {len(result)} групп • "
+            f"могли устареть — «↻ Перепроверить» проверит файлы без пересканирования"
+        )
+
+    def _start_revalidate_thread(self):
+        """Перепроверяет показанный снимок: stat для всех файлов, хеш — только для изменившихся"""
+        with self.operation_lock:
+            if self.is_scanning or self.is_deleting:
+                messagebox.showwarning(
+                    "Операция выполняется",
+                    "Дождитесь завершения текущей операции"
+                )
+                return
+            # Перепроверка, как и сканирование, заменяет результат
+            self.is_scanning = True
+
+        self.status_var.set("↻ Перепроверка файлов снимка...")
+        if self.status_glow:
+            self.status_glow.start_glow()
+        self.revalidate_button.config(state=tk.DISABLED)
+        self.scan_button.config(state=tk.DISABLED)
+        self.estimate_button.config(state=tk.DISABLED)
+        self._set_delete_buttons_state(tk.DISABLED)
+
+        threading.Thread(
+            target=self._run_revalidate,
+            args=(self.scan_result, self.cache_stamp or {}),
+            daemon=True
+        ).start()
+
+    def _run_revalidate(self, result, stamp):
+        from verify import revalidate_result
+
+        try:
+            fresh, stale = revalidate_result(result)
+            fresh.classify_risk(self.risk_classifier)
+            fresh.filter_index()
+            try:
+                save_result_cache(fresh, stamp.get('root'), stamp.get('options'), self.result_cache_path,
+                                  scanned=stamp.get('scanned'))
+            except OSError as e:
+                self.logger.warning(f"Не удалось обновить снимок результатов: {e}")
+            self.master.after(0, self._show_revalidated, fresh, stale)
+        except Exception as e:
+            self.logger.error(f"ПОТОК: Ошибка перепроверки: {e}")
+            self.master.after(0, lambda: self._show_error("Ошибка", f"Не удалось перепроверить результаты: {e}"))
+        finally:
+            with self.operation_lock:
+                self.is_scanning = False
+
+    def _show_revalidated(self, result, stale):
+        # Как и пересканирование, обновляет показанное на месте с переносом отметок
+        self._refresh_base = self.scan_result
+        self._show_results(result)
+        self.status_var.set(
+            f"✓ Перепроверено: {len(result)} групп • устаревших файлов: {len(stale)} • "
+            f"{format_size(result.total_wasted)} можно освободить (новые дубликаты найдёт сканирование)"
+        )
+
+    def _clear_tree(self):
+        """Очищает Treeview и останавливает незаконченное заполнение"""
+        self._tree_generation += 1
+        AnimationClock.for_widget(self).resume('tree')
+        self._tree_groups = {}
+        self._tree_rows = {}
+        self.tree.delete(*self.tree.get_children())
+        self.page_var.set("")
+        self.prev_page_button.config(state=tk.DISABLED)
+        self.next_page_button.config(state=tk.DISABLED)
+
+    def _filter_criteria(self):
+        """Условия FilterIndex.match() из полей панели фильтра"""
+        min_size, max_size = SIZE_FILTERS.get(self.filter_size_var.get(), (None, None))
+        return {
+            'extension': self.filter_ext_var.get().strip() or None,
+            'prefix': self.filter_prefix_var.get().strip() or None,
+            'min_size': min_size,
+            'max_size': max_size,
+            'risky': RISK_FILTERS.get(self.filter_risk_var.get()),
+        }
+
+    def _on_filter_changed(self, event=None):
+        # Во время сканирования в дереве живые группы, а не self.scan_result
+        if not self.is_scanning:
+            self._apply_filter()
+
+    def _apply_filter(self):
+        """Оставляет на страницах только группы, где есть файлы, подходящие под фильтр"""
+        started = time.perf_counter()
+        index = self.scan_result.filter_index()
+        self.filter_ids = index.match(**self._filter_criteria())
+        self.visible_groups = index.matching_groups(self.filter_ids)
+        self._render_page(0)
+        if self.filter_ids is not None:
+            self.logger.debug(
+                f"GUI: Фильтр: файлов {len(self.filter_ids)}, групп {len(self.visible_groups)} "
+                f"за {(time.perf_counter() - started) * 1000:.1f} мс"
+            )
+
+    def _reset_filter(self):
+        self.filter_ext_var.set("")
+        self.filter_prefix_var.set("")
+        self.filter_size_var.set(next(iter(SIZE_FILTERS)))
+        self.filter_risk_var.set(next(iter(RISK_FILTERS)))
+        self._on_filter_changed()
+
+    def _set_risk_rules(self, rules):
+        """Компилирует правила риска; при ошибке в правилах бросает ValueError, старые остаются"""
+        classifier = RiskClassifier(rules)
+        self.risk_rules = classifier.rules
+        self.risk_classifier = classifier
+
+    def _edit_risk_rules(self):
+        """Окно редактирования правил риска: одно правило на строку"""
+        dialog = tk.Toplevel(self)
+        dialog.title("Правила риска")
+        dialog.configure(bg=self.theme['bg'])
+        dialog.transient(self.master)
+
+        hint = tk.Label(
+            dialog,
+            text=f"Одно правило на строку: часть пути (без учёта регистра)\n"
+                 f"или регулярное выражение с префиксом «{REGEX_RULE_PREFIX}»",
+            font=('Segoe UI', 9),
+            bg=self.theme['bg'],
+            fg=self.theme['text_secondary'],
+            justify="left"
+        )
+        hint.pack(anchor="w", padx=10, pady=(10, 5))
+
+        text = tk.Text(
+            dialog,
+            width=60,
+            height=15,
+            font=('Consolas', 10),
+            bg=self.theme['surface'],
+            fg=self.theme['fg'],
+            insertbackground=self.theme['fg'],
+            relief='flat'
+        )
+        text.pack(fill="both", expand=True, padx=10)
+        text.insert('1.0', '\n'.join(self.risk_rules))
+
+        def save():
+            rules = [line.strip() for line in text.get('1.0', tk.END).splitlines() if line.strip()]
+            try:
+                self._set_risk_rules(rules)
+            except ValueError as e:
+                messagebox.showerror("Ошибка в правилах", str(e), parent=dialog)
+                return
+            self.logger.info(f"GUI: Правила риска обновлены ({len(rules)})")
+            self.save_settings()
+            dialog.destroy()
+            if self.scan_result and not self.is_scanning:
+                self.scan_result.classify_risk(self.risk_classifier)
+                self._apply_filter()
+
+        buttons = tk.Frame(dialog, bg=self.theme['bg'])
+        buttons.pack(fill="x", padx=10, pady=10)
+        save_button = ModernButton(
+            buttons,
+            text="Сохранить",
+            bg=self.theme['success'],
+            fg='#FFFFFF',
+            command=save
+        )
+        save_button.pack(side="right")
+
+        cancel_button = ModernButton(
+            buttons,
+            text="Отмена",
+            bg=self.theme['primary'],
+            fg='#FFFFFF',
+            command=dialog.destroy
+        )
+        cancel_button.pack(side="right", padx=(0, 5))
+
+    def _mark_filtered(self, selected):
+        """Отмечает к удалению (или оставляет) все подходящие под фильтр файлы, кроме сохраняемых"""
+        if self.is_scanning or self.is_deleting or not self.scan_result:
+            return
+
+        index = self.scan_result.filter_index()
+        changed = 0
+        for group, position in index.entries(self.filter_ids):
+            if position > 0 and self.selection.select(group.files[position], selected):
+                changed += 1
+
+        self._render_page(self.results_page)
+        action = "отмечено к удалению" if selected else "оставлено"
+        self.status_var.set(
+            f"✓ {action.capitalize()}: {changed} файлов • к удалению {len(self.selection)} "
+            f"({format_size(self.selection.selected_bytes)})"
+        )
+
+    def _render_page(self, page):
+        """
+        Показывает страницу групп, прошедших фильтр (self.visible_groups).
+
+        Строки групп вставляются порциями по TREE_INSERT_CHUNK через after(),
+        чтобы окно не зависало; строки файлов создаются при раскрытии группы.
+        """
+        groups = self.visible_groups
+        pages = max(1, (len(groups) + RESULTS_PAGE_SIZE - 1) // RESULTS_PAGE_SIZE)
+        page = min(max(0, page), pages - 1)
+        self.results_page = page
+
+        self._clear_tree()
+        self._update_page_controls(page, pages)
+
+        start = page * RESULTS_PAGE_SIZE
+        # Пока страница заполняется, анимации не отнимают тики у вставки строк
+        AnimationClock.for_widget(self).suspend('tree')
+        self._insert_group_rows(self._tree_generation, start, min(start + RESULTS_PAGE_SIZE, len(groups)))
+
+    def _update_page_controls(self, page, pages):
+        groups = self.visible_groups
+        if self.filter_ids is not None:
+            self.page_var.set(f"Страница {page + 1} из {pages} • групп: {len(groups)} из {len(self.scan_result)}")
+        else:
+            self.page_var.set(f"Страница {page + 1} из {pages} • групп: {len(groups)}" if groups else "")
+        self.prev_page_button.config(state=tk.NORMAL if page > 0 else tk.DISABLED)
+        self.next_page_button.config(state=tk.NORMAL if page < pages - 1 else tk.DISABLED)
+
+    def _refresh_page(self, diff):
+        """
+        Обновляет текущую страницу на месте по ResultDiff.
+
+        Строки групп без изменений остаются (вместе с раскрытыми строками
+        файлов и их статусами) и только переставляются на новое место;
+        пропавшие группы удаляются, новые и изменившиеся вставляются заново
+        (изменившаяся группа остаётся раскрытой, если была раскрыта).
+        """
+        index = self.scan_result.filter_index()
+        self.filter_ids = index.match(**self._filter_criteria())
+        self.visible_groups = index.matching_groups(self.filter_ids)
+        groups = self.visible_groups
+        pages = max(1, (len(groups) + RESULTS_PAGE_SIZE - 1) // RESULTS_PAGE_SIZE)
+        page = min(self.results_page, pages - 1)
+        self.results_page = page
+        start = page * RESULTS_PAGE_SIZE
+        page_groups = groups[start:start + RESULTS_PAGE_SIZE]
+
+        # Незаконченное заполнение прежней страницы больше не нужно
+        self._tree_generation += 1
+        AnimationClock.for_widget(self).resume('tree')
+
+        rebuild = diff.changed_digests()
+        wanted = {group.digest for group in page_groups}
+        rows = {}
+        reopen = set()
+        for item_id, group in self._tree_groups.items():
+            if group.digest in wanted and group.digest not in rebuild:
+                rows[group.digest] = item_id
+                continue
+            if group.digest in wanted and self.tree.item(item_id, 'open'):
+                reopen.add(group.digest)
+            self._delete_group_row(item_id)
+
+        self._tree_groups = {}
+        for position, group in enumerate(page_groups):
+            text = f"Группа {start + position + 1}"
+            item_id = rows.get(group.digest)
+            if item_id is None:
+                item_id = self._insert_group_row(group, text, position)
+                self._tree_groups[item_id] = group
+                if group.digest in reopen:
+                    self._populate_group(item_id)
+                    self.tree.item(item_id, open=True)
+                continue
+
+            self.tree.move(item_id, '', position)
+            self.tree.item(item_id, text=text)
+            self._tree_groups[item_id] = group
+            # Строки файлов теперь ссылаются на группу нового результата (состав тот же)
+            for child_id in self.tree.get_children(item_id):
+                if child_id in self._tree_rows:
+                    self._tree_rows[child_id] = (group, self._tree_rows[child_id][1])
+
+        self._update_page_controls(page, pages)
+
+    def _delete_group_row(self, item_id):
+        for child_id in self.tree.get_children(item_id):
+            self._tree_rows.pop(child_id, None)
+        self.tree.delete(item_id)
+
+    def _insert_group_rows(self, generation, index, end):
+        # Заполнение устарело: показана другая страница или новые результаты
+        if generation != self._tree_generation:
+            return
+
+        stop = min(index + TREE_INSERT_CHUNK, end)
+        for i in range(index, stop):
+            group = self.visible_groups[i]
+            group_id = self._insert_group_row(group, f"Группа {i + 1}")
+            self._tree_groups[group_id] = group
+
+        if stop < end:
+            self.after(1, self._insert_group_rows, generation, stop, end)
+        else:
+            AnimationClock.for_widget(self).resume('tree')
+
+    def _insert_group_row(self, group, text, index=tk.END):
+        group_id = self.tree.insert(
+            '',
+            index,
+            text=text,
+            values=('', '', format_size(group.size),
+                    f"{len(group)} файлов • {format_size(group.wasted_bytes)} лишнего"),
+            tags=('group',),
+            open=False
+        )
+        # Заглушка, чтобы у группы была стрелка раскрытия
+        self.tree.insert(group_id, tk.END, text='…', tags=('placeholder',))
+        return group_id
+
+    def _file_status(self, position, path):
+        """Действие для файла группы по модели отметок; первый файл всегда сохраняется"""
+        return "Удалить" if position > 0 and path in self.selection else "Сохранить"
+
+    def _on_group_open(self, event):
+        """Создаёт строки файлов группы при первом раскрытии"""
+        self._populate_group(self.tree.focus())
+
+    def _populate_group(self, group_id):
+        group = self._tree_groups.get(group_id)
+        if group is None:
+            return
+        children = self.tree.get_children(group_id)
+        if not children or 'placeholder' not in self.tree.item(children[0], 'tags'):
+            return
+
+        self.tree.delete(*children)
+        for j, file_info in enumerate(group.files):
+            status = self._file_status(j, file_info['path'])
+            tag_status = 'keep' if status == "Сохранить" else 'delete'
+
+            risk_status = self._check_file_risk(file_info['path'])
+            risk_indicator = "🚨 РИСК" if risk_status == 'RISK' else "🟢 ОК"
+            tag_risk = 'risk' if risk_status == 'RISK' else ''
+
+            item_id = self.tree.insert(
+                group_id,
+                tk.END,
+                text='',
+                values=(status, risk_indicator, format_size(file_info['size']), file_info['path']),
+                tags=(tag_risk, tag_status)
+            )
+            self._tree_rows[item_id] = (group, j)
 
     def _show_error(self, title, message):
+        self._reset_progress_bar()
         if self.status_glow:
             self.status_glow.stop_glow()
 
         self.scan_button.stop_glow()
         self.scan_button.config(text="▶ Сканировать", state=tk.NORMAL)
-        self.cancel_button.config(state=tk.DISABLED)
+        self.estimate_button.config(state=tk.NORMAL)
+        self._set_operation_buttons_state(tk.DISABLED)
 
         with self.operation_lock:
             self.is_scanning = False
             self.is_deleting = False
 
+        if self._refresh_base is not None:
+            self._refresh_base = None
+            self._render_page(self.results_page)
+            self._set_delete_buttons_state(tk.NORMAL)
+
         messagebox.showerror(title, message)
         self.status_var.set("✗ Ошибка при выполнении операции")
 
     def _toggle_status(self, event):
         item_id = self.tree.identify_row(event.y)
-        if not item_id or not self.tree.parent(item_id):
+        row = self._tree_rows.get(item_id)
+        if row is None:
             return
 
-        parent_id = self.tree.parent(item_id)
-        children = self.tree.get_children(parent_id)
-
-        if item_id == children[0]:
+        group, position = row
+        if position == 0:
             messagebox.showinfo("Информация", "Первый файл в группе помечен как оригинал и не может быть удален")
             return
 
-        current_status = self.tree.item(item_id, 'values')[0]
-        new_status = "Удалить" if current_status == "Сохранить" else "Сохранить"
-        new_tag = 'delete' if new_status == "Удалить" else 'keep'
-
-        values = list(self.tree.item(item_id, 'values'))
-        values[0] = new_status
-        tags = self.tree.item(item_id, 'tags')
-
-        updated_tags = list(tags)
-        # Обновление тега статуса (второй элемент в списке тегов)
-        updated_tags[1] = new_tag
-
-        self.tree.item(item_id, values=values, tags=updated_tags)
+        file_info = group.files[position]
+        selected = self.selection.toggle(file_info)
+
+        # Строка перерисовывается из модели: статус и теги не читаются из Treeview
+        new_status = "Удалить" if selected else "Сохранить"
+        risk_status = self._check_file_risk(file_info['path'])
+        risk_indicator = "🚨 РИСК" if risk_status == 'RISK' else "🟢 ОК"
+        tag_risk = 'risk' if risk_status == 'RISK' else ''
+        self.tree.item(
+            item_id,
+            values=(new_status, risk_indicator, format_size(file_info['size']), file_info['path']),
+            tags=(tag_risk, 'delete' if selected else 'keep')
+        )
 
     def _start_delete_thread(self, mode='delete', dry_run=False):
         """
         Запускает удаление файлов в отдельном потоке
 
         Args:
-            mode: 'trash' (в корзину) или 'delete' (навсегда)
+            mode: 'trash' (в корзину), 'delete' (навсегда), 'hardlink' или 'reflink' (заменить ссылками/клонами)
             dry_run: если True, только показывает что будет удалено
         """
         with self.operation_lock:
@@ -970,26 +1918,8 @@ class DiskTiderGUI(tk.Frame):
             if not dry_run:
                 self.is_deleting = True
 
-        files_to_delete = []
-
-        for group_id in self.tree.get_children():
-            for item_id in self.tree.get_children(group_id):
-                status, risk_indicator, size_str_formatted, path = self.tree.item(item_id, 'values')
-                tags = self.tree.item(item_id, 'tags')
-
-                if status == "Удалить":
-                    try:
-                        # Размер хранится как строка в tags[3]
-                        size_bytes = int(tags[3])
-                    except (IndexError, ValueError):
-                        self.logger.error(f"Ошибка извлечения размера для {path}. Пропуск.")
-                        continue
-
-                    files_to_delete.append({
-                        'path': path,
-                        'name': os.path.basename(path),
-                        'size': size_bytes
-                    })
+        # Отмеченные файлы берутся из модели (O(отмеченных)), а не из строк Treeview
+        files_to_delete = self.selection.records(self.scan_result)
 
         if not files_to_delete:
             with self.operation_lock:
@@ -1020,6 +1950,30 @@ class DiskTiderGUI(tk.Frame):
                 with self.operation_lock:
                     self.is_deleting = False
                 return
+        elif mode == 'reflink':
+            fallback_text = ("будут заменены жёсткими ссылками" if self.reflink_fallback == 'hardlink'
+                             else "будут пропущены")
+            confirm_text = (
+                f"Заменить {len(files_to_delete)} дубликатов reflink-клонами оригиналов?\n"
+                f"Будет освобождено: до {format_size(total_size)}\n\n"
+                f"Файлы останутся независимыми, общие данные хранятся один раз.\n"
+                f"Если файловая система не поддерживает reflink, файлы {fallback_text}."
+            )
+            if not messagebox.askyesno("Подтверждение", confirm_text):
+                with self.operation_lock:
+                    self.is_deleting = False
+                return
+        elif mode == 'hardlink':
+            confirm_text = (
+                f"Заменить {len(files_to_delete)} дубликатов жёсткими ссылками на оригиналы?\n"
+                f"Будет освобождено: до {format_size(total_size)}\n\n"
+                f"Все пути останутся на месте, но будут указывать на один файл:\n"
+                f"изменение одного из них изменит и остальные."
+            )
+            if not messagebox.askyesno("Подтверждение", confirm_text):
+                with self.operation_lock:
+                    self.is_deleting = False
+                return
         else:
             confirm_text = (
                 f"Удалить {len(files_to_delete)} файлов НАВСЕГДА?\n"
@@ -1035,15 +1989,21 @@ class DiskTiderGUI(tk.Frame):
             self.status_var.set("🔍 Режим предпросмотра...")
         elif mode == 'trash':
             self.status_var.set("🗑 Перемещение в корзину...")
+        elif mode == 'hardlink':
+            self.status_var.set("🔗 Замена дубликатов жёсткими ссылками...")
+        elif mode == 'reflink':
+            self.status_var.set("🧬 Замена дубликатов reflink-клонами...")
         else:
             self.status_var.set("❌ Удаление файлов...")
 
-        self.delete_button.config(state=tk.DISABLED)
-        if hasattr(self, 'preview_button'):
-            self.preview_button.config(state=tk.DISABLED)
-        if hasattr(self, 'trash_button'):
-            self.trash_button.config(state=tk.DISABLED)
+        self._set_delete_buttons_state(tk.DISABLED)
         self.scan_button.config(state=tk.DISABLED)
+        self.estimate_button.config(state=tk.DISABLED)
+
+        self.operation_control = OperationControl()
+        self.delete_progress = ProgressChannel()
+        if not dry_run:
+            self._set_operation_buttons_state(tk.NORMAL)
 
         delete_thread = threading.Thread(
             target=self._run_delete,
@@ -1051,16 +2011,30 @@ class DiskTiderGUI(tk.Frame):
             daemon=True
         )
         delete_thread.start()
+        self.master.after(DELETE_PROGRESS_POLL_MS, self._poll_delete_progress)
 
     def _run_delete(self, files_to_delete, mode, dry_run):
+        from journal import new_journal_path
+        from utils import delete_files_by_list
+
         try:
+            journal_path = None if dry_run else new_journal_path()
             deleted_count, freed_space_str, errors = delete_files_by_list(
                 files_to_delete,
                 mode=mode,
-                dry_run=dry_run
+                dry_run=dry_run,
+                progress=self.delete_progress,
+                reflink_fallback=self.reflink_fallback,
+                journal_path=journal_path,
+                control=self.operation_control
             )
+            if journal_path and mode != 'delete':
+                self.last_journal_path = journal_path
+            remaining = None
+            if journal_path and self.operation_control.cancelled:
+                remaining = self._unprocessed_result(journal_path)
             self.master.after(0, lambda: self._show_delete_results(
-                deleted_count, freed_space_str, errors, mode, dry_run
+                deleted_count, freed_space_str, errors, mode, dry_run, remaining
             ))
         except Exception as e:
             self.logger.error(f"Ошибка удаления: {e}")
@@ -1069,8 +2043,55 @@ class DiskTiderGUI(tk.Frame):
             with self.operation_lock:
                 self.is_deleting = False
 
-    def _show_delete_results(self, deleted_count, freed_space_str, errors, mode, dry_run):
-        """Показывает результаты удаления"""
+    def _unprocessed_result(self, journal_path):
+        """
+        Результат без файлов, обработанных прерванным удалением (они записаны
+        в журнал); снимок перезаписывается им же. Вызывается в рабочем потоке.
+        """
+        from journal import read_journal
+
+        processed = {entry['path'] for entry in read_journal(journal_path)}
+        result = self.scan_result
+        remaining = result.without(path for path in result.path_index if os.path.abspath(path) in processed)
+        remaining.filter_index()
+        stamp = self.cache_stamp or {}
+        try:
+            save_result_cache(remaining, stamp.get('root'), stamp.get('options'), self.result_cache_path,
+                              scanned=stamp.get('scanned'))
+        except OSError as e:
+            self.logger.warning(f"Не удалось обновить снимок результатов: {e}")
+        return remaining
+
+    def _poll_delete_progress(self):
+        """Забирает из канала последнее состояние удаления, пока оно идёт"""
+        progress = self.delete_progress.poll()
+        if progress and not self.operation_control.cancelled:
+            self._show_delete_progress(progress)
+        if self.is_deleting:
+            self.master.after(DELETE_PROGRESS_POLL_MS, self._poll_delete_progress)
+
+    def _show_delete_progress(self, progress):
+        """Показывает ход удаления в статус-баре"""
+        if progress['paused']:
+            prefix = "⏸ Удаление приостановлено"
+        else:
+            prefix = "🗑 Удаление"
+        status_text = (
+            f"{prefix}: {progress['done']}/{progress['total']} файлов • "
+            f"освобождено {format_size(progress['freed_bytes'])} • "
+            f"{progress['files_per_sec']:.0f} файлов/с • {format_size(progress['bytes_per_sec'])}/с"
+        )
+        if progress['eta'] is not None and not progress['paused']:
+            status_text += f" • осталось ~{format_duration(progress['eta'])}"
+        self.status_var.set(status_text)
+
+    def _show_delete_results(self, deleted_count, freed_space_str, errors, mode, dry_run, remaining=None):
+        """
+        Показывает результаты удаления. remaining — результат без обработанных
+        файлов, если удаление прервали: необработанные группы остаются в списке.
+        """
+        # Последний снимок прогресса больше не нужен: иначе таймер перезапишет итог
+        self.delete_progress.poll()
 
         if dry_run:
             status_msg = f"🔍 Предпросмотр: {deleted_count} файлов | {freed_space_str}"
@@ -1080,11 +2101,24 @@ class DiskTiderGUI(tk.Frame):
             status_msg = f"✓ В корзину: {deleted_count} файлов | Освобождено: {freed_space_str}"
             dialog_title = "Готово"
             dialog_msg = f"Перемещено в корзину: {deleted_count} файлов\nОсвобождено: {freed_space_str}"
+        elif mode == 'hardlink':
+            status_msg = f"✓ Заменено ссылками: {deleted_count} файлов | Освобождено: {freed_space_str}"
+            dialog_title = "Готово"
+            dialog_msg = f"Заменено жёсткими ссылками: {deleted_count} файлов\nОсвобождено: {freed_space_str}"
+        elif mode == 'reflink':
+            status_msg = f"✓ Заменено клонами: {deleted_count} файлов | Освобождено: {freed_space_str}"
+            dialog_title = "Готово"
+            dialog_msg = f"Заменено reflink-клонами: {deleted_count} файлов\nОсвобождено: {freed_space_str}"
         else:
             status_msg = f"✓ Удалено навсегда: {deleted_count} файлов | Освобождено: {freed_space_str}"
             dialog_title = "Готово"
             dialog_msg = f"Удалено навсегда: {deleted_count} файлов\nОсвобождено: {freed_space_str}"
 
+        if self.operation_control.cancelled and not dry_run:
+            status_msg = "⏹ Отменено | " + status_msg
+            dialog_title = "Удаление отменено"
+            dialog_msg = "Удаление прервано пользователем, оставшиеся файлы не тронуты.\n\n" + dialog_msg
+
         if errors:
             status_msg += f" | ⚠ Ошибок: {len(errors)}"
             dialog_msg += f"\n\n⚠ Ошибок при удалении: {len(errors)}"
@@ -1096,27 +2130,75 @@ class DiskTiderGUI(tk.Frame):
 
         self.status_var.set(status_msg)
 
-        if not dry_run:
-            messagebox.showinfo(dialog_title, dialog_msg)
-            self.tree.delete(*self.tree.get_children())
-            self.duplicates_data = {}
-        else:
-            messagebox.showinfo(dialog_title, dialog_msg)
-
-        if not dry_run:
-            self.delete_button.config(state=tk.DISABLED)
-            if hasattr(self, 'preview_button'):
-                self.preview_button.config(state=tk.DISABLED)
-            if hasattr(self, 'trash_button'):
-                self.trash_button.config(state=tk.DISABLED)
-        else:
-            self.delete_button.config(state=tk.NORMAL)
-            if hasattr(self, 'preview_button'):
-                self.preview_button.config(state=tk.NORMAL)
-            if hasattr(self, 'trash_button'):
-                self.trash_button.config(state=tk.NORMAL)
+        messagebox.showinfo(dialog_title, dialog_msg)
+        if remaining is not None:
+            # Отметки необработанных файлов сохраняются
+            self.selection = DeleteSelection.carry_over(self.selection, self.scan_result, remaining)
+            self.scan_result = remaining
+            self._apply_filter()
+        elif not dry_run:
+            self.scan_result = ScanResult()
+            self.selection = DeleteSelection()
+            # Снимок больше не отражает диск
+            remove_result_cache(self.result_cache_path)
+            self._apply_filter()
+
+        self._set_delete_buttons_state(tk.NORMAL if self.scan_result else tk.DISABLED)
 
         self.scan_button.config(state=tk.NORMAL)
+        self.estimate_button.config(state=tk.NORMAL)
+        self._set_operation_buttons_state(tk.DISABLED)
+        if self.last_journal_path:
+            self.undo_button.config(state=tk.NORMAL)
+
+    def _start_undo_thread(self):
+        """Отменяет последнее удаление по журналу (корзина и жёсткие ссылки)"""
+        if not self.last_journal_path:
+            return
+
+        # Подтверждение — до захвата блокировки: модальный диалог не должен её удерживать
+        if not messagebox.askyesno(
+            "Отмена удаления",
+            "Вернуть файлы из корзины и разорвать созданные жёсткие ссылки?\n\n"
+            "Безвозвратно удалённые файлы восстановить нельзя."
+        ):
+            return
+
+        with self.operation_lock:
+            busy = self.is_scanning or self.is_deleting
+            if not busy:
+                self.is_deleting = True
+        if busy:
+            messagebox.showwarning(
+                "Операция выполняется",
+                "Дождитесь завершения текущей операции"
+            )
+            return
+
+        self.undo_button.config(state=tk.DISABLED)
+        self.status_var.set("↩ Отмена удаления...")
+        threading.Thread(target=self._run_undo, args=(self.last_journal_path,), daemon=True).start()
+
+    def _run_undo(self, journal_path):
+        from journal import undo_journal
+
+        try:
+            restored, errors = undo_journal(journal_path)
+            self.master.after(0, lambda: self._show_undo_results(restored, errors))
+        except Exception as e:
+            self.logger.error(f"Ошибка отмены удаления: {e}")
+            self.master.after(0, lambda: self._show_error("Ошибка отмены удаления", str(e)))
+        finally:
+            with self.operation_lock:
+                self.is_deleting = False
+
+    def _show_undo_results(self, restored, errors):
+        self.last_journal_path = None
+        msg = f"Восстановлено файлов: {restored}"
+        if errors:
+            msg += f"\n\n⚠ Не удалось восстановить: {len(errors)}\n" + "\n".join(errors[:5])
+        self.status_var.set(f"↩ Восстановлено: {restored} файлов")
+        messagebox.showinfo("Отмена удаления", msg)
 
 
 # Запуск приложения (пример)
@@ -1,9 +1,15 @@
 # intro.py
 import tkinter as tk
 from tkinter import ttk
-from gui_app import DiskTiderGUI, THEMES, ModernButton
+from themes import THEMES
+from animation import AnimationClock
+from settings import read_settings, update_settings
 import math
 
+# Длительность появления и исчезновения интро (с)
+FADE_IN_SECONDS = 0.4
+FADE_OUT_SECONDS = 0.2
+
 
 class AnimatedButton(tk.Button):
     """Кнопка с анимацией при наведении"""
@@ -331,33 +337,45 @@ class IntroScreen(tk.Frame):
 
     def _fade_in(self):
         """Плавное появление окна"""
-        if self.alpha < 1.0:
-            self.alpha += 0.05
-            try:
-                self.master.attributes('-alpha', self.alpha)
-            except:
-                pass
-            self.after(20, self._fade_in)
+        AnimationClock.for_widget(self).start('intro_fade', self._fade_in_step)
+
+    def _fade_in_step(self, elapsed):
+        self.alpha = min(1.0, elapsed / FADE_IN_SECONDS)
+        self._set_alpha(self.alpha)
+        return self.alpha < 1.0
+
+    def _set_alpha(self, alpha):
+        try:
+            self.master.attributes('-alpha', alpha)
+        except:
+            pass
 
     def open_main_app(self):
         """Открывает основное приложение"""
         if self.dont_show_again_var.get():
-            #TODO:Сохранить в конфиг
-            pass
+            try:
+                update_settings({'show_intro': False})
+            except OSError:
+                # Не сохранилось — интро просто покажется в следующий раз
+                pass
 
         self._fade_out()
 
     def _fade_out(self):
         """Плавное исчезновение перед переходом"""
-        if self.alpha > 0:
-            self.alpha -= 0.1
-            try:
-                self.master.attributes('-alpha', self.alpha)
-            except:
-                pass
-            self.after(20, self._fade_out)
-        else:
-            self._switch_to_main()
+        start_alpha = self.alpha
+
+        def step(elapsed):
+            self.alpha = max(0.0, start_alpha - elapsed / FADE_OUT_SECONDS)
+            self._set_alpha(self.alpha)
+            if self.alpha > 0:
+                return True
+            # Переход уничтожает интро — выполняем его вне кадра таймера
+            self.master.after_idle(self._switch_to_main)
+            return False
+
+        # Тот же ключ: исчезновение заменяет незаконченное появление
+        AnimationClock.for_widget(self).start('intro_fade', step)
 
     def _switch_to_main(self):
         """Переключается на основное приложение"""
@@ -380,7 +398,7 @@ class IntroScreen(tk.Frame):
         except:
             pass
 
-        DiskTiderGUI(self.master)
+        open_main_window(self.master)
 
     def _center_window(self, width, height):
         """Центрирует окно на экране"""
@@ -391,8 +409,33 @@ class IntroScreen(tk.Frame):
         self.master.geometry(f'+{x}+{y}')
 
 
+def open_main_window(root):
+    """Создаёт основное окно; gui_app и всё, что за ним, загружаются только здесь"""
+    from gui_app import DiskTiderGUI
+
+    return DiskTiderGUI(root)
+
+
+def intro_enabled():
+    try:
+        return read_settings().get('show_intro', True)
+    except ValueError:
+        return True
+
+
 def main():
     root = tk.Tk()
+
+    if not intro_enabled():
+        # Пользователь отключил интро: сразу основное окно
+        width, height = 1000, 700
+        root.title("DiskTider - Поиск и удаление дубликатов")
+        root.minsize(800, 600)
+        root.geometry(f"{width}x{height}")
+        open_main_window(root)
+        root.mainloop()
+        return
+
     root.title("DiskTider - Добро пожаловать")
     root.resizable(True, True)
     root.minsize(600, 500)
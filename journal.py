@@ -0,0 +1,371 @@
+# journal.py
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime
+from urllib.parse import unquote
+
+from logger import get_logger
+
+DEFAULT_JOURNAL_DIR = "journals"
+
+# Сколько записей копить перед fsync (групповая фиксация)
+JOURNAL_FSYNC_EVERY = 256
+
+# Действия, которые можно отменить
+UNDOABLE_ACTIONS = ('trash', 'hardlink')
+
+
+def new_journal_path(journal_dir=DEFAULT_JOURNAL_DIR):
+    """Путь для нового журнала удаления с отметкой времени"""
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    return os.path.join(journal_dir, f"deletion_{timestamp}_{uuid.uuid4().hex[:6]}.jsonl")
+
+
+class DeletionJournal:
+    """
+    Журнал удаления только на дозапись (JSON Lines): одна строка на файл
+    с полями ts, path, size, digest, action, destination.
+
+    Записи буферизуются и сбрасываются на диск с fsync пачками по fsync_every,
+    а также при commit()/close(), поэтому синхронизация не стоит по fsync на файл.
+    """
+
+    def __init__(self, path, fsync_every=JOURNAL_FSYNC_EVERY):
+        self.path = path
+        self.fsync_every = max(1, fsync_every)
+        self._lock = threading.Lock()
+        self._pending = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def record(self, path, size, action, digest=None, destination=None):
+        entry = {
+            'ts': time.time(),
+            'path': os.path.abspath(path),
+            'size': size,
+            'digest': digest,
+            'action': action,
+            # Отмена может запускаться из другой рабочей папки
+            'destination': os.path.abspath(destination) if destination else None,
+        }
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._pending += 1
+            if self._pending >= self.fsync_every:
+                self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+
+    def commit(self):
+        with self._lock:
+            if self._pending:
+                self._sync()
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            if self._pending:
+                self._sync()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_journal(path):
+    """Читает записи журнала; повреждённые строки (например, оборванная последняя) пропускаются"""
+    entries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return entries
+
+
+def _trash_dirs(path):
+    """Каталоги корзины freedesktop.org, куда send2trash мог переместить path"""
+    data_home = os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+    dirs = [os.path.join(data_home, 'Trash')]
+
+    top = os.path.dirname(path)
+    while not os.path.ismount(top) and os.path.dirname(top) != top:
+        top = os.path.dirname(top)
+    uid = os.getuid() if hasattr(os, 'getuid') else 0
+    dirs += [os.path.join(top, f'.Trash-{uid}'), os.path.join(top, '.Trash', str(uid))]
+    return dirs
+
+
+def _trash_kind():
+    """'freedesktop', 'darwin' или None (Windows: расположение в корзине не отслеживается)"""
+    if os.name == 'nt':
+        return None
+    return 'darwin' if os.uname().sysname == 'Darwin' else 'freedesktop'
+
+
+def _read_trashinfo(trash_dir, info_name):
+    """Исходный путь и дата удаления из .trashinfo или (None, '')"""
+    original, deleted_at = None, ''
+    try:
+        with open(os.path.join(trash_dir, 'info', info_name), 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('Path='):
+                    original = unquote(line[5:].strip())
+                elif line.startswith('DeletionDate='):
+                    deleted_at = line[13:].strip()
+    except OSError:
+        return None, ''
+    # Для корзин на разделах Path хранится относительно корня раздела
+    if original is not None and not os.path.isabs(original):
+        original = os.path.join(os.path.dirname(trash_dir.rstrip(os.sep)), original)
+    return original, deleted_at
+
+
+def _list_dir(directory):
+    try:
+        return set(os.listdir(directory))
+    except OSError:
+        return set()
+
+
+class TrashLocator:
+    """
+    Определяет, куда send2trash переместил файлы (сам send2trash этого не
+    сообщает). Один экземпляр на всё удаление.
+
+    prepare() до перемещения запоминает содержимое корзин, куда могут
+    попасть файлы, — каждую корзину один раз за удаление. После перемещения
+    locations() ищет файл по именам, которые выбирает send2trash
+    (freedesktop.org: «имя», «имя 1», «имя 2»... — до первого свободного),
+    и читает только .trashinfo незнакомых записей. Найденные записи
+    добавляются к известным, поэтому следующий пакет их не перечитывает.
+    macOS (~/.Trash, без метаданных): точное имя, а при совпадении имён —
+    однозначный кандидат среди новых записей корзины.
+    """
+
+    def __init__(self):
+        self.kind = _trash_kind()
+        self._known = {}
+        self._trash_dirs_by_folder = {}
+
+    def _trash_dirs(self, path):
+        # Корзины зависят только от точки монтирования — вычисляем один раз на папку
+        folder = os.path.dirname(path)
+        dirs = self._trash_dirs_by_folder.get(folder)
+        if dirs is None:
+            dirs = self._trash_dirs_by_folder[folder] = _trash_dirs(path)
+        return dirs
+
+    def _listing_dirs(self, path):
+        if self.kind == 'darwin':
+            return [os.path.expanduser('~/.Trash')]
+        if self.kind == 'freedesktop':
+            return [os.path.join(trash_dir, 'info') for trash_dir in self._trash_dirs(path)]
+        return []
+
+    def prepare(self, paths):
+        """Вызывается до перемещения paths в корзину"""
+        for path in paths:
+            for listing_dir in self._listing_dirs(path):
+                if listing_dir not in self._known:
+                    self._known[listing_dir] = _list_dir(listing_dir)
+
+    def locations(self, paths):
+        """Словарь {путь из paths: путь в корзине} для найденных файлов"""
+        locate = self._locate_darwin if self.kind == 'darwin' else self._locate_freedesktop
+        found = {}
+        if self.kind is None:
+            return found
+        for path in paths:
+            trashed = locate(path)
+            if trashed is not None:
+                found[path] = trashed
+        return found
+
+    def _locate_freedesktop(self, path):
+        name = os.path.basename(path)
+        stem, ext = os.path.splitext(name)
+        target = os.path.abspath(path)
+        for trash_dir in self._trash_dirs(path):
+            info_dir = os.path.join(trash_dir, 'info')
+            known = self._known.get(info_dir)
+            if known is None:
+                continue
+            candidate, counter = name, 0
+            while True:
+                info_name = candidate + '.trashinfo'
+                if info_name not in known:
+                    if not os.path.exists(os.path.join(info_dir, info_name)):
+                        # Первое свободное имя: дальше send2trash не заходит
+                        break
+                    original, _ = _read_trashinfo(trash_dir, info_name)
+                    if original is not None and os.path.normpath(original) == target:
+                        known.add(info_name)
+                        return os.path.join(trash_dir, 'files', candidate)
+                counter += 1
+                candidate = f"{stem} {counter}{ext}"
+        return None
+
+    def _locate_darwin(self, path):
+        trash_dir = os.path.expanduser('~/.Trash')
+        known = self._known.get(trash_dir)
+        if known is None:
+            return None
+        name = os.path.basename(path)
+        if name not in known and os.path.lexists(os.path.join(trash_dir, name)):
+            known.add(name)
+            return os.path.join(trash_dir, name)
+        # Имя было занято: Finder добавляет к нему суффикс
+        stem, ext = os.path.splitext(name)
+        candidates = [entry for entry in _list_dir(trash_dir) - known
+                      if entry.startswith(stem + ' ') and entry.endswith(ext)]
+        if len(candidates) != 1:
+            return None
+        known.add(candidates[0])
+        return os.path.join(trash_dir, candidates[0])
+
+
+class TrashIndex:
+    """
+    Поиск файлов в корзине при отмене, построенный один раз на журнал.
+
+    Сначала проверяется записанное в журнале место (destination). Для
+    записей без него корзины freedesktop.org читаются целиком один раз
+    (на каталог корзины) в индекс {исходный путь: записи от новых к старым}.
+    На macOS и в Windows без destination файл не ищется: имя в корзине
+    не связано с исходным путём надёжно.
+    """
+
+    def __init__(self):
+        self.kind = _trash_kind()
+        self._index = {}
+        self._indexed_dirs = set()
+
+    def find(self, path, destination=None):
+        """
+        Returns:
+            tuple: (путь в корзине, путь .trashinfo или None) или (None, None)
+        """
+        if destination and os.path.lexists(destination):
+            return destination, self._info_path(destination)
+        if self.kind != 'freedesktop':
+            return None, None
+
+        for trash_dir in _trash_dirs(path):
+            self._index_dir(trash_dir)
+        for _, trashed, info_path in self._index.get(os.path.normpath(path), ()):
+            if os.path.lexists(trashed):
+                return trashed, info_path
+        return None, None
+
+    def _info_path(self, trashed):
+        if self.kind != 'freedesktop':
+            return None
+        files_dir, name = os.path.split(trashed)
+        info_path = os.path.join(os.path.dirname(files_dir), 'info', name + '.trashinfo')
+        return info_path if os.path.exists(info_path) else None
+
+    def _index_dir(self, trash_dir):
+        if trash_dir in self._indexed_dirs:
+            return
+        self._indexed_dirs.add(trash_dir)
+        for info_name in _list_dir(os.path.join(trash_dir, 'info')):
+            if not info_name.endswith('.trashinfo'):
+                continue
+            original, deleted_at = _read_trashinfo(trash_dir, info_name)
+            if original is None:
+                continue
+            trashed = os.path.join(trash_dir, 'files', info_name[:-len('.trashinfo')])
+            info_path = os.path.join(trash_dir, 'info', info_name)
+            self._index.setdefault(os.path.normpath(original), []).append((deleted_at, trashed, info_path))
+        for records in self._index.values():
+            records.sort(reverse=True)
+
+
+def _undo_trash(entry, trash_index):
+    path = entry['path']
+    if os.path.lexists(path):
+        raise FileExistsError(f"по исходному пути уже есть файл: {path}")
+    trashed, info_path = trash_index.find(path, entry.get('destination'))
+    if trashed is None:
+        raise FileNotFoundError(f"файл не найден в корзине: {path}")
+    shutil.move(trashed, path)
+    if info_path:
+        os.remove(info_path)
+
+
+def _undo_hardlink(entry):
+    """Разрывает жёсткую ссылку: path снова становится отдельной копией"""
+    path = entry['path']
+    directory, name = os.path.split(path)
+    temp_path = os.path.join(directory, f".{name}.disktider-{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        shutil.copy2(path, temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def undo_journal(path):
+    """
+    Отменяет действия из журнала удаления (в обратном порядке).
+
+    'trash' — файл возвращается из корзины на исходное место;
+    'hardlink' — ссылка заменяется самостоятельной копией.
+    Необратимые удаления ('delete') и reflink-клоны (уже независимые файлы)
+    пропускаются. Отменённые записи дописываются в журнал как 'undo:<action>',
+    поэтому повторный запуск их не трогает.
+
+    Returns:
+        tuple: (restored_count, errors_list)
+    """
+    logger = get_logger()
+    entries = read_journal(path)
+    undone = {(e['path'], e['action'][5:]) for e in entries if e.get('action', '').startswith('undo:')}
+
+    restored = 0
+    errors = []
+    trash_index = TrashIndex()
+    with DeletionJournal(path) as journal:
+        for entry in reversed(entries):
+            action = entry.get('action')
+            if action not in UNDOABLE_ACTIONS or (entry['path'], action) in undone:
+                continue
+            try:
+                if action == 'trash':
+                    _undo_trash(entry, trash_index)
+                else:
+                    _undo_hardlink(entry)
+            except Exception as e:
+                error_msg = f"Не удалось восстановить {entry['path']}: {e}"
+                logger.error(error_msg)
+                errors.append(error_msg)
+                continue
+            journal.record(entry['path'], entry.get('size'), f'undo:{action}', entry.get('digest'))
+            undone.add((entry['path'], action))
+            restored += 1
+
+    skipped = sum(1 for e in entries if e.get('action') in ('delete', 'reflink'))
+    if skipped:
+        logger.info(f"Отмена {path}: пропущено необратимых/не требующих отмены записей: {skipped}")
+    logger.info(f"Отмена {path}: восстановлено {restored}, ошибок {len(errors)}")
+    return restored, errors
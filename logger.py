@@ -1,23 +1,111 @@
 # logger.py
+import atexit
+import glob
+import gzip
 import os
 import logging
+import queue
+import shutil
+import threading
+import time
+from collections import Counter
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# Ротация текущего лога: размер файла и число архивных частей
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+# Сколько последних запусков (scan_*.log и их файлов метрик) хранить в папке логов
+LOG_KEEP_RUNS = 20
+
+# Сколько однотипных предупреждений писать дословно, прежде чем только считать их
+AGGREGATE_VERBATIM = 20
+
+# Как часто (в секундах) выводить промежуточную сводку подавленных предупреждений
+AGGREGATE_INTERVAL = 10.0
+
+# Сколько папок показывать в сводке
+AGGREGATE_TOP_DIRS = 10
+
+
+def _gzip_rotator(source, dest):
+    """Сжимает часть лога при ротации"""
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+class LazyRotatingFileHandler(RotatingFileHandler):
+    """
+    Файловый обработчик, который ничего не создаёт до первой записи.
+
+    Папка логов создаётся, а старые запуски подчищаются только при открытии
+    файла, поэтому запуск без сообщений не трогает файловую систему.
+    При compress=True части ротации сжимаются в .gz.
+    """
+
+    def __init__(self, filename, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT, keep_runs=LOG_KEEP_RUNS,
+                 compress=True):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+        self.keep_runs = keep_runs
+        if compress:
+            self.namer = lambda name: name + '.gz'
+            self.rotator = _gzip_rotator
+
+    def _open(self):
+        directory = os.path.dirname(self.baseFilename)
+        os.makedirs(directory, exist_ok=True)
+        self._prune_old_runs(directory)
+        return super()._open()
+
+    def _prune_old_runs(self, directory):
+        """Удаляет файлы запусков старше keep_runs последних (лог, его части и метрики)"""
+        if not self.keep_runs:
+            return
+        current = os.path.splitext(os.path.basename(self.baseFilename))[0]
+        runs = sorted({
+            os.path.basename(path).split('.', 1)[0]
+            for path in glob.glob(os.path.join(directory, 'scan_*'))
+        } - {current})
+        for run in runs[:max(0, len(runs) - (self.keep_runs - 1))]:
+            for path in glob.glob(os.path.join(directory, glob.escape(run) + '.*')):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
 
 
 class DiskTiderLogger:
-    """Логгер для DiskTider с записью в файл и консоль"""
+    """
+    Логгер для DiskTider с записью в файл и консоль.
 
-    def __init__(self, log_dir="logs"):
+    Вызовы не пишут на диск сами: записи кладутся в очередь (QueueHandler),
+    а файл и консоль обслуживает фоновый поток QueueListener, поэтому циклы
+    обхода и хеширования не ждут диска. flush() дожидается записи очереди.
+    """
+
+    def __init__(self, log_dir="logs", max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT,
+                 keep_runs=LOG_KEEP_RUNS, compress=True):
         self.log_dir = log_dir
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.keep_runs = keep_runs
+        self.compress = compress
         self.logger = None
         self.log_file = None
+        self._listener = None
+        # flush() перезапускает поток записи, а close() останавливает его насовсем;
+        # их вызывают из разных потоков (сканирование, GUI, atexit)
+        self._listener_lock = threading.Lock()
+        self._handlers = []
+        self._aggregate_lock = threading.Lock()
+        self._reset_aggregates()
         self._setup_logger()
+        atexit.register(self.close)
 
     def _setup_logger(self):
-        """Настраивает логгер"""
-        if not os.path.exists(self.log_dir):
-            os.makedirs(self.log_dir)
-
+        """Настраивает логгер (файл лога откроется при первой записи)"""
         timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
         self.log_file = os.path.join(self.log_dir, f"scan_{timestamp}.log")
 
@@ -25,21 +113,108 @@ class DiskTiderLogger:
         self.logger.setLevel(logging.DEBUG)
 
         self.logger.handlers.clear()
+        self.logger.propagate = False
 
         formatter = logging.Formatter(
             '%(asctime)s | %(levelname)-8s | %(message)s',
             datefmt='%Y-%m-%d %H:%M:%S'
         )
 
-        file_handler = logging.FileHandler(self.log_file, encoding='utf-8')
+        file_handler = LazyRotatingFileHandler(self.log_file, self.max_bytes, self.backup_count, self.keep_runs,
+                                               self.compress)
         file_handler.setLevel(logging.DEBUG)
         file_handler.setFormatter(formatter)
-        self.logger.addHandler(file_handler)
 
         console_handler = logging.StreamHandler()
         console_handler.setLevel(logging.WARNING)
         console_handler.setFormatter(formatter)
-        self.logger.addHandler(console_handler)
+
+        self._handlers = [file_handler, console_handler]
+        self._queue = queue.SimpleQueue()
+        self.logger.addHandler(QueueHandler(self._queue))
+        self._start_listener()
+
+    def _start_listener(self):
+        self._listener = QueueListener(self._queue, *self._handlers, respect_handler_level=True)
+        self._listener.start()
+
+    def flush(self):
+        """Выводит сводку подавленных предупреждений и дожидается записи всей очереди"""
+        self.flush_aggregates()
+        with self._listener_lock:
+            if self._listener is None:
+                return
+            # stop() обрабатывает всё, что уже в очереди, и останавливает поток
+            self._listener.stop()
+            for handler in self._handlers:
+                handler.flush()
+            self._start_listener()
+
+    def close(self):
+        """Сбрасывает очередь и закрывает файлы (вызывается и при выходе)"""
+        self.flush_aggregates()
+        with self._listener_lock:
+            if self._listener is None:
+                return
+            self._listener.stop()
+            self._listener = None
+            for handler in self._handlers:
+                handler.close()
+
+    def _reset_aggregates(self):
+        self._warning_counts = Counter()
+        self._suppressed = Counter()
+        self._last_summary = time.monotonic()
+
+    def warning_rate_limited(self, kind, filepath, message):
+        """
+        Предупреждение о файле с ограничением частоты.
+
+        Первые AGGREGATE_VERBATIM предупреждений вида kind (имя исключения:
+        'PermissionError', 'FileNotFoundError' и т. п.) пишутся как обычно, остальные только считаются по
+        папкам и выводятся сводкой: раз в AGGREGATE_INTERVAL секунд и при flush().
+        """
+        with self._aggregate_lock:
+            self._warning_counts[kind] += 1
+            if self._warning_counts[kind] <= AGGREGATE_VERBATIM:
+                verbatim = True
+            else:
+                verbatim = False
+                self._suppressed[(kind, os.path.dirname(filepath))] += 1
+            summary_due = self._suppressed and time.monotonic() - self._last_summary >= AGGREGATE_INTERVAL
+
+        if verbatim:
+            self.logger.warning(message)
+            if self._warning_counts[kind] == AGGREGATE_VERBATIM:
+                self.logger.warning(f"Дальнейшие предупреждения {kind} будут выводиться сводкой")
+        if summary_due:
+            self.flush_aggregates(final=False)
+
+    def flush_aggregates(self, final=True):
+        """Пишет сводку подавленных предупреждений (например, «1 234 PermissionError в /x»)"""
+        with self._aggregate_lock:
+            suppressed = self._suppressed
+            self._suppressed = Counter()
+            self._last_summary = time.monotonic()
+            if final:
+                self._warning_counts = Counter()
+        if not suppressed:
+            return
+
+        by_kind = Counter()
+        for (kind, _), count in suppressed.items():
+            by_kind[kind] += count
+        for kind, total in by_kind.items():
+            dirs = [(directory, count) for (k, directory), count in suppressed.most_common() if k == kind]
+            self.logger.warning(f"Ещё {total:,} предупреждений {kind} в {len(dirs)} папках".replace(',', ' '))
+            for directory, count in dirs[:AGGREGATE_TOP_DIRS]:
+                self.logger.warning(f"   {count:,} {kind} в {directory}".replace(',', ' '))
+            if len(dirs) > AGGREGATE_TOP_DIRS:
+                self.logger.warning(f"   ... и ещё в {len(dirs) - AGGREGATE_TOP_DIRS} папках")
+
+    def get_log_file_path(self):
+        """Путь к файлу лога текущего запуска (файл может быть ещё не создан)"""
+        return self.log_file
 
     def info(self, message):
         self.logger.info(message)
@@ -73,6 +248,8 @@ class DiskTiderLogger:
         mode_text = {
             'trash': 'Перемещение в корзину',
             'delete': 'Удаление навсегда',
+            'hardlink': 'Замена дубликатов жёсткими ссылками',
+            'reflink': 'Замена дубликатов reflink-клонами',
             'preview': 'Режим предпросмотра'
         }
         self.info(f"Режим: {mode_text.get(mode, mode)}")
@@ -93,6 +270,7 @@ class DiskTiderLogger:
         self.log_separator()
         self.info("СКАНИРОВАНИЕ ЗАВЕРШЕНО")
         self.log_separator()
+        self.flush()
 
 # Глобальный экземпляр логгера
 _logger_instance = None
@@ -1,67 +1,84 @@
 # main.py
 import os
-from core import find_duplicates
+import argparse
+from ranking import KeepRanker, KEEP_POLICIES, DEFAULT_KEEP_POLICY
 from utils import (
     format_size,
-    get_file_priority,
-    # Предполагается, что delete_duplicates и count_duplicates_by_extension существуют
-    # delete_duplicates,
-    # count_duplicates_by_extension,
+    format_duration,
+    delete_duplicates,
+    count_duplicates_by_extension,
+    TRASH_AVAILABLE,
 )
 from logger import get_logger
+from models import ScanResult
 
+# Сканирование, оценка, экспорт, база SQLite, удаление и журнал импортируются
+# в ветках, которые их используют: --help и отдельные режимы их не загружают
 
-def show_duplicates(duplicates):
-    """Показывает найденные дубликаты и сортирует их по приоритету"""
+MUSIC_EXTENSIONS = ['.mp3', '.flac', '.wav', '.m4a', '.aac', '.ogg', '.wma']
+
+
+def show_duplicates(result):
+    """Показывает найденные дубликаты (ScanResult) в порядке сохранения"""
     logger = get_logger()
 
-    if not duplicates:
+    if not result:
         print("✨ Дубликатов не найдено!")
         logger.info("Дубликатов не найдено")
         return 0
 
-    total_waste = 0
-    duplicate_count = 0
-
-    print(f"🔴 Найдено групп дубликатов: {len(duplicates)}\n")
+    print(f"🔴 Найдено групп дубликатов: {len(result)}\n")
     print("=" * 80)
 
-    for i, (file_hash, files) in enumerate(duplicates.items(), 1):
-        # Сортируем файлы по приоритету (лучшие первыми)
-        files_sorted = sorted(files, key=lambda x: get_file_priority(x['name']))
-
-        # Обновляем список в словаре, чтобы delete_duplicates знал, что сохранить
-        duplicates[file_hash] = files_sorted
-
-        # Логируем группу
-        # logger.log_duplicate_group(i, files_sorted)
-
-        print(f"\n📁 Группа {i} ({len(files_sorted)} копий)")
-        print(f"Размер файла: {format_size(files_sorted[0]['size'])}")
-        print(f"Занимает лишнего: {format_size(files_sorted[0]['size'] * (len(files_sorted) - 1))}")
+    for i, group in enumerate(result.groups, 1):
+        # Файлы уже упорядочены KeepRanker в find_duplicates: первый сохраняется
+        print(f"\n📁 Группа {i} ({len(group)} копий)")
+        print(f"Размер файла: {format_size(group.size)}")
+        print(f"Занимает лишнего: {format_size(group.wasted_bytes)}")
         print()
 
-        for j, file_info in enumerate(files_sorted, 1):
+        for j, file_info in enumerate(group.files, 1):
             marker = "🟢 [СОХРАНИТЬ]" if j == 1 else "🔴 [УДАЛИТЬ]"
             print(f"  {marker} {file_info['path']}")
 
-        total_waste += files_sorted[0]['size'] * (len(files_sorted) - 1)
-        duplicate_count += len(files_sorted) - 1
-
         print("-" * 80)
 
     print(f"\n📊 ИТОГО:")
-    print(f"   Дубликатов: {duplicate_count} файлов")
-    print(f"   Можно освободить: {format_size(total_waste)}")
+    print(f"   Дубликатов: {result.duplicate_count} файлов")
+    print(f"   Можно освободить: {format_size(result.total_wasted)}")
+
+    return result.duplicate_count
+
+
+def show_estimate(estimate):
+    """Показывает результат быстрой оценки дубликатов"""
+    print(f"\n📈 БЫСТРАЯ ОЦЕНКА")
+    print(f"   Файлов просмотрено: {estimate['files_total']}")
+    print(f"   Кандидатов (совпадает размер): {estimate['candidate_files']} "
+          f"({format_size(estimate['candidate_bytes'])})")
+
+    if estimate['full_sample']:
+        print(f"   Можно освободить: ~{format_size(estimate['estimate'])} (по частичным хешам всех групп)")
+    else:
+        print(f"   Проверено групп: {estimate['buckets_sampled']} из {estimate['buckets_total']}")
+        print(f"   Можно освободить: ~{format_size(estimate['estimate'])} "
+              f"(доверительный интервал {int(estimate['confidence'] * 100)}%: "
+              f"{format_size(estimate['low'])} – {format_size(estimate['high'])})")
+
 
-    # Логируем общую статистику
-    total_files = sum(len(files) for files in duplicates.values())
-    # logger.log_scan_results(total_files, duplicate_count, len(duplicates))
+def show_metrics(summary):
+    """Печатает время и объём чтения по этапам сканирования"""
+    if not summary:
+        return
+    parts = [f"{name} {stage['wall']:.2f} с" for name, stage in summary['stages'].items()]
+    print(f"\n⏱  Этапы: {', '.join(parts)} • прочитано {format_size(summary['bytes_read'])}")
 
-    return duplicate_count
 
+def interactive_scan():
+    """Интерактивный режим: запрашивает папку и параметры, сканирует и предлагает удаление"""
+    from core import find_duplicates
+    from metrics import ScanMetrics
 
-def main():
     logger = get_logger()
 
     print("=" * 80)
@@ -81,27 +98,124 @@ def main():
     print("\n🎯 Искать только музыкальные файлы? (y/n): ", end='')
     filter_music = input().strip().lower() == 'y'
 
-    extensions = ['.mp3', '.flac', '.wav', '.m4a', '.aac', '.ogg', '.wma'] if filter_music else None
+    extensions = MUSIC_EXTENSIONS if filter_music else None
+
+    print("\n📈 Сначала выполнить быструю оценку? (y/n): ", end='')
+    if input().strip().lower() == 'y':
+        from estimator import estimate_reclaimable
+
+        estimate = estimate_reclaimable(directory, extensions)
+        show_estimate(estimate)
+
+        print("\n🔍 Продолжить полное сканирование? (y/n): ", end='')
+        if input().strip().lower() != 'y':
+            logger.info("Полное сканирование отменено пользователем после оценки")
+            return
+
+    # Правило выбора оригинала
+    print("\n🏷  Какой файл в группе оставлять?")
+    policies = list(KEEP_POLICIES.items())
+    for number, (policy, label) in enumerate(policies, 1):
+        print(f"   {number}. {label}")
+    policy_choice = input(f"Выберите правило (Enter — {KEEP_POLICIES[DEFAULT_KEEP_POLICY]}): ").strip()
+    keep_policy = DEFAULT_KEEP_POLICY
+    if policy_choice.isdigit() and 1 <= int(policy_choice) <= len(policies):
+        keep_policy = policies[int(policy_choice) - 1][0]
+
+    preferred_prefixes = []
+    if keep_policy == 'preferred_prefixes':
+        prefixes = input("Введите предпочтительные папки через ';': ").strip()
+        preferred_prefixes = [p.strip() for p in prefixes.split(';') if p.strip()]
 
     # Ищем дубликаты
     # NOTE: Используем рекурсивное сканирование по умолчанию (из core.py)
-    duplicates = find_duplicates(directory, extensions)
+    metrics = ScanMetrics(run={'directory': directory})
+    duplicates = find_duplicates(directory, extensions, ranker=KeepRanker(keep_policy, preferred_prefixes),
+                                 metrics=metrics)
+    result = ScanResult.from_duplicates(duplicates, metrics=metrics.summary())
 
     # Показываем результаты
-    duplicate_count = show_duplicates(duplicates)
+    duplicate_count = show_duplicates(result)
+    show_metrics(result.metrics)
 
     if duplicate_count == 0:
         logger.log_scan_complete()
         print(f"\n📄 Лог сохранён: {logger.get_log_file_path()}")
         return
 
+    export_path = input("\n💾 Сохранить результаты в файл .jsonl/.csv (Enter — пропустить): ").strip()
+    if export_path:
+        from export import export_result
+
+        groups_written = export_result(result, export_path)
+        print(f"   Сохранено групп: {groups_written} → {export_path}")
+
+    deletion_menu(result)
+
+
+def print_delete_progress(progress):
+    """Печатает строку прогресса удаления поверх предыдущей"""
+    print(f"\r   {progress['done']}/{progress['total']} файлов • "
+          f"освобождено {format_size(progress['freed_bytes'])} • "
+          f"{progress['files_per_sec']:.0f} файлов/с • {format_size(progress['bytes_per_sec'])}/с"
+          + (f" • осталось ~{format_duration(progress['eta'])}" if progress['eta'] is not None else ""),
+          end='', flush=True)
+
+
+# Итог удаления по режимам (как в окне результатов GUI)
+DELETE_SUMMARY_LABELS = {
+    'trash': "Перемещено в корзину",
+    'delete': "Удалено навсегда",
+    'hardlink': "Заменено жёсткими ссылками",
+    'reflink': "Заменено reflink-клонами",
+}
+
+
+def print_delete_summary(deleted_count, freed_space_str, errors, mode, journal_path):
+    """Итог удаления: обработано, освобождено, ошибки и подсказка для отмены"""
+    # Строка прогресса печатается без перевода строки
+    print()
+    print(f"\n✨ Готово! {DELETE_SUMMARY_LABELS[mode]}: {deleted_count} файлов")
+    print(f"💾 Освобождено: {freed_space_str}")
+    if errors:
+        print(f"⚠️ Ошибок и пропущенных файлов: {len(errors)}")
+        for error in errors[:10]:
+            print(f"   • {error}")
+        if len(errors) > 10:
+            print(f"   ... и ещё {len(errors) - 10} (подробности в логе)")
+    # Необратимое удаление отменить нельзя
+    if mode != 'delete' and deleted_count:
+        print(f"↩️  Отменить: python main.py --undo {journal_path}")
+
+
+def deletion_menu(result):
+    """Интерактивное удаление дубликатов из ScanResult"""
+    from journal import new_journal_path
+
+    logger = get_logger()
+
     # Спрашиваем об удалении
     print("\n" + "=" * 80)
     print("🗑️  РЕЖИМ УДАЛЕНИЯ")
     print("=" * 80)
 
-    # Информируем только о необратимом удалении
-    print("❌ send2trash не используется. Удаление будет НЕОБРАТИМЫМ! Будьте осторожны.")
+    delete_mode = 'trash' if TRASH_AVAILABLE else 'delete'
+    if TRASH_AVAILABLE:
+        print("✓ Файлы будут перемещены в корзину, их можно будет восстановить.")
+    else:
+        print("❌ send2trash не установлен. Удаление будет НЕОБРАТИМЫМ! Будьте осторожны.")
+
+    print("\n🔧 Что делать с дубликатами?")
+    print("   1. Удалить (по умолчанию)")
+    print("   2. Заменить жёсткими ссылками на оригинал")
+    print("   3. Заменить reflink-клонами (btrfs/xfs; иначе — жёсткие ссылки)")
+    method = input("Выберите способ (1/2/3): ").strip()
+    if method == '2':
+        delete_mode = 'hardlink'
+        print("   Пути сохранятся, содержимое будет храниться один раз (только в пределах одного диска).")
+    elif method == '3':
+        delete_mode = 'reflink'
+        print("   Файлы останутся независимыми, общие данные будут храниться один раз.")
 
     print("\n1️⃣  Удалить ВСЕ дубликаты")
     print("2️⃣  Удалить дубликаты только определённого формата")
@@ -121,25 +235,30 @@ def main():
         if not target_extension.startswith('.'):
             target_extension = '.' + target_extension
 
+        directory_filter = input("Ограничить папкой (Enter — во всех папках): ").strip() or None
+
         # Подсчитываем, сколько будет удалено
-        # dup_count, dup_space = count_duplicates_by_extension(duplicates, target_extension)
+        dup_count, dup_space = count_duplicates_by_extension(result, target_extension, directory_filter)
 
-        # if dup_count == 0:
-        #     print(f"\n❌ Дубликатов с расширением {target_extension} не найдено!")
-        #     logger.warning(f"Дубликатов с расширением {target_extension} не найдено")
-        #     logger.log_scan_complete()
-        #     print(f"\n📄 Лог сохранён: {logger.get_log_file_path()}")
-        #     return
+        if dup_count == 0:
+            print(f"\n❌ Дубликатов с расширением {target_extension} не найдено!")
+            logger.warning(f"Дубликатов с расширением {target_extension} не найдено")
+            logger.log_scan_complete()
+            print(f"\n📄 Лог сохранён: {logger.get_log_file_path()}")
+            return
 
-        # print(f"\n📊 Найдено дубликатов формата {target_extension}: {dup_count} файлов")
-        # print(f"💾 Будет освобождено: {format_size(dup_space)}")
+        print(f"\n📊 Найдено дубликатов формата {target_extension}: {dup_count} файлов")
+        print(f"💾 Будет освобождено: {format_size(dup_space)}")
 
         confirmation = input(f"Подтвердите удаление дубликатов {target_extension}? (да/нет): ").strip().lower()
 
         if confirmation in ('да', 'yes'):
             print(f"\n🔄 Удаляю дубликаты формата {target_extension}...\n")
-            # delete_duplicates(duplicates, keep_first=True, target_extension=target_extension)
-            print("\n✨ Готово!")
+            journal_path = new_journal_path()
+            deleted_count, freed_space_str, errors = delete_duplicates(
+                result, target_extension, directory_filter, mode=delete_mode,
+                progress=print_delete_progress, journal_path=journal_path)
+            print_delete_summary(deleted_count, freed_space_str, errors, delete_mode, journal_path)
         else:
             print("\n✋ Удаление отменено.")
             logger.info("Удаление отменено пользователем")
@@ -150,8 +269,10 @@ def main():
 
         if confirmation in ('да', 'yes'):
             print("\n🔄 Удаляю все дубликаты...\n")
-            # delete_duplicates(duplicates, keep_first=True)
-            print("\n✨ Готово!")
+            journal_path = new_journal_path()
+            deleted_count, freed_space_str, errors = delete_duplicates(
+                result, mode=delete_mode, progress=print_delete_progress, journal_path=journal_path)
+            print_delete_summary(deleted_count, freed_space_str, errors, delete_mode, journal_path)
         else:
             print("\n✋ Удаление отменено.")
             logger.info("Удаление отменено пользователем")
@@ -165,5 +286,140 @@ def main():
     print(f"\n📄 Лог сохранён: {logger.get_log_file_path()}")
 
 
+def export_scan(directory, export_path, extensions=None):
+    """Неинтерактивное сканирование с потоковой записью групп в файл"""
+    from core import find_duplicates
+    from export import ResultExporter
+
+    with ResultExporter(export_path) as exporter:
+        find_duplicates(directory, extensions, on_group=exporter, keep_results=False)
+    print(f"💾 Записано групп дубликатов: {exporter.groups_written} → {export_path}")
+
+
+def load_and_delete(import_path):
+    """Загружает экспортированные результаты, перепроверяет файлы и предлагает удаление"""
+    from export import load_results
+
+    logger = get_logger()
+    result, stale = load_results(import_path)
+    if stale:
+        print(f"⚠️ Изменились или пропали после сканирования: {len(stale)} файлов — они пропущены")
+        logger.warning(f"Пропущено устаревших файлов при загрузке {import_path}: {len(stale)}")
+
+    if show_duplicates(result) == 0:
+        return
+    deletion_menu(result)
+
+
+def scan_to_db(directory, db_path, extensions=None):
+    """Неинтерактивное сканирование с записью результатов в базу SQLite"""
+    from core import find_duplicates
+    from results_db import ResultsDB
+
+    db = ResultsDB.create(db_path, directory, {'extensions': extensions})
+    try:
+        find_duplicates(directory, extensions, on_group=db.add_group, on_error=db.add_error, keep_results=False)
+        db.finish()
+        groups, wasted = db.count_groups()
+        print(f"🗄  Записано групп дубликатов: {groups} ({format_size(wasted)} лишнего) → {db_path}")
+    finally:
+        db.close()
+
+
+def browse_db(db_path, page=1, page_size=50, order_by='wasted', **filters):
+    """Показывает страницу групп из базы результатов и предлагает удаление отфильтрованных"""
+    if not os.path.isfile(db_path):
+        print(f"❌ База результатов не найдена: {db_path}")
+        return
+
+    from results_db import ResultsDB
+
+    with ResultsDB(db_path) as db:
+        info = db.scan_info() or {}
+        total_groups, total_wasted = db.count_groups(**filters)
+        print(f"🗄  {db_path}: папка {info.get('root')}")
+        print(f"   Групп: {total_groups} • можно освободить {format_size(total_wasted)}")
+
+        pages = max(1, (total_groups + page_size - 1) // page_size)
+        groups = db.query_groups(order_by=order_by, limit=page_size, offset=(page - 1) * page_size, **filters)
+        print(f"   Страница {page} из {pages}\n")
+        for i, group in enumerate(groups, (page - 1) * page_size + 1):
+            print(f"📁 Группа {i}: {len(group)} копий • {format_size(group.size)} • "
+                  f"{format_size(group.wasted_bytes)} лишнего")
+            for j, file_info in enumerate(group.files):
+                marker = "🟢" if j == 0 else "🔴"
+                print(f"   {marker} {file_info['path']}")
+
+        if total_groups == 0:
+            return
+        print("\n🗑  Перейти к удалению всех отфильтрованных групп? (y/n): ", end='')
+        if input().strip().lower() != 'y':
+            return
+        result = db.load_result(**filters)
+
+    deletion_menu(result)
+
+
+def undo_deletion(journal_path):
+    """Отменяет удаление по журналу: возвращает файлы из корзины и разрывает жёсткие ссылки"""
+    if not os.path.isfile(journal_path):
+        print(f"❌ Журнал удаления не найден: {journal_path}")
+        return
+
+    from journal import undo_journal
+
+    restored, errors = undo_journal(journal_path)
+    print(f"↩️  Восстановлено файлов: {restored}")
+    if errors:
+        print(f"⚠️ Не удалось восстановить: {len(errors)}")
+        for error in errors[:10]:
+            print(f"   • {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DiskTider — поиск и удаление дубликатов файлов")
+    parser.add_argument('directory', nargs='?', help="папка для сканирования (для --export)")
+    parser.add_argument('--music', action='store_true', help="искать только музыкальные файлы")
+    parser.add_argument('--export', metavar='FILE', help="записать найденные группы в .jsonl/.csv без вопросов")
+    parser.add_argument('--load', metavar='FILE', help="загрузить группы из .jsonl/.csv и перейти к удалению")
+    parser.add_argument('--db', metavar='FILE', help="записать результаты сканирования в базу SQLite")
+    parser.add_argument('--open-db', metavar='FILE', help="открыть базу результатов без повторного сканирования")
+    parser.add_argument('--page', type=int, default=1, help="номер страницы для --open-db")
+    parser.add_argument('--page-size', type=int, default=50, help="групп на странице для --open-db")
+    parser.add_argument('--order', choices=['wasted', 'size', 'count'], default='wasted',
+                        help="сортировка групп для --open-db")
+    parser.add_argument('--ext', help="фильтр по расширению для --open-db")
+    parser.add_argument('--prefix', help="фильтр по папке для --open-db")
+    parser.add_argument('--min-size', type=int, help="минимальный размер файла (байт) для --open-db")
+    parser.add_argument('--probe-reflink', metavar='DIR', help="проверить поддержку reflink в папке")
+    parser.add_argument('--undo', metavar='JOURNAL', help="отменить удаление по журналу (корзина и жёсткие ссылки)")
+    args = parser.parse_args(argv)
+
+    extensions = MUSIC_EXTENSIONS if args.music else None
+
+    if args.undo:
+        undo_deletion(args.undo)
+    elif args.probe_reflink:
+        from deletion import reflink_supported
+
+        supported = reflink_supported(args.probe_reflink)
+        print(f"reflink в {args.probe_reflink}: {'поддерживается' if supported else 'unsupported'}")
+    elif args.open_db:
+        browse_db(args.open_db, page=max(1, args.page), page_size=args.page_size, order_by=args.order,
+                  extension=args.ext, path_prefix=args.prefix, min_size=args.min_size)
+    elif args.load:
+        load_and_delete(args.load)
+    elif args.db:
+        if not args.directory or not os.path.isdir(args.directory):
+            parser.error("для --db укажите существующую папку")
+        scan_to_db(args.directory, args.db, extensions)
+    elif args.export:
+        if not args.directory or not os.path.isdir(args.directory):
+            parser.error("для --export укажите существующую папку")
+        export_scan(args.directory, args.export, extensions)
+    else:
+        interactive_scan()
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
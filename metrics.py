@@ -0,0 +1,135 @@
+# metrics.py
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from logger import get_logger
+
+# Этапы конвейера в порядке выполнения
+STAGES = ('traversal', 'bucketing', 'partial_hash', 'full_hash', 'verify', 'deletion')
+
+
+class Span:
+    """
+    Замер одного этапа: время и счётчики.
+
+    syscalls_est — оценка числа системных вызовов этапа, а не замер: она
+    считается по числу файлов и фиксированной стоимости операции
+    (scandir/stat/open/seek/read/close/unlink; см. utils.DELETION_SYSCALLS).
+    Там, где вызовы делает сторонний код (send2trash, пул verify), — None.
+    """
+
+    __slots__ = ('name', 'started', 'wall', 'files', 'bytes_read', 'syscalls_est', 'errors', 'extra')
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.time()
+        self.wall = 0.0
+        self.files = 0
+        self.bytes_read = 0
+        self.syscalls_est = 0
+        self.errors = 0
+        self.extra = {}
+
+    def as_dict(self):
+        record = {
+            'span': self.name,
+            'started': self.started,
+            'wall': round(self.wall, 6),
+            'files': self.files,
+            'bytes_read': self.bytes_read,
+            'syscalls_est': self.syscalls_est,
+            'errors': self.errors,
+        }
+        record.update(self.extra)
+        return record
+
+
+def metrics_path_for_log(log_file):
+    """Файл метрик рядом с текстовым логом: scan_<время>.metrics.jsonl"""
+    return os.path.splitext(log_file)[0] + '.metrics.jsonl'
+
+
+class ScanMetrics:
+    """
+    Метрики одного запуска: набор Span, записываемых в JSON Lines рядом с логом.
+
+    Каждый завершённый этап сразу дописывается строкой в файл, summary()
+    возвращает сводку для сравнения запусков между собой.
+    """
+
+    def __init__(self, run=None, path=None):
+        self.run = run or {}
+        self.path = path or metrics_path_for_log(get_logger().log_file)
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def start(self, name, **extra):
+        """
+        Открывает этап, время которого набирается по частям (span.wall += ...):
+        так замеряются чередующиеся этапы, например частичное и полное
+        хеширование внутри одного цикла. Закрывается через finish().
+        """
+        span = Span(name)
+        span.extra.update(extra)
+        return span
+
+    @contextmanager
+    def span(self, name, **extra):
+        """Замер непрерывного этапа: with metrics.span('traversal') as span: ..."""
+        span = self.start(name, **extra)
+        started = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span.wall += time.perf_counter() - started
+            self.finish(span)
+
+    def finish(self, span):
+        record = dict(self.run, **span.as_dict())
+        with self._lock:
+            self.spans.append(span)
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            except OSError as e:
+                get_logger().warning(f"Не удалось записать метрики в {self.path}: {e}")
+
+    def summary(self):
+        """
+        Сводка по этапам: {'stages': {имя: поля Span}, 'wall': общее время,
+        'bytes_read', 'errors'}. Повторяющиеся этапы суммируются.
+        """
+        stages = {}
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: STAGES.index(span.name) if span.name in STAGES else len(STAGES))
+        for span in spans:
+            record = span.as_dict()
+            del record['span'], record['started']
+            total = stages.get(span.name)
+            if total is None:
+                stages[span.name] = record
+                continue
+            for key, value in record.items():
+                if isinstance(value, (int, float)) and isinstance(total.get(key), (int, float)):
+                    total[key] += value
+                else:
+                    total[key] = value
+        return {
+            'stages': stages,
+            'wall': round(sum(stage['wall'] for stage in stages.values()), 6),
+            'bytes_read': sum(stage['bytes_read'] for stage in stages.values()),
+            'errors': sum(stage['errors'] for stage in stages.values()),
+        }
+
+    def log_summary(self):
+        """Пишет в текстовый лог короткую строку с временем этапов"""
+        summary = self.summary()
+        parts = [f"{name} {stage['wall']:.2f} с" for name, stage in summary['stages'].items()]
+        get_logger().info(f"Метрики: {', '.join(parts)}; всего {summary['wall']:.2f} с → {self.path}")
+        return summary
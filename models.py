@@ -0,0 +1,498 @@
+# models.py
+import os
+from bisect import bisect_left, bisect_right
+
+
+def file_extension(file_info):
+    """Расширение файла в нижнем регистре ('' если его нет)"""
+    return os.path.splitext(file_info['name'])[1].lower()
+
+
+def normalize_extension(extension):
+    """'.MP3' / 'mp3' -> '.mp3'; None и '' остаются как есть"""
+    if not extension:
+        return extension
+    extension = extension.lower()
+    return extension if extension.startswith('.') else '.' + extension
+
+
+def path_key(path):
+    return os.path.normcase(os.path.normpath(path))
+
+
+def _ancestors(directory):
+    """Сама директория и все её родители (ключи в формате path_key)"""
+    while True:
+        yield directory
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return
+        directory = parent
+
+
+class DuplicateGroup:
+    """
+    Группа файлов с одинаковым содержимым.
+    files упорядочены KeepRanker: files[0] сохраняется, остальные — дубликаты.
+    """
+
+    __slots__ = ('digest', 'size', 'files', 'wasted_bytes')
+
+    def __init__(self, digest, files):
+        self.digest = digest
+        self.files = files
+        self.size = files[0]['size'] if files else 0
+        self.wasted_bytes = self.size * max(0, len(files) - 1)
+
+    @property
+    def keep(self):
+        return self.files[0]
+
+    @property
+    def duplicates(self):
+        return self.files[1:]
+
+    def deletion_record(self, file_info):
+        """
+        Копия file_info для движка удаления: с хешем группы, путём сохраняемого
+        файла (keep_path) и его записью (keep) для проверки перед удалением.
+        """
+        keep = self.files[0]
+        return dict(file_info, keep_path=keep['path'], keep=keep, digest=self.digest)
+
+    def __len__(self):
+        return len(self.files)
+
+
+class ScanResult:
+    """
+    Результат сканирования: группы дубликатов и заранее посчитанные агрегаты.
+
+    groups — список DuplicateGroup, отсортированный по лишнему месту (больше — раньше)
+    total_wasted — сколько байт освободит удаление всех дубликатов
+    duplicate_count — сколько файлов будет удалено (все, кроме сохраняемых)
+    extension_totals — {расширение: [файлов, байт]} по удаляемым дубликатам
+    path_index — {путь: (группа, позиция в группе)}
+    metrics — сводка замеров этапов сканирования (ScanMetrics.summary()) или None
+    risky — множество путей в рискованных папках (classify_risk) или None, пока не классифицировано
+    """
+
+    __slots__ = ('groups', 'total_wasted', 'duplicate_count', 'file_count', 'extension_totals', 'path_index',
+                 'metrics', 'risky', '_aggregate_index', '_filter_index')
+
+    def __init__(self, groups=(), metrics=None):
+        self.groups = sorted(groups, key=lambda group: group.wasted_bytes, reverse=True)
+        self.metrics = metrics
+        self.risky = None
+        self.total_wasted = 0
+        self.duplicate_count = 0
+        self.file_count = 0
+        self.extension_totals = {}
+        self.path_index = {}
+        self._aggregate_index = None
+        self._filter_index = None
+
+        for group in self.groups:
+            self.total_wasted += group.wasted_bytes
+            self.duplicate_count += len(group.files) - 1
+            self.file_count += len(group.files)
+            for position, file_info in enumerate(group.files):
+                self.path_index[file_info['path']] = (group, position)
+                if position == 0:
+                    continue
+                totals = self.extension_totals.setdefault(file_extension(file_info), [0, 0])
+                totals[0] += 1
+                totals[1] += file_info['size']
+
+    @classmethod
+    def from_duplicates(cls, duplicates, metrics=None):
+        """Строит результат из словаря {hash: [file_info, ...]}, возвращаемого find_duplicates"""
+        return cls((DuplicateGroup(digest, files) for digest, files in duplicates.items() if len(files) > 1),
+                   metrics=metrics)
+
+    def to_duplicates(self):
+        """Обратное преобразование в словарь {hash: [file_info, ...]}"""
+        return {group.digest: group.files for group in self.groups}
+
+    def __len__(self):
+        return len(self.groups)
+
+    def __bool__(self):
+        return bool(self.groups)
+
+    def lookup(self, path):
+        """Возвращает (группа, позиция) для пути или (None, None)"""
+        return self.path_index.get(path, (None, None))
+
+    def files_to_delete(self, paths=None):
+        """
+        Список записей для удаления (DuplicateGroup.deletion_record).
+        Без аргумента — все дубликаты (все файлы групп, кроме первого);
+        с paths — только записи для указанных путей, известных результату.
+        """
+        if paths is None:
+            return [group.deletion_record(file_info) for group in self.groups for file_info in group.files[1:]]
+
+        files = []
+        for path in paths:
+            group, position = self.path_index.get(path, (None, None))
+            if group is not None:
+                files.append(group.deletion_record(group.files[position]))
+        return files
+
+    def without(self, paths):
+        """
+        Результат без файлов paths (например, уже обработанных прерванным
+        удалением); группы, где осталось меньше двух файлов, выпадают.
+        Разметка риска переносится.
+        """
+        paths = set(paths)
+        groups = []
+        for group in self.groups:
+            files = [file_info for file_info in group.files if file_info['path'] not in paths]
+            if len(files) == len(group.files):
+                groups.append(group)
+            elif len(files) > 1:
+                groups.append(DuplicateGroup(group.digest, files))
+        result = ScanResult(groups, metrics=self.metrics)
+        result.risky = self.risky
+        return result
+
+    def aggregate_index(self):
+        """AggregateIndex по удаляемым дубликатам (строится при первом обращении)"""
+        if self._aggregate_index is None:
+            self._aggregate_index = AggregateIndex(self.groups)
+        return self._aggregate_index
+
+    def classify_risk(self, classifier):
+        """Размечает все файлы результата одним пакетным проходом RiskClassifier"""
+        self.risky = classifier.classify(self.path_index)
+        # Индекс фильтра хранит риск — после новой разметки его нужно перестроить
+        self._filter_index = None
+
+    def is_risky(self, path):
+        return self.risky is not None and path in self.risky
+
+    def filter_index(self):
+        """FilterIndex по всем файлам результата (строится при первом обращении)"""
+        if self._filter_index is None:
+            self._filter_index = FilterIndex(self.groups, self.risky)
+        return self._filter_index
+
+
+class AggregateIndex:
+    """
+    Индекс удаляемых дубликатов (все файлы групп, кроме сохраняемого)
+    по расширению и по префиксу директории.
+
+    count() — O(1): суммы заранее накоплены для каждой пары
+    (директория-предок, расширение), включая «любую директорию» и «любое расширение».
+    select() — O(log n + k): бинарный поиск по отсортированным путям
+    внутри списка нужного расширения.
+    """
+
+    __slots__ = ('_totals', '_keys', '_files')
+
+    def __init__(self, groups):
+        self._totals = {}
+        entries = {}
+
+        for group in groups:
+            for file_info in group.files[1:]:
+                extension = file_extension(file_info)
+                key = path_key(file_info['path'])
+                size = file_info['size']
+
+                for directory in (None, *_ancestors(os.path.dirname(key))):
+                    for ext in (None, extension):
+                        totals = self._totals.get((directory, ext))
+                        if totals is None:
+                            self._totals[(directory, ext)] = [1, size]
+                        else:
+                            totals[0] += 1
+                            totals[1] += size
+
+                entries.setdefault(None, []).append((key, group, file_info))
+                entries.setdefault(extension, []).append((key, group, file_info))
+
+        self._keys = {}
+        self._files = {}
+        for ext, items in entries.items():
+            items.sort(key=lambda item: item[0])
+            self._keys[ext] = [key for key, _, _ in items]
+            self._files[ext] = [(group, file_info) for _, group, file_info in items]
+
+    def count(self, extension=None, directory=None):
+        """Возвращает (файлов, байт) дубликатов с расширением extension внутри directory"""
+        directory_key = path_key(directory) if directory else None
+        totals = self._totals.get((directory_key, normalize_extension(extension)))
+        return (totals[0], totals[1]) if totals else (0, 0)
+
+    def select(self, extension=None, directory=None):
+        """Записи для удаления (DuplicateGroup.deletion_record) с расширением extension внутри directory"""
+        extension = normalize_extension(extension)
+        keys = self._keys.get(extension, [])
+        files = self._files.get(extension, [])
+        if directory:
+            prefix = path_key(directory)
+            if not prefix.endswith(os.sep):
+                prefix += os.sep
+            lo = bisect_left(keys, prefix)
+            hi = bisect_left(keys, prefix + '\U0010ffff', lo)
+            files = files[lo:hi]
+        return [group.deletion_record(file_info) for group, file_info in files]
+
+    def extensions(self):
+        """{расширение: (файлов, байт)} по всему результату"""
+        return {ext: tuple(totals) for (directory, ext), totals in self._totals.items()
+                if directory is None and ext is not None}
+
+
+class DeleteSelection:
+    """
+    Какие файлы отмечены к удалению — модель, которую Treeview только отображает.
+
+    selected — {путь: размер}; по умолчанию отмечены все дубликаты добавленных
+    групп (все файлы, кроме сохраняемого). Переключение и проверка — O(1),
+    записи для удаления строятся за O(отмеченных) через ScanResult.path_index.
+    """
+
+    __slots__ = ('selected', 'selected_bytes')
+
+    def __init__(self, groups=()):
+        self.selected = {}
+        self.selected_bytes = 0
+        for group in groups:
+            self.add_group(group)
+
+    def add_group(self, group):
+        for file_info in group.files[1:]:
+            self.select(file_info, True)
+
+    def __len__(self):
+        return len(self.selected)
+
+    def __contains__(self, path):
+        return path in self.selected
+
+    def select(self, file_info, selected=True):
+        """Отмечает (или снимает отметку с) файла; возвращает True, если состояние изменилось"""
+        path = file_info['path']
+        if (path in self.selected) == selected:
+            return False
+        if selected:
+            self.selected[path] = file_info['size']
+            self.selected_bytes += file_info['size']
+        else:
+            self.selected_bytes -= self.selected.pop(path)
+        return True
+
+    def toggle(self, file_info):
+        """Переключает отметку; возвращает новое состояние"""
+        selected = file_info['path'] not in self.selected
+        self.select(file_info, selected)
+        return selected
+
+    @classmethod
+    def carry_over(cls, previous, old_result, new_result):
+        """
+        Отметки для new_result с сохранением выбора пользователя из previous:
+        файл, который и в old_result был дубликатом группы с тем же хешем,
+        сохраняет свою отметку; остальные дубликаты отмечаются по умолчанию.
+        Файлы, пропавшие или ставшие сохраняемыми, из отметок выпадают.
+        """
+        selection = cls()
+        for group in new_result.groups:
+            for file_info in group.files[1:]:
+                old_group, old_position = old_result.lookup(file_info['path'])
+                if old_group is not None and old_position and old_group.digest == group.digest:
+                    selection.select(file_info, file_info['path'] in previous)
+                else:
+                    selection.select(file_info, True)
+        return selection
+
+    def records(self, result):
+        """Записи удаления (DuplicateGroup.deletion_record) для отмеченных файлов результата"""
+        return result.files_to_delete(self.selected)
+
+
+class FilterIndex:
+    """
+    Индексы для фильтрации всех файлов результата (включая сохраняемые).
+
+    Файлы нумеруются подряд в порядке групп, поэтому отсортированные номера
+    дают группы в том же порядке, что и ScanResult.groups. Индексы:
+    расширение -> номера; отсортированные пути (префикс — бинарный поиск,
+    как в AggregateIndex); группы, отсортированные по размеру (диапазон —
+    бинарный поиск); рискованные файлы по множеству путей risky
+    (ScanResult.risky).
+
+    match() перебирает только самый узкий из заданных критериев, остальные
+    проверяются поэлементно за O(1), так что стоимость — O(k log k) от числа
+    подходящих под узкий критерий файлов, а не от размера результата.
+    """
+
+    __slots__ = ('groups', '_entries', '_group_of', '_extension_of', '_key_of', '_by_extension',
+                 '_keys', '_key_ids', '_group_starts', '_size_order', '_sorted_sizes', '_risky')
+
+    def __init__(self, groups, risky=None):
+        self.groups = list(groups)
+        self._entries = []
+        self._group_of = []
+        self._extension_of = []
+        self._key_of = []
+        self._by_extension = {}
+        self._group_starts = []
+        self._risky = set()
+
+        for group_index, group in enumerate(self.groups):
+            self._group_starts.append(len(self._entries))
+            for position, file_info in enumerate(group.files):
+                file_id = len(self._entries)
+                extension = file_extension(file_info)
+                self._entries.append((group, position))
+                self._group_of.append(group_index)
+                self._extension_of.append(extension)
+                self._key_of.append(path_key(file_info['path']))
+                self._by_extension.setdefault(extension, []).append(file_id)
+                if risky and file_info['path'] in risky:
+                    self._risky.add(file_id)
+        self._group_starts.append(len(self._entries))
+
+        self._key_ids = sorted(range(len(self._key_of)), key=self._key_of.__getitem__)
+        self._keys = [self._key_of[file_id] for file_id in self._key_ids]
+        self._size_order = sorted(range(len(self.groups)), key=lambda index: self.groups[index].size)
+        self._sorted_sizes = [self.groups[index].size for index in self._size_order]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _prefix_range(self, prefix):
+        prefix = path_key(prefix)
+        if not prefix.endswith(os.sep):
+            prefix += os.sep
+        lo = bisect_left(self._keys, prefix)
+        hi = bisect_left(self._keys, prefix + '\U0010ffff', lo)
+        return prefix, lo, hi
+
+    def _size_range(self, min_size, max_size):
+        lo = bisect_left(self._sorted_sizes, min_size) if min_size is not None else 0
+        hi = (bisect_right(self._sorted_sizes, max_size, lo) if max_size is not None
+              else len(self._sorted_sizes))
+        return lo, hi
+
+    def match(self, extension=None, prefix=None, min_size=None, max_size=None, risky=None):
+        """
+        Номера файлов (по возрастанию), подходящих под все заданные условия;
+        None, если не задано ни одного условия (подходит всё).
+
+        extension — '.mp3' или 'mp3'; prefix — директория; min_size/max_size —
+        границы размера в байтах включительно; risky — True/False для файлов
+        в рискованных/обычных папках.
+        """
+        candidates = []
+        checks = []
+
+        if extension:
+            extension = normalize_extension(extension)
+            ids = self._by_extension.get(extension, [])
+            candidates.append((len(ids), lambda: ids, True))
+            checks.append(lambda file_id: self._extension_of[file_id] == extension)
+
+        if prefix:
+            key_prefix, lo, hi = self._prefix_range(prefix)
+            candidates.append((hi - lo, lambda: self._key_ids[lo:hi], False))
+            checks.append(lambda file_id: self._key_of[file_id].startswith(key_prefix))
+
+        if min_size is not None or max_size is not None:
+            size_lo, size_hi = self._size_range(min_size, max_size)
+            size_groups = self._size_order[size_lo:size_hi]
+            starts = self._group_starts
+            candidates.append((
+                sum(starts[index + 1] - starts[index] for index in size_groups),
+                lambda: [file_id for index in size_groups for file_id in range(starts[index], starts[index + 1])],
+                False
+            ))
+            low = min_size if min_size is not None else 0
+            high = max_size if max_size is not None else float('inf')
+            checks.append(lambda file_id: low <= self.groups[self._group_of[file_id]].size <= high)
+
+        if risky is not None:
+            if risky:
+                candidates.append((len(self._risky), lambda: self._risky, False))
+            else:
+                candidates.append((
+                    len(self._entries) - len(self._risky),
+                    lambda: (file_id for file_id in range(len(self._entries)) if file_id not in self._risky),
+                    True
+                ))
+            checks.append(lambda file_id: (file_id in self._risky) == risky)
+
+        if not candidates:
+            return None
+
+        narrowest = min(range(len(candidates)), key=lambda index: candidates[index][0])
+        others = [check for index, check in enumerate(checks) if index != narrowest]
+        _, produce, ordered = candidates[narrowest]
+        ids = produce()
+        if others:
+            ids = [file_id for file_id in ids if all(check(file_id) for check in others)]
+        # Номера по расширению и обход по порядку уже упорядочены — сортировка не нужна
+        return list(ids) if ordered else sorted(ids)
+
+    def matching_groups(self, ids):
+        """Группы, в которых есть хотя бы один из файлов ids, в порядке результата"""
+        if ids is None:
+            return list(self.groups)
+        groups = []
+        last = None
+        for file_id in ids:
+            group_index = self._group_of[file_id]
+            if group_index != last:
+                groups.append(self.groups[group_index])
+                last = group_index
+        return groups
+
+    def entries(self, ids):
+        """(группа, позиция) для каждого номера файла; ids=None — все файлы"""
+        if ids is None:
+            return self._entries
+        return [self._entries[file_id] for file_id in ids]
+
+
+class ResultDiff:
+    """
+    Разница двух результатов по хешу группы.
+
+    added — группы new, которых не было в old; removed — группы old,
+    которых нет в new; changed — пары (старая, новая) с тем же хешем, но
+    другим составом или порядком файлов; unchanged — пары с прежним составом.
+    """
+
+    __slots__ = ('added', 'removed', 'changed', 'unchanged')
+
+    def __init__(self, old, new):
+        old_groups = {group.digest: group for group in old.groups}
+        self.added = []
+        self.changed = []
+        self.unchanged = []
+        for group in new.groups:
+            old_group = old_groups.pop(group.digest, None)
+            if old_group is None:
+                self.added.append(group)
+            elif _group_paths(old_group) == _group_paths(group):
+                self.unchanged.append((old_group, group))
+            else:
+                self.changed.append((old_group, group))
+        self.removed = list(old_groups.values())
+
+    def changed_digests(self):
+        """Хеши групп, строки которых нужно перестроить (новые и изменившиеся)"""
+        return {group.digest for group in self.added} | {group.digest for _, group in self.changed}
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+
+def _group_paths(group):
+    return [file_info['path'] for file_info in group.files]
@@ -0,0 +1,136 @@
+# progress.py
+import threading
+import time
+
+
+class OperationControl:
+    """
+    Кооперативная отмена и пауза долгой операции.
+
+    Рабочий поток периодически вызывает checkpoint(): во время паузы вызов
+    блокируется, после отмены возвращает True. Экземпляр вызываемый, поэтому
+    его можно передать как cancel_flag в find_duplicates/estimate_reclaimable.
+    """
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+
+    def cancel(self):
+        self._cancelled.set()
+        # Поставленную на паузу операцию нужно разбудить, чтобы она увидела отмену
+        self._running.set()
+
+    def pause(self):
+        if not self._cancelled.is_set():
+            self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    def checkpoint(self):
+        """Ждёт снятия паузы; возвращает True, если операцию нужно прервать"""
+        self._running.wait()
+        return self._cancelled.is_set()
+
+    __call__ = checkpoint
+
+
+class ProgressChannel:
+    """
+    Потокобезопасный «почтовый ящик» последнего состояния прогресса.
+
+    Рабочий поток публикует словари через publish() (совместим с колбэком
+    progress), GUI опрашивает poll() по таймеру в своём потоке. Промежуточные
+    состояния, которые GUI не успел забрать, перезаписываются — важен только
+    последний снимок.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latest = None
+
+    def publish(self, progress):
+        with self._lock:
+            self._latest = progress
+
+    __call__ = publish
+
+    def poll(self):
+        """Возвращает последнее непрочитанное состояние или None"""
+        with self._lock:
+            progress, self._latest = self._latest, None
+        return progress
+
+
+class ScanProgress:
+    """
+    Общие счётчики хода сканирования.
+
+    Поток сканирования только увеличивает целые поля (это почти ничего не
+    стоит в горячем цикле), а читатель — GUI по своему таймеру — вызывает
+    snapshot(), где считаются скорости и оставшееся время. Так частота
+    отчётов определяется читателем, а не числом файлов.
+
+    Этапы: 'traversal' (обход папок), 'hashing' (частичный и полный хеш),
+    'done'. Прогресс этапа хеширования меряется байтами кандидатов, которые
+    уже разрешены: отсеяны по частичному хешу или прохешированы целиком.
+    """
+
+    def __init__(self):
+        self.stage = 'traversal'
+        self.dirs_visited = 0
+        self.files_seen = 0
+        self.candidate_files = 0
+        self.candidate_bytes = 0
+        self.files_done = 0
+        self.bytes_done = 0
+        self.bytes_read = 0
+        self.groups_found = 0
+        self.started = time.monotonic()
+        self.stage_started = self.started
+
+    def set_stage(self, stage):
+        self.stage = stage
+        self.stage_started = time.monotonic()
+
+    def snapshot(self):
+        """Снимок счётчиков со скоростями и ETA этапа хеширования (значения могут отставать на одно обновление)"""
+        now = time.monotonic()
+        elapsed = max(now - self.stage_started, 1e-9)
+        snapshot = {
+            'stage': self.stage,
+            'dirs_visited': self.dirs_visited,
+            'files_seen': self.files_seen,
+            'candidate_files': self.candidate_files,
+            'candidate_bytes': self.candidate_bytes,
+            'files_done': self.files_done,
+            'bytes_done': self.bytes_done,
+            'bytes_read': self.bytes_read,
+            'groups_found': self.groups_found,
+            'elapsed': now - self.started,
+            'stage_elapsed': elapsed,
+            'fraction': None,
+            'eta': None,
+        }
+        if self.stage == 'traversal':
+            snapshot['files_per_sec'] = self.files_seen / elapsed
+            snapshot['bytes_per_sec'] = 0.0
+        else:
+            snapshot['files_per_sec'] = self.files_done / elapsed
+            snapshot['bytes_per_sec'] = self.bytes_read / elapsed
+            if self.candidate_bytes:
+                snapshot['fraction'] = min(1.0, self.bytes_done / self.candidate_bytes)
+                done_per_sec = self.bytes_done / elapsed
+                if done_per_sec > 0:
+                    snapshot['eta'] = max(0, self.candidate_bytes - self.bytes_done) / done_per_sec
+        return snapshot
@@ -0,0 +1,94 @@
+# ranking.py
+import os
+import re
+from functools import lru_cache
+
+# Признаки копии в имени файла, каждый найденный признак даёт штраф 10
+COPY_PATTERNS = [
+    r'\(\d+\)',  # (1), (2), (3)
+    r'\s+\d+$',  # пробел и цифра в конце
+    r'copy',
+    r'копия',
+    r'\s-\scopy',
+    r'\s-\sкопия',
+]
+
+# Один скомпилированный шаблон: для каждого признака — необязательный lookahead
+# со своей группой, поэтому за один проход видно, какие признаки встретились
+_COPY_RE = re.compile(''.join(f'(?:(?=.*?({p})))?' for p in COPY_PATTERNS), re.DOTALL)
+
+KEEP_POLICIES = {
+    'name': 'Имя без приписок (1), "копия"',
+    'oldest': 'Самый старый файл',
+    'shortest_path': 'Самый короткий путь',
+    'preferred_prefixes': 'Предпочтительные папки',
+}
+
+DEFAULT_KEEP_POLICY = 'name'
+
+
+@lru_cache(maxsize=65536)
+def name_penalty(filename):
+    """
+    Штраф имени файла: чем меньше, тем выше приоритет на сохранение.
+    Результат кешируется по имени файла.
+    """
+    match = _COPY_RE.match(filename.lower())
+    hits = sum(1 for group in match.groups() if group is not None)
+    return hits * 10 + len(filename) * 0.01
+
+
+class KeepRanker:
+    """
+    Определяет порядок файлов в группе дубликатов: первый файл сохраняется.
+
+    Политики (KEEP_POLICIES):
+        'name' — по штрафу имени (name_penalty)
+        'oldest' — по наименьшему mtime
+        'shortest_path' — по длине полного пути
+        'preferred_prefixes' — файлы из preferred_prefixes (в порядке списка) первыми
+    При равенстве основного критерия решает штраф имени.
+    """
+
+    def __init__(self, policy=DEFAULT_KEEP_POLICY, preferred_prefixes=None):
+        if policy not in KEEP_POLICIES:
+            raise ValueError(f"Неизвестная политика сохранения: {policy}")
+        self.policy = policy
+        self.preferred_prefixes = [
+            os.path.normcase(os.path.normpath(prefix)) for prefix in (preferred_prefixes or [])
+        ]
+        self._policy_key = {
+            'name': self._key_name,
+            'oldest': self._key_oldest,
+            'shortest_path': self._key_shortest_path,
+            'preferred_prefixes': self._key_preferred_prefixes,
+        }[policy]
+
+    def sort_key(self, file_info):
+        return self._policy_key(file_info)
+
+    def rank(self, files):
+        """Возвращает новый список файлов в порядке сохранения"""
+        return sorted(files, key=self._policy_key)
+
+    def rank_groups(self, duplicates):
+        """Упорядочивает каждую группу {hash: [file_info, ...]} на месте и возвращает словарь"""
+        for files in duplicates.values():
+            files.sort(key=self._policy_key)
+        return duplicates
+
+    def _key_name(self, file_info):
+        return name_penalty(file_info['name'])
+
+    def _key_oldest(self, file_info):
+        return file_info.get('mtime', float('inf')), name_penalty(file_info['name'])
+
+    def _key_shortest_path(self, file_info):
+        return len(file_info['path']), name_penalty(file_info['name'])
+
+    def _key_preferred_prefixes(self, file_info):
+        path = os.path.normcase(os.path.normpath(file_info['path']))
+        for index, prefix in enumerate(self.preferred_prefixes):
+            if path == prefix or path.startswith(prefix.rstrip(os.sep) + os.sep):
+                return index, name_penalty(file_info['name'])
+        return len(self.preferred_prefixes), name_penalty(file_info['name'])
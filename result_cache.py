@@ -0,0 +1,83 @@
+# result_cache.py
+import marshal
+import os
+import time
+
+from logger import get_logger
+from models import DuplicateGroup, ScanResult
+
+DEFAULT_RESULT_CACHE = 'disktider_last_scan.cache'
+
+# Версия формата снимка; снимки другой версии игнорируются
+RESULT_CACHE_VERSION = 1
+
+# Поля file_info в порядке хранения (size общий у группы и хранится в ней)
+_FILE_FIELDS = ('path', 'name', 'mtime', 'dev', 'inode', 'partial')
+
+
+def save_result_cache(result, root, options=None, path=DEFAULT_RESULT_CACHE, scanned=None):
+    """
+    Сохраняет снимок результата для быстрого открытия при следующем запуске.
+
+    Формат — marshal от кортежей встроенных типов: компактно и загружается
+    одним вызовом без разбора строк. В штампе — корень, параметры
+    сканирования, время сканирования (scanned, по умолчанию сейчас) и версии
+    формата; файл пишется во временный и подменяется атомарно.
+    """
+    stamp = {
+        'version': RESULT_CACHE_VERSION,
+        'marshal_version': marshal.version,
+        'root': root,
+        'options': options or {},
+        'scanned': scanned or time.time(),
+        'saved': time.time(),
+        'groups': len(result),
+        'files': result.file_count,
+    }
+    groups = tuple(
+        (group.digest, group.size, tuple(tuple(f.get(field) for field in _FILE_FIELDS) for f in group.files))
+        for group in result.groups
+    )
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(marshal.dumps((stamp, groups), marshal.version))
+    os.replace(temp_path, path)
+    get_logger().info(f"Снимок результатов сохранён: {path} ({len(result)} групп)")
+
+
+def load_result_cache(path=DEFAULT_RESULT_CACHE):
+    """
+    Загружает снимок результата.
+
+    Returns:
+        tuple: (stamp, ScanResult) или (None, None), если снимка нет,
+        он повреждён или записан в другом формате
+    """
+    try:
+        # marshal.load() читает файл мелкими кусками — в разы медленнее разбора готовых байт
+        with open(path, 'rb') as f:
+            stamp, groups = marshal.loads(f.read())
+    except FileNotFoundError:
+        return None, None
+    except (OSError, EOFError, ValueError, TypeError) as e:
+        get_logger().warning(f"Снимок результатов {path} не прочитан: {e}")
+        return None, None
+
+    if (not isinstance(stamp, dict) or stamp.get('version') != RESULT_CACHE_VERSION
+            or stamp.get('marshal_version') != marshal.version):
+        get_logger().info(f"Снимок результатов {path} записан в другом формате — пропущен")
+        return None, None
+
+    result = ScanResult(
+        DuplicateGroup(digest, [dict(zip(_FILE_FIELDS, values), size=size) for values in files])
+        for digest, size, files in groups
+    )
+    return stamp, result
+
+
+def remove_result_cache(path=DEFAULT_RESULT_CACHE):
+    """Удаляет снимок (например, после удаления файлов он больше не отражает диск)"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,263 @@
+# results_db.py
+import json
+import os
+import sqlite3
+import time
+from itertools import groupby
+
+from logger import get_logger
+from models import DuplicateGroup, ScanResult, path_key, file_extension, normalize_extension
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS scan (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    root TEXT,
+    options TEXT,
+    started REAL,
+    finished REAL
+);
+CREATE TABLE IF NOT EXISTS groups (
+    id INTEGER PRIMARY KEY,
+    digest TEXT UNIQUE NOT NULL,
+    size INTEGER NOT NULL,
+    file_count INTEGER NOT NULL,
+    wasted INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    group_id INTEGER NOT NULL REFERENCES groups(id),
+    position INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    path_key TEXT NOT NULL,
+    name TEXT NOT NULL,
+    ext TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL,
+    dev INTEGER,
+    inode INTEGER
+);
+CREATE TABLE IF NOT EXISTS hardlinks (
+    group_id INTEGER NOT NULL REFERENCES groups(id),
+    dev INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    link_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS errors (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_groups_wasted ON groups(wasted);
+CREATE INDEX IF NOT EXISTS idx_groups_size ON groups(size);
+CREATE INDEX IF NOT EXISTS idx_files_group ON files(group_id, position);
+CREATE INDEX IF NOT EXISTS idx_files_ext ON files(ext, group_id);
+CREATE INDEX IF NOT EXISTS idx_files_path_key ON files(path_key);
+CREATE INDEX IF NOT EXISTS idx_hardlinks_group ON hardlinks(group_id);
+'''
+
+# Равные значения упорядочены по убыванию id: тогда порядок целиком берётся
+# из индекса (обход назад), и страница с OFFSET не сортирует всю таблицу
+ORDER_BY = {
+    'wasted': 'g.wasted DESC',
+    'size': 'g.size DESC',
+    'count': 'g.file_count DESC',
+}
+
+# Сколько групп накапливать перед фиксацией транзакции
+COMMIT_EVERY = 500
+
+
+class ResultsDB:
+    """
+    SQLite-хранилище результатов сканирования с индексами для постраничных запросов.
+
+    Пишется конвейером сканирования: экземпляр передаётся в
+    find_duplicates(on_group=db.add_group, on_error=db.add_error).
+    Соединение SQLite привязано к потоку, в котором создан объект.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+        self._pending = 0
+
+    @classmethod
+    def create(cls, path, root, options=None):
+        """Создаёт пустую базу для нового сканирования (старая перезаписывается)"""
+        # Вместе с базой — её файлы WAL, иначе SQLite применит их к новой базе
+        for old_path in (path, path + '-wal', path + '-shm'):
+            if os.path.exists(old_path):
+                os.remove(old_path)
+        db = cls(path)
+        db.conn.execute('PRAGMA journal_mode=WAL')
+        db.conn.execute('PRAGMA synchronous=NORMAL')
+        db.conn.execute(
+            'INSERT INTO scan (id, root, options, started) VALUES (1, ?, ?, ?)',
+            (root, json.dumps(options or {}, ensure_ascii=False), time.time())
+        )
+        db.conn.commit()
+        return db
+
+    def add_group(self, digest, files):
+        """Записывает группу (files — в порядке сохранения); совместим с on_group"""
+        size = files[0]['size']
+        cursor = self.conn.execute(
+            'INSERT INTO groups (digest, size, file_count, wasted) VALUES (?, ?, ?, ?)',
+            (digest, size, len(files), size * (len(files) - 1))
+        )
+        group_id = cursor.lastrowid
+        self.conn.executemany(
+            'INSERT INTO files (group_id, position, path, path_key, name, ext, size, mtime, dev, inode) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [
+                (group_id, position, f['path'], path_key(f['path']), f['name'], file_extension(f),
+                 f['size'], f.get('mtime'), f.get('dev'), f.get('inode'))
+                for position, f in enumerate(files)
+            ]
+        )
+
+        # Жёсткие ссылки: несколько путей группы указывают на один inode
+        links = {}
+        for f in files:
+            if f.get('inode'):
+                key = (f.get('dev'), f['inode'])
+                links[key] = links.get(key, 0) + 1
+        hardlinks = [(group_id, dev, inode, count) for (dev, inode), count in links.items() if count > 1]
+        if hardlinks:
+            self.conn.executemany(
+                'INSERT INTO hardlinks (group_id, dev, inode, link_count) VALUES (?, ?, ?, ?)', hardlinks
+            )
+
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self.commit()
+
+    __call__ = add_group
+
+    def add_error(self, path, stage, message):
+        """Записывает ошибку доступа к файлу; совместим с on_error"""
+        self.conn.execute('INSERT INTO errors (path, stage, message) VALUES (?, ?, ?)', (path, stage, message))
+
+    def add_result(self, result):
+        """Записывает готовый ScanResult целиком"""
+        for group in result.groups:
+            self.add_group(group.digest, group.files)
+        self.commit()
+
+    def commit(self):
+        self.conn.commit()
+        self._pending = 0
+
+    def finish(self):
+        """Фиксирует оставшиеся записи и отмечает время окончания сканирования"""
+        self.conn.execute('UPDATE scan SET finished = ? WHERE id = 1', (time.time(),))
+        self.commit()
+        get_logger().info(f"Результаты сохранены в базу: {self.path}")
+
+    def close(self):
+        self.conn.close()
+
+    def discard(self):
+        """Закрывает и удаляет базу (например, прерванного сканирования: она неполная)"""
+        self.close()
+        for path in (self.path, self.path + '-wal', self.path + '-shm'):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        self.close()
+
+    def scan_info(self):
+        """Сведения о сканировании: root, options, started, finished"""
+        row = self.conn.execute('SELECT root, options, started, finished FROM scan WHERE id = 1').fetchone()
+        if not row:
+            return None
+        return {'root': row[0], 'options': json.loads(row[1] or '{}'), 'started': row[2], 'finished': row[3]}
+
+    def _where(self, min_size=None, max_size=None, extension=None, path_prefix=None, min_wasted=None):
+        clauses, params = [], []
+        if min_size is not None:
+            clauses.append('g.size >= ?')
+            params.append(min_size)
+        if max_size is not None:
+            clauses.append('g.size <= ?')
+            params.append(max_size)
+        if min_wasted is not None:
+            clauses.append('g.wasted >= ?')
+            params.append(min_wasted)
+        if extension:
+            clauses.append('EXISTS (SELECT 1 FROM files f WHERE f.group_id = g.id AND f.ext = ?)')
+            params.append(normalize_extension(extension))
+        if path_prefix:
+            prefix = path_key(path_prefix)
+            if not prefix.endswith(os.sep):
+                prefix += os.sep
+            clauses.append('EXISTS (SELECT 1 FROM files f WHERE f.group_id = g.id '
+                           'AND f.path_key >= ? AND f.path_key < ?)')
+            params.extend([prefix, prefix + '\U0010ffff'])
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def count_groups(self, **filters):
+        """Возвращает (групп, лишних байт) с учётом фильтров query_groups"""
+        where, params = self._where(**filters)
+        row = self.conn.execute(f'SELECT COUNT(*), COALESCE(SUM(g.wasted), 0) FROM groups g{where}', params).fetchone()
+        return row[0], row[1]
+
+    def query_groups(self, order_by='wasted', limit=100, offset=0, **filters):
+        """
+        Страница групп дубликатов.
+
+        Группы страницы и их файлы читаются одним запросом (страница групп
+        в подзапросе, JOIN с files), а не отдельным запросом на группу.
+
+        Args:
+            order_by: 'wasted', 'size' или 'count'
+            limit: сколько групп вернуть (None — все)
+            filters: min_size, max_size, min_wasted, extension, path_prefix
+
+        Returns:
+            list[DuplicateGroup] с файлами в порядке сохранения
+        """
+        where, params = self._where(**filters)
+        order = ORDER_BY[order_by]
+        rows = self.conn.execute(
+            f'SELECT g.id, g.digest, f.path, f.name, f.size, f.mtime, f.dev, f.inode '
+            f'FROM (SELECT g.id, g.digest, g.size, g.file_count, g.wasted FROM groups g{where} '
+            f'ORDER BY {order}, g.id DESC LIMIT ? OFFSET ?) g '
+            f'JOIN files f ON f.group_id = g.id '
+            f'ORDER BY {order}, g.id DESC, f.position',
+            params + [-1 if limit is None else limit, offset]
+        )
+        return [
+            DuplicateGroup(digest, [
+                {'path': path, 'name': name, 'size': size, 'mtime': mtime, 'dev': dev, 'inode': inode}
+                for _, _, path, name, size, mtime, dev, inode in group_rows
+            ])
+            for (_, digest), group_rows in groupby(rows, key=lambda row: (row[0], row[1]))
+        ]
+
+    def load_result(self, **filters):
+        """Загружает все (или отфильтрованные) группы в ScanResult"""
+        return ScanResult(self.query_groups(limit=None, **filters))
+
+    def hardlink_sets(self, limit=100, offset=0):
+        """Наборы жёстких ссылок: (digest, dev, inode, link_count)"""
+        return self.conn.execute(
+            'SELECT g.digest, h.dev, h.inode, h.link_count FROM hardlinks h JOIN groups g ON g.id = h.group_id '
+            'ORDER BY h.link_count DESC LIMIT ? OFFSET ?', (limit, offset)
+        ).fetchall()
+
+    def errors(self, limit=100, offset=0):
+        """Ошибки сканирования: (path, stage, message)"""
+        return self.conn.execute(
+            'SELECT path, stage, message FROM errors ORDER BY id LIMIT ? OFFSET ?', (limit, offset)
+        ).fetchall()
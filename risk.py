@@ -0,0 +1,108 @@
+# risk.py
+import os
+import re
+from bisect import bisect_right
+
+# Ключевые слова путей системных и программных папок, дубликаты в которых рискованно удалять
+RISKY_PATH_KEYWORDS = [
+    'SteamLibrary',
+    'Program Files',
+    'Program Files (x86)',
+    'Windows',
+    os.path.join('AppData', 'Local'),
+    os.path.join('Users', 'Default'),
+    'Library/Application Support',
+    'System Volume Information'
+]
+
+# Правило с этим префиксом — регулярное выражение, а не подстрока
+REGEX_RULE_PREFIX = 're:'
+
+
+def normalize_risk_path(path):
+    """Путь в форме для сравнения с правилами: нижний регистр, разделитель '/'"""
+    return path.lower().replace(os.sep, '/')
+
+
+class RiskClassifier:
+    """
+    Классификатор рискованных путей, компилируемый один раз.
+
+    Правила — подстроки пути без учёта регистра (разделитель можно писать
+    как '/' или как os.sep) или регулярные выражения с префиксом 're:'.
+    Подстроки нормализуются при компиляции, а поглощённые более короткими
+    ('program files (x86)' при 'program files') отбрасываются; все
+    регулярные выражения собираются в одно.
+    """
+
+    def __init__(self, rules=None):
+        self.rules = list(RISKY_PATH_KEYWORDS if rules is None else rules)
+        literals = set()
+        patterns = []
+        for rule in self.rules:
+            rule = rule.strip()
+            if not rule:
+                continue
+            if rule.startswith(REGEX_RULE_PREFIX):
+                # Проверяем каждое выражение отдельно, чтобы ошибка указывала на правило
+                pattern = rule[len(REGEX_RULE_PREFIX):]
+                try:
+                    re.compile(pattern)
+                except re.error as e:
+                    raise ValueError(f"Неверное регулярное выражение в правиле {rule!r}: {e}") from e
+                patterns.append(f'(?:{pattern})')
+            else:
+                literals.add(normalize_risk_path(rule))
+
+        self._literals = [literal for literal in literals
+                          if not any(other != literal and other in literal for other in literals)]
+        self._pattern = re.compile('|'.join(patterns), re.IGNORECASE) if patterns else None
+
+    def is_risky(self, path):
+        path = normalize_risk_path(path)
+        if any(literal in path for literal in self._literals):
+            return True
+        return self._pattern is not None and self._pattern.search(path) is not None
+
+    def classify(self, paths):
+        """
+        Множество рискованных путей из paths.
+
+        Нормализованные пути склеиваются через перевод строки в один текст,
+        и каждая подстрока просматривает его одним проходом str.find вместо
+        цикла по правилам для каждого пути. Совпадение относится к пути по
+        смещению (смещения считаются по нормализованным строкам: lower()
+        может изменить длину), после чего поиск переходит к следующему пути.
+        Регулярные выражения проверяются по каждому пути отдельно: классы
+        вроде [^x] и \\s иначе могли бы захватить разделитель путей.
+        """
+        paths = list(paths)
+        if not paths:
+            return set()
+
+        normalized = [normalize_risk_path(path) for path in paths]
+        starts = []
+        offset = 0
+        for path in normalized:
+            starts.append(offset)
+            offset += len(path) + 1
+        text = '\n'.join(normalized)
+
+        risky_indexes = set()
+
+        def next_path(position):
+            index = bisect_right(starts, position) - 1
+            risky_indexes.add(index)
+            return starts[index + 1] if index + 1 < len(starts) else len(text)
+
+        for literal in self._literals:
+            position = text.find(literal)
+            while position != -1:
+                position = text.find(literal, next_path(position))
+
+        if self._pattern is not None:
+            search = self._pattern.search
+            risky_indexes.update(index for index, path in enumerate(normalized)
+                                 if index not in risky_indexes and search(path) is not None)
+
+        return {paths[index] for index in risky_indexes}
@@ -0,0 +1,31 @@
+# settings.py
+import json
+import os
+
+SETTINGS_PATH = 'settings.json'
+
+
+def read_settings(path=SETTINGS_PATH):
+    """Настройки из settings.json; {} если файла ещё нет"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def update_settings(values, path=SETTINGS_PATH):
+    """
+    Записывает values поверх сохранённых настроек. Остальные ключи
+    сохраняются: файл общий у интро и основного окна.
+    """
+    try:
+        settings = read_settings(path)
+    except ValueError:
+        # Повреждённый файл перезаписывается целиком
+        settings = {}
+    settings.update(values)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(settings, f)
+    os.replace(temp_path, path)
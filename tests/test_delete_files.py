@@ -0,0 +1,44 @@
+import os
+import tempfile
+import unittest
+
+from utils import delete_files_by_list
+
+
+class DeleteFilesByListTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _make_file(self, name, data=b'duplicate'):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_plain_records_are_deleted_without_scan_metadata(self):
+        paths = [self._make_file('a.txt'), self._make_file('b.txt')]
+        records = [{'path': path, 'name': os.path.basename(path), 'size': 9} for path in paths]
+
+        deleted_count, _, errors = delete_files_by_list(
+            records, mode='delete', journal_path=os.path.join(self.tmp.name, 'journal.jsonl'))
+
+        self.assertEqual(deleted_count, 2)
+        self.assertEqual(errors, [])
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+
+    def test_scanned_record_of_changed_file_is_skipped(self):
+        path = self._make_file('a.txt')
+        record = {'path': path, 'name': 'a.txt', 'size': 9, 'mtime': os.stat(path).st_mtime - 100,
+                  'inode': os.stat(path).st_ino, 'digest': 'stale'}
+
+        deleted_count, _, errors = delete_files_by_list(
+            [record], mode='delete', journal_path=os.path.join(self.tmp.name, 'journal.jsonl'))
+
+        self.assertEqual(deleted_count, 0)
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(os.path.exists(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import os
+import sys
+import tempfile
+import unittest
+
+from export import ResultExporter, load_results
+
+
+@unittest.skipIf(sys.platform in ('win32', 'darwin'), "имена с байтами не в UTF-8 допускает только Linux")
+class NonUtf8FilenameExportTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.paths = []
+        for name in (b'song\xff.mp3', b'song copy\xfe.mp3'):
+            path = os.path.join(self.tmp.name, os.fsdecode(name))
+            with open(path, 'wb') as f:
+                f.write(b'duplicate')
+            self.paths.append(path)
+
+    def _round_trip(self, extension):
+        export_path = os.path.join(self.tmp.name, 'export' + extension)
+        files = [{'path': path, 'name': os.path.basename(path), 'size': 9, 'mtime': os.stat(path).st_mtime}
+                 for path in self.paths]
+        with ResultExporter(export_path) as exporter:
+            exporter('digest', files)
+
+        result, stale = load_results(export_path)
+        self.assertEqual(stale, [])
+        self.assertEqual([f['path'] for f in result.groups[0].files], self.paths)
+
+    def test_jsonl(self):
+        self._round_trip('.jsonl')
+
+    def test_csv(self):
+        self._round_trip('.csv')
+
+
+if __name__ == '__main__':
+    unittest.main()
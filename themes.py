@@ -0,0 +1,53 @@
+# themes.py
+
+# Цветовые темы интерфейса (используются и интро, и основным окном)
+THEMES = {
+    'light': {
+        'bg': '#FAFAFA',
+        'fg': '#111827',
+        'surface': '#FFFFFF',
+        'surface_alt': '#F0F0F0',
+        'primary': '#2563EB',
+        'danger': '#DC2626',  # Оригинальный красный
+        'success': '#059669',  # Глубокий Teal
+        'warning': '#FBBF24',  # Солнечный желтый
+        'border': '#E0E0E0',
+        'text_secondary': '#64748B',
+        'treeview_bg': '#FFFFFF',
+        'treeview_fg': '#111827',
+        'treeview_selected': '#E8F0FF',
+        'hover': '#EEEEEE',
+        'risk_fg': '#92400E',
+        'risk_bg_color': '#FEF3C7',
+
+        # >>> НОВЫЕ ЦВЕТА КНОПОК УДАЛЕНИЯ/ПРЕДПРОСМОТРА
+        'btn_preview': '#8B5CF6',  # Фиолетовый
+        'btn_trash': '#3B82F6',  # Синий
+        'btn_delete': '#EF4444',  # Красный
+        # <<<
+    },
+    'dark': {
+        'bg': '#1E1E1E',
+        'fg': '#E0E0E0',
+        'surface': '#2D2D30',
+        'surface_alt': '#000000',
+        'primary': '#007ACC',
+        'danger': '#F44747',  # Оригинальный яркий красный
+        'success': '#34D399',  # Мятный зеленый
+        'warning': '#FFCC00',  # Яркий желтый
+        'border': '#3E3E42',
+        'text_secondary': '#858585',
+        'treeview_bg': '#252526',
+        'treeview_fg': '#CCCCCC',
+        'treeview_selected': '#094771',
+        'hover': '#383838',
+        'risk_fg': '#FCD34D',
+        'risk_bg_color': '#443C22',
+
+        # >>> НОВЫЕ ЦВЕТА КНОПОК УДАЛЕНИЯ/ПРЕДПРОСМОТРА
+        'btn_preview': '#A78BFA',  # Светло-фиолетовый
+        'btn_trash': '#60A5FA',  # Светло-синий
+        'btn_delete': '#F87171',  # Светло-красный
+        # <<<
+    }
+}
@@ -1,19 +1,17 @@
 # utils.py
-import os
-import re
-from logger import get_logger
-
-# >>> ВОЗВРАЩАЕМ send2trash
-try:
-    from send2trash import send2trash
+import importlib.util
 
-    TRASH_AVAILABLE = True
-except ImportError:
-    TRASH_AVAILABLE = False
-    print("⚠️ send2trash не установлен. Используйте: pip install send2trash")
+from logger import get_logger
+from ranking import name_penalty
 
+# Флаг без импорта deletion (и send2trash): utils загружается при старте GUI,
+# а движок удаления — только при первом удалении
+TRASH_AVAILABLE = importlib.util.find_spec('send2trash') is not None
 
-# <<< КОНЕЦ ИЗМЕНЕНИЯ
+# Оценка системных вызовов на файл (Span.syscalls_est): unlink; для жёсткой
+# ссылки — два stat, link и rename.
+# Корзину (send2trash) и reflink (ioctl, copystat, chown) не считаем
+DELETION_SYSCALLS = {'delete': 1, 'hardlink': 4}
 
 
 def format_size(size_bytes):
@@ -28,119 +26,146 @@ def format_size(size_bytes):
     return f"{size_bytes:.2f} ТБ"
 
 
+def format_duration(seconds):
+    """Форматирует длительность: «12 с», «3 мин 20 с», «1 ч 05 мин»"""
+    seconds = int(round(max(0, seconds)))
+    if seconds < 60:
+        return f"{seconds} с"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes} мин {seconds:02d} с"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours} ч {minutes:02d} мин"
+
+
 def get_file_priority(filename):
     """
     Определяет приоритет файла для сохранения.
     Возвращает число: чем меньше, тем выше приоритет.
     """
-    filename_lower = filename.lower()
+    return name_penalty(filename)
 
-    bad_patterns = [
-        r'\(\d+\)',  # (1), (2), (3)
-        r'\s+\d+$',  # пробел и цифра в конце
-        r'copy',
-        r'копия',
-        r'\s-\scopy',
-        r'\s-\sкопия',
-    ]
 
-    penalty = 0
-    for pattern in bad_patterns:
-        if re.search(pattern, filename_lower):
-            penalty += 10
-
-    penalty += len(filename) * 0.01
-
-    return penalty
-
-
-def _normalize_path_long(filepath):
-    """
-    Нормализует путь, добавляя префикс \\\\?\\ для поддержки длинных путей (MAX_PATH)
-    в os.remove, но не для send2trash.
-    """
-    if os.name == 'nt':
-        filepath = os.path.normpath(filepath) # Сначала нормализуем разделители
-        if not filepath.startswith('\\\\?\\'):
-            if filepath.startswith('\\\\'):
-                # UNC путь (\\server\share)
-                return '\\\\?\\UNC\\' + filepath[2:]
-            return '\\\\?\\' + filepath
-    return filepath
-
-def delete_files_by_list(files_to_delete, mode='trash', dry_run=False):
+def delete_files_by_list(files_to_delete, mode='trash', dry_run=False, progress=None, reflink_fallback='hardlink',
+                         verify=None, journal_path=None, control=None, metrics=None):
     """
     Удаляет файлы из списка.
 
     Args:
-        files_to_delete: список словарей с ключами 'path', 'name', 'size'
-        mode: 'trash' (в корзину) или 'delete' (навсегда)
+        files_to_delete: список словарей с ключами 'path', 'name', 'size'; записи
+            сканирования (DuplicateGroup.deletion_record) несут ещё 'mtime',
+            'inode', 'digest', 'keep_path' и 'keep' для проверки перед удалением
+        mode: 'trash' (в корзину), 'delete' (навсегда), 'hardlink' (заменить жёсткой
+            ссылкой на file_info['keep_path']) или 'reflink' (заменить CoW-клоном)
         dry_run: если True, только показывает что будет удалено без реального удаления
+        progress: колбэк прогресса DeletionEngine (файлы, байты, скорость)
+        reflink_fallback: 'hardlink' или 'skip', если ФС не поддерживает reflink
+        verify: перед удалением перепроверить файлы (verify.verify_before_delete);
+            изменившиеся после сканирования файлы пропускаются и попадают в ошибки.
+            None (по умолчанию) — проверяются только записи с данными сканирования
+            ('mtime' или 'digest'), простые словари удаляются как есть;
+            True — проверяются все записи, False — ни одной
+        journal_path: куда писать журнал удаления (по умолчанию — новый файл
+            в journals/); по нему действия можно отменить через journal.undo_journal
+        control: progress.OperationControl для паузы и отмены удаления
+        metrics: metrics.ScanMetrics для замеров этапов verify и deletion
+            (по умолчанию замеры пишутся в файл метрик рядом с логом)
 
     Returns:
         tuple: (deleted_count, freed_space_str, errors_list)
     """
+    # Проверка, журнал и замеры нужны только при удалении: format_size и
+    # остальные помощники импортируются без них
+    from deletion import DeletionEngine
+    from verify import verify_before_delete
+    from journal import DeletionJournal, new_journal_path
+    from metrics import ScanMetrics
+
     logger = get_logger()
 
     if dry_run:
         logger.info("🔍 РЕЖИМ ПРЕДПРОСМОТРА (DRY RUN) - файлы не будут удалены")
-        mode = 'preview'
+        logger.log_deletion_start('preview')
+
+        deleted_count = 0
+        freed_space = 0
+        for file_info in files_to_delete:
+            logger.info(f"[ПРЕДПРОСМОТР] Будет удалён: {file_info['path']}")
+            deleted_count += 1
+            freed_space += file_info['size']
+
+        freed_space_str = format_size(freed_space)
+        logger.info(f"[ПРЕДПРОСМОТР] Будет удалено: {deleted_count} файлов")
+        logger.info(f"[ПРЕДПРОСМОТР] Будет освобождено: {freed_space_str}")
+        return deleted_count, freed_space_str, []
 
     logger.log_deletion_start(mode)
 
-    deleted_count = 0
-    freed_space = 0
-    errors = []
+    metrics = metrics or ScanMetrics(run={'mode': mode})
+
+    skipped = []
+    if verify is None:
+        to_verify = [f for f in files_to_delete if f.get('mtime') is not None or f.get('digest')]
+        unverified = [f for f in files_to_delete if f.get('mtime') is None and not f.get('digest')]
+    else:
+        to_verify, unverified = (files_to_delete, []) if verify else ([], files_to_delete)
+    files_to_delete = unverified
+    if to_verify:
+        with metrics.span('verify') as span:
+            verified, rejected = verify_before_delete(to_verify, mode=mode)
+            files_to_delete = verified + unverified
+            span.files = len(verified) + len(rejected)
+            span.errors = len(rejected)
+            span.syscalls_est = None  # stat и перехеширование идут в пуле verify
+        for path, reason in rejected:
+            error_msg = f"Пропущен: {path}: {reason}"
+            logger.warning(error_msg)
+            skipped.append(error_msg)
+
+    journal_path = journal_path or new_journal_path()
+    with metrics.span('deletion', mode=mode) as span, DeletionJournal(journal_path) as journal:
+        engine = DeletionEngine(mode=mode, progress=progress, reflink_fallback=reflink_fallback, journal=journal,
+                                control=control)
+        deleted_count, freed_space, errors = engine.run(files_to_delete)
+        span.files = engine.done
+        span.errors = len(errors)
+        span.syscalls_est = DELETION_SYSCALLS[engine.mode] * engine.done if engine.mode in DELETION_SYSCALLS else None
+        span.extra['freed_bytes'] = freed_space
+        span.extra['cancelled'] = engine.cancelled
+    errors = skipped + errors
+    logger.info(f"Журнал удаления: {journal_path}")
+
+    freed_space_str = format_size(freed_space)
+    logger.log_deletion_results(deleted_count, freed_space_str)
 
-    for file_info in files_to_delete:
-        original_filepath = file_info['path']
+    return deleted_count, freed_space_str, errors
 
-        # >>> ИЗМЕНЕНИЕ: Нормализуем путь для единообразных разделителей.
-        # Это помогает избежать ошибок даже без префикса MAX_PATH.
-        normalized_for_trash = os.path.normpath(original_filepath)
-        # <<<
 
-        if dry_run:
-            # Просто логируем, что файл будет удалён
-            logger.info(f"[ПРЕДПРОСМОТР] Будет удалён: {original_filepath}")
-            deleted_count += 1
-            freed_space += file_info['size']
-            continue
-
-        try:
-            if mode == 'trash' and TRASH_AVAILABLE:
-                # Используем send2trash с путем, нормализованным только по разделителям
-                send2trash(normalized_for_trash)
-                logger.info(f"Перемещён в корзину: {original_filepath}")
-            else:
-                # Необратимое удаление (os.remove требует префикс для MAX_PATH)
-                normalized_filepath_max_path = _normalize_path_long(original_filepath)
-                os.remove(normalized_filepath_max_path)
-                logger.info(f"Удалён навсегда: {original_filepath}")
+def count_duplicates_by_extension(result, target_extension=None, directory=None):
+    """
+    Считает удаляемые дубликаты с расширением target_extension (и внутри directory).
 
-            deleted_count += 1
-            freed_space += file_info['size']
+    Args:
+        result: ScanResult
 
-        except FileNotFoundError:
-            error_msg = f"Файл не найден: {original_filepath}"
-            logger.log_deletion_error(original_filepath, error_msg)
-            errors.append(error_msg)
-        except PermissionError as e:
-            error_msg = f"Отказано в доступе: {str(e)}"
-            logger.log_deletion_error(original_filepath, error_msg)
-            errors.append(error_msg)
-        except Exception as e:
-            # Логгирование ошибки в том формате, в каком она пришла
-            error_msg = f"Ошибка удаления: {type(e).__name__}: {str(e)}"
-            logger.log_deletion_error(original_filepath, error_msg)
-            errors.append(error_msg)
+    Returns:
+        tuple: (files_count, total_bytes)
+    """
+    return result.aggregate_index().count(target_extension, directory)
 
-    freed_space_str = format_size(freed_space)
 
-    if dry_run:
-        logger.info(f"[ПРЕДПРОСМОТР] Будет удалено: {deleted_count} файлов")
-        logger.info(f"[ПРЕДПРОСМОТР] Будет освобождено: {freed_space_str}")
-    else:
-        logger.log_deletion_results(deleted_count, freed_space_str)
+def delete_duplicates(result, target_extension=None, directory=None, mode='trash', dry_run=False, progress=None,
+                      reflink_fallback='hardlink', journal_path=None, control=None):
+    """
+    Удаляет дубликаты из ScanResult, сохраняя первый файл каждой группы.
+    Можно ограничить удаление расширением и/или директорией.
 
-    return deleted_count, freed_space_str, errors
\ No newline at end of file
+    Returns:
+        tuple: (deleted_count, freed_space_str, errors_list)
+    """
+    logger = get_logger()
+    files_to_delete = result.aggregate_index().select(target_extension, directory)
+    if target_extension or directory:
+        logger.info(f"Фильтр удаления: расширение={target_extension or 'любое'}, папка={directory or 'любая'}")
+    return delete_files_by_list(files_to_delete, mode=mode, dry_run=dry_run, progress=progress,
+                                reflink_fallback=reflink_fallback, journal_path=journal_path, control=control)
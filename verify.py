@@ -0,0 +1,153 @@
+# verify.py
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from core import calculate_file_hash, calculate_partial_hash
+from logger import get_logger
+from models import DuplicateGroup, ScanResult
+
+# Проверка упирается в задержки stat/чтения, поэтому потоков больше, чем ядер
+DEFAULT_VERIFY_WORKERS = 16
+
+
+def check_file(file_info, digest):
+    """
+    Проверяет, что файл не изменился с момента сканирования.
+
+    Сначала дешёвый lstat (символическая ссылка на месте файла не пройдёт
+    по размеру): если размер, mtime и inode совпадают с записью —
+    файл считается прежним. Если изменились только mtime/inode, содержимое
+    перепроверяется: частичный хеш (если он был записан), затем полный.
+
+    Returns:
+        str | None: причина отказа или None, если файл прежний
+    """
+    path = file_info['path']
+    try:
+        st = os.lstat(path)
+    except FileNotFoundError:
+        return "файл пропал после сканирования"
+    except OSError as e:
+        return f"не удалось проверить файл: {e}"
+
+    if st.st_size != file_info['size']:
+        return "размер изменился после сканирования"
+
+    same_mtime = file_info.get('mtime') is not None and st.st_mtime == file_info['mtime']
+    same_inode = file_info.get('inode') is None or st.st_ino == file_info['inode']
+    if same_mtime and same_inode:
+        return None
+
+    if not digest:
+        return "файл изменился после сканирования"
+
+    recorded_partial = file_info.get('partial')
+    if recorded_partial:
+        partial = calculate_partial_hash(path, st.st_size)
+        if partial != recorded_partial:
+            return "содержимое изменилось после сканирования"
+        # Маленькие файлы частичный хеш читает целиком: он и есть полный
+        if partial == digest:
+            return None
+
+    if calculate_file_hash(path) != digest:
+        return "содержимое изменилось после сканирования"
+    return None
+
+
+def same_file_reason(record, mode=None):
+    """
+    Причина отказа, если дубликат и сохраняемый файл — один и тот же файл
+    (символическая ссылка одного на другой или жёсткая ссылка): удаление
+    такого «дубликата» может уничтожить единственную копию. Допускается
+    только режим 'hardlink' для файла с несколькими жёсткими ссылками.
+
+    Returns:
+        str | None
+    """
+    keep_path = record.get('keep_path')
+    if not keep_path:
+        return None
+    try:
+        if not os.path.samefile(record['path'], keep_path):
+            return None
+        if mode == 'hardlink' and not os.path.islink(record['path']) and os.stat(record['path']).st_nlink > 1:
+            return None
+    except OSError:
+        # Пропавшие файлы отклоняет check_file
+        return None
+    return f"это тот же файл, что и оригинал {keep_path} (ссылка)"
+
+
+def verify_before_delete(records, mode=None, max_workers=DEFAULT_VERIFY_WORKERS):
+    """
+    Перепроверяет записи удаления (DuplicateGroup.deletion_record) перед удалением.
+
+    Сохраняемые файлы групп проверяются тоже: если оригинал изменился или
+    пропал, все его дубликаты исключаются, чтобы не удалить последнюю копию.
+    По той же причине отклоняется дубликат, который на деле тот же файл,
+    что и оригинал (same_file_reason; mode — режим удаления).
+    Проверки выполняются параллельно в пуле потоков.
+
+    Returns:
+        tuple: (records_ok, rejected) — rejected: список (path, причина)
+    """
+    logger = get_logger()
+    records = list(records)
+
+    keeps = {}
+    for record in records:
+        keep = record.get('keep')
+        if keep is not None:
+            keeps.setdefault(keep['path'], (keep, record.get('digest')))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        keep_reasons = dict(zip(keeps, pool.map(lambda item: check_file(*item), keeps.values())))
+        reasons = list(pool.map(
+            lambda record: check_file(record, record.get('digest')) or same_file_reason(record, mode), records))
+
+    records_ok = []
+    rejected = []
+    for record, reason in zip(records, reasons):
+        keep_reason = keep_reasons.get(record.get('keep_path'))
+        if keep_reason:
+            reason = f"оригинал {record['keep_path']}: {keep_reason}"
+        if reason:
+            rejected.append((record['path'], reason))
+        else:
+            records_ok.append(record)
+
+    logger.info(f"Проверка перед удалением: {len(records_ok)} файлов подтверждено, {len(rejected)} исключено")
+    return records_ok, rejected
+
+
+def revalidate_result(result, max_workers=DEFAULT_VERIFY_WORKERS):
+    """
+    Перепроверяет все файлы результата без полного пересканирования.
+
+    Каждый файл проходит check_file: при прежних размере, mtime и inode
+    хватает stat, перехешируются только изменившиеся. Пропавшие и
+    изменившиеся файлы убираются из групп (порядок сохранения остальных не
+    меняется), группы, где осталось меньше двух файлов, отбрасываются.
+    Новые дубликаты так не находятся — для этого нужно сканирование.
+
+    Returns:
+        tuple: (ScanResult, stale) — stale: список (path, причина)
+    """
+    logger = get_logger()
+    checks = [(group, file_info) for group in result.groups for file_info in group.files]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        reasons = list(pool.map(lambda item: check_file(item[1], item[0].digest), checks))
+
+    stale = []
+    fresh = {}
+    for (group, file_info), reason in zip(checks, reasons):
+        if reason:
+            stale.append((file_info['path'], reason))
+        else:
+            fresh.setdefault(group.digest, []).append(file_info)
+
+    groups = [DuplicateGroup(group.digest, fresh[group.digest]) for group in result.groups
+              if len(fresh.get(group.digest, ())) > 1]
+    logger.info(f"Перепроверка результата: групп {len(groups)} из {len(result)}, устаревших файлов {len(stale)}")
+    return ScanResult(groups, metrics=result.metrics), stale